@@ -0,0 +1,100 @@
+# ruff: noqa: INP001
+"""Compare database size and narrow-column scans with and without compressed text.
+
+Run with: uv run python demos/benchmark_compressed.py [episodes]
+"""
+
+import random
+import shutil
+import sqlite3
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from overcast_to_sqlite.datastore import Datastore
+
+# Narrow columns, which share their pages with the start of the long text.
+NARROW_SCAN = "SELECT count(link), sum(enclosureId) FROM episodes_extended NOT INDEXED;"
+# Show notes repeat sponsor reads and links from episode to episode.
+BOILERPLATE = (
+    '<p>This episode is brought to you by <a href="https://example.com/sponsor">'
+    "our sponsor</a>. Use code PODCAST for 20% off your first order.</p>\n"
+    '<p>Follow us on <a href="https://example.com/social">social media</a> and '
+    '<a href="https://example.com/support">support the show</a>.</p>\n'
+)
+
+
+def populate(db_path: Path, episodes: int) -> None:
+    rng = random.Random(42)
+    vocabulary = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        for _ in range(2_000)
+    ]
+
+    def html(paragraphs: int) -> str:
+        return BOILERPLATE + "".join(
+            f"<p>{' '.join(rng.choices(vocabulary, k=60))}</p>\n"
+            for _ in range(paragraphs)
+        )
+
+    with Datastore(str(db_path)) as db:
+        batch = 1_000
+        for offset in range(0, episodes, batch):
+            db.save_extended_feed_and_episodes(
+                {"xmlUrl": f"https://example.com/{offset}.xml", "title": "Feed"},
+                [
+                    {
+                        "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+                        "feedXmlUrl": f"https://example.com/{offset}.xml",
+                        "title": " ".join(rng.choices(vocabulary, k=6)),
+                        "link": f"https://example.com/episodes/{i}",
+                        "description": html(rng.randint(5, 40)),
+                        "content:encoded": html(rng.randint(5, 40)),
+                    }
+                    for i in range(offset, min(offset + batch, episodes))
+                ],
+            )
+
+
+def scan(db_path: Path, repeat: int = 3) -> float:
+    """Return the best time in milliseconds to scan the narrow columns."""
+    best = float("inf")
+    for _ in range(repeat):
+        # A fresh connection with a small page cache, as a cold reader sees it.
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA cache_size = -2000;")
+        start = time.perf_counter()
+        conn.execute(NARROW_SCAN).fetchone()
+        best = min(best, time.perf_counter() - start)
+        conn.close()
+    return best * 1000
+
+
+def main() -> None:
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = Path(tmp) / "plain.db"
+        compressed = Path(tmp) / "compressed.db"
+        populate(plain, episodes)
+        shutil.copy(plain, compressed)
+        with Datastore(str(compressed)) as db:
+            start = time.perf_counter()
+            before, after = db.compress_text_columns()
+            seconds = time.perf_counter() - start
+            db.db.execute("VACUUM;")
+        print(
+            f"{episodes:,} episodes: text {before / 2**20:,.0f} MB -> "
+            f"{after / 2**20:,.0f} MB, compressed in {seconds:.1f}s",
+        )
+        print(f"  {'':<12} {'file':>10} {'narrow scan':>12}")
+        for name, path in (("plain", plain), ("compressed", compressed)):
+            print(
+                f"  {name:<12} {path.stat().st_size / 2**20:>7,.0f} MB "
+                f"{scan(path):>9.1f}ms",
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# ruff: noqa: INP001
+"""Compare a cold-start extend and chapter backfill with and without deferred FTS.
+
+Run with: uv run python demos/benchmark_deferred_fts.py [feeds] [episodes_per_feed]
+"""
+
+import contextlib
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.profiles import INGEST_PROFILE
+
+QUERIES = ("hockey", "rocket interview", "quantum*")
+
+
+def corpus(feeds: int, per_feed: int) -> list[tuple[dict, list[dict], list[tuple]]]:
+    """Build (feed, episodes, chapters) for each feed, like extend would save."""
+    rng = random.Random(42)
+    vocabulary = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        for _ in range(50_000)
+    ] + ["hockey", "rocket", "interview", "quantum"]
+
+    def text(words: int) -> str:
+        return " ".join(rng.choices(vocabulary, k=words))
+
+    data = []
+    for feed in range(feeds):
+        xml_url = f"https://example.com/{feed}.xml"
+        urls = [f"https://cdn.example.com/{feed}/{i}.mp3" for i in range(per_feed)]
+        data.append(
+            (
+                {"xmlUrl": xml_url, "title": text(3), "description": text(40)},
+                [
+                    {
+                        "enclosureUrl": url,
+                        "feedXmlUrl": xml_url,
+                        "title": text(6),
+                        "description": text(120),
+                    }
+                    for url in urls
+                ],
+                [
+                    (url, url, "description", minute * 60, text(4), None, None)
+                    for url in urls
+                    for minute in range(5)
+                ],
+            ),
+        )
+    return data
+
+
+def load(db_path: Path, data: list, *, deferred: bool) -> float:
+    """Save feeds one transaction each, as extend does, then their chapters."""
+    start = time.perf_counter()
+    with Datastore(str(db_path), INGEST_PROFILE) as db:
+        with db.deferred_fts() if deferred else contextlib.nullcontext():
+            for feed, episodes, _ in data:
+                db.save_extended_feed_and_episodes(feed, episodes)
+            for _, _, chapters in data:
+                db.insert_chapters(chapters)
+        return time.perf_counter() - start
+
+
+def results(db_path: Path) -> list[list[tuple]]:
+    with Datastore(str(db_path)) as db:
+        return [
+            [(hit.kind, hit.rowid, hit.snippet) for hit in db.search(q, limit=50).hits]
+            for q in QUERIES
+        ]
+
+
+def main() -> None:
+    feeds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_feed = int(sys.argv[2]) if len(sys.argv) > 2 else 100  # noqa: PLR2004
+    with tempfile.TemporaryDirectory() as tmp:
+        triggers = Path(tmp) / "triggers.db"
+        deferred = Path(tmp) / "deferred.db"
+        data = corpus(feeds, per_feed)
+        timings = {
+            "FTS triggers": load(triggers, data, deferred=False),
+            "deferred FTS": load(deferred, data, deferred=True),
+        }
+        same = results(triggers) == results(deferred)
+    baseline = timings["FTS triggers"]
+    print(f"{feeds} feeds x {per_feed} episodes, 5 chapters each")
+    for name, seconds in timings.items():
+        print(f"  {name:<14} {seconds:7.2f}s  {baseline / seconds:5.1f}x")
+    print(f"  search results identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
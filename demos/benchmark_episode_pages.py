@@ -0,0 +1,110 @@
+# ruff: noqa: INP001
+"""Compare OFFSET and keyset pagination of episodes at increasing depths.
+
+Run with: uv run python demos/benchmark_episode_pages.py [episodes]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.episode_query import (
+    DEFAULT_FIELDS,
+    DEFAULT_PAGE_SIZE,
+    format_cursor,
+)
+from overcast_to_sqlite.models import Episode, Feed
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+OFFSET_SQL = (
+    "SELECT e.overcastId, e.title, f.title, e.userUpdatedDate, e.played, "
+    "e.progress, e.userRecommendedDate IS NOT NULL "
+    "FROM episodes e LEFT JOIN feeds f ON f.overcastId = e.feedId "
+    "ORDER BY e.userUpdatedDate DESC, e.rowid DESC LIMIT ? OFFSET ?;"
+)
+
+
+def populate(db_path: Path, episodes: int) -> None:
+    with Datastore(str(db_path)) as db:
+        batch = 10_000
+        for offset in range(0, episodes, batch):
+            feed_id = offset // batch + 1
+            db.save_feed_and_episodes(
+                Feed(
+                    overcastId=feed_id,
+                    title=f"Feed {feed_id}",
+                    subscribed=True,
+                    notifications=False,
+                    xmlUrl=f"https://example.com/{feed_id}.xml",
+                    htmlUrl="https://example.com",
+                ),
+                [
+                    Episode(
+                        overcastId=i,
+                        feedId=feed_id,
+                        title=f"Episode {i}",
+                        url=f"https://example.com/{i}",
+                        overcastUrl=f"https://overcast.fm/+{i}",
+                        played=i % 3 == 0,
+                        userDeleted=False,
+                        enclosureUrl=f"https://cdn.example.com/{i}.mp3",
+                        progress=i % 3600,
+                        userUpdatedDate=(
+                            f"{2015 + i % 10}-{i % 12 + 1:02}-{i % 28 + 1:02}"
+                            f"T{i % 24:02}:{i % 60:02}:00"
+                        ),
+                    )
+                    for i in range(offset, min(offset + batch, episodes))
+                ],
+            )
+
+
+def best_of(call: Callable[[], object], repeat: int = 3) -> float:
+    """Return the best time in milliseconds to run call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "pages.db"
+        populate(db_path, episodes)
+        db = Datastore(str(db_path))
+        depths = [d for d in (0, 1_000, 10_000, 100_000, 400_000) if d < episodes]
+        keys = db.db.execute(
+            "SELECT userUpdatedDate, rowid FROM episodes "
+            "ORDER BY userUpdatedDate DESC, rowid DESC;",
+        ).fetchall()
+        # The cursor a reader holds after paging down to each depth.
+        cursors = {d: format_cursor(*keys[d - 1]) if d else None for d in depths}
+        print(f"{episodes:,} episodes, {DEFAULT_PAGE_SIZE} per page")
+        print(f"  {'depth':>8} {'offset':>10} {'keyset':>10}")
+        for depth in depths:
+            offset = best_of(
+                lambda depth=depth: db.db.execute(
+                    OFFSET_SQL,
+                    (DEFAULT_PAGE_SIZE, depth),
+                ).fetchall(),
+            )
+            keyset = best_of(
+                lambda depth=depth: db.episode_page(
+                    DEFAULT_FIELDS,
+                    after=cursors[depth],
+                ),
+            )
+            print(f"  {depth:>8,} {offset:>8.1f}ms {keyset:>8.1f}ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
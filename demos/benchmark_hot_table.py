@@ -0,0 +1,104 @@
+# ruff: noqa: INP001
+"""Compare narrow-column reads of episodes_extended and episodes_extended_hot.
+
+Run with: uv run python demos/benchmark_hot_table.py [episodes]
+"""
+
+import random
+import sqlite3
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from overcast_to_sqlite.datastore import Datastore
+
+# Reads the sync and HTML commands make, with {table} for either table.
+QUERIES = {
+    "transcripts": (
+        'SELECT title, "podcast:transcript:url", enclosureUrl FROM {table} '
+        'WHERE "podcast:transcript:url" IS NOT NULL '
+        "AND transcriptDownloadPath IS NULL;"
+    ),
+    "chapters": (
+        'SELECT enclosureUrl, guid, title, "podcast:chapters:url" FROM {table} '
+        'WHERE "podcast:chapters:url" IS NOT NULL;'
+    ),
+    "by pubDate": (
+        "SELECT enclosureUrl, link FROM {table} NOT INDEXED "
+        "ORDER BY pubDate DESC LIMIT 100;"
+    ),
+}
+
+
+def populate(db_path: Path, episodes: int) -> None:
+    rng = random.Random(42)
+    vocabulary = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        for _ in range(2_000)
+    ]
+
+    def html(paragraphs: int) -> str:
+        return "".join(
+            f"<p>{' '.join(rng.choices(vocabulary, k=60))}</p>\n"
+            for _ in range(paragraphs)
+        )
+
+    with Datastore(str(db_path)) as db, db.deferred_fts():
+        db.ensure_transcript_columns()
+        batch = 5_000
+        for offset in range(0, episodes, batch):
+            db.save_extended_feed_and_episodes(
+                {"xmlUrl": f"https://example.com/{offset}.xml", "title": "Feed"},
+                [
+                    {
+                        "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+                        "feedXmlUrl": f"https://example.com/{offset}.xml",
+                        "guid": f"guid-{i}",
+                        "title": " ".join(rng.choices(vocabulary, k=6)),
+                        "pubDate": f"{2000 + i % 25}-01-01T00:{i % 60:02}:00",
+                        "link": f"https://example.com/episodes/{i}",
+                        "podcast:transcript:url": (
+                            f"https://example.com/{i}.vtt" if i % 10 == 0 else None
+                        ),
+                        "podcast:chapters:url": (
+                            f"https://example.com/{i}.json" if i % 7 == 0 else None
+                        ),
+                        "description": html(rng.randint(2, 12)),
+                        "content:encoded": html(rng.randint(2, 12)),
+                    }
+                    for i in range(offset, min(offset + batch, episodes))
+                ],
+            )
+
+
+def timed(db_path: Path, sql: str, repeat: int = 3) -> float:
+    """Return the best time in milliseconds to run sql."""
+    best = float("inf")
+    for _ in range(repeat):
+        # A fresh connection with a small page cache, as a cold reader sees it.
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA cache_size = -2000;")
+        start = time.perf_counter()
+        conn.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - start)
+        conn.close()
+    return best * 1000
+
+
+def main() -> None:
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "hot.db"
+        populate(db_path, episodes)
+        print(f"{episodes:,} episodes")
+        print(f"  {'':<12} {'wide':>10} {'hot':>10}")
+        for name, sql in QUERIES.items():
+            wide = timed(db_path, sql.format(table="episodes_extended"))
+            hot = timed(db_path, sql.format(table="episodes_extended_hot"))
+            print(f"  {name:<12} {wide:>8.1f}ms {hot:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
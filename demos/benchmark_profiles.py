@@ -0,0 +1,103 @@
+# ruff: noqa: INP001
+"""Compare bulk-ingest time under SQLite's defaults and the ingest profile.
+
+Run with: uv run python demos/benchmark_profiles.py [feeds] [episodes_per_feed]
+"""
+
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.models import Episode, Feed
+from overcast_to_sqlite.profiles import INGEST_PROFILE, ConnectionProfile
+
+# What Datastore used before connection profiles: rollback journal, full sync.
+SQLITE_DEFAULTS = ConnectionProfile(
+    auto_vacuum="none",
+    journal_mode="delete",
+    synchronous="full",
+    cache_size=-2_000,
+    mmap_size=0,
+    temp_store="default",
+    optimize_on_close=False,
+)
+
+
+def _feed(feed_id: int) -> Feed:
+    return Feed(
+        overcastId=feed_id,
+        title=f"Feed {feed_id}",
+        subscribed=True,
+        notifications=False,
+        xmlUrl=f"https://example.com/{feed_id}.xml",
+        htmlUrl=f"https://example.com/{feed_id}",
+    )
+
+
+def _episode(feed_id: int, i: int) -> Episode:
+    overcast_id = feed_id * 100_000 + i
+    return Episode(
+        overcastId=overcast_id,
+        feedId=feed_id,
+        title=f"Episode {i} of feed {feed_id}",
+        url=f"https://example.com/{feed_id}/{i}",
+        overcastUrl=f"https://overcast.fm/+{overcast_id}",
+        played=i % 2 == 0,
+        userDeleted=False,
+        enclosureUrl=f"https://cdn.example.com/{feed_id}/{i}.mp3",
+        progress=i * 30,
+        userUpdatedDate="2025-01-02T00:00:00+00:00",
+    )
+
+
+def ingest(
+    db_path: Path,
+    profile: ConnectionProfile,
+    feeds: int,
+    per_feed: int,
+) -> float:
+    """Save feeds one transaction each, as `save` does, returning seconds taken."""
+    start = time.perf_counter()
+    with Datastore(str(db_path), profile) as db:
+        for feed_id in range(1, feeds + 1):
+            db.save_feed_and_episodes(
+                _feed(feed_id),
+                [_episode(feed_id, i) for i in range(per_feed)],
+            )
+            for i in range(0, per_feed, 10):
+                db.save_extended_feed_and_episodes(
+                    {"xmlUrl": f"https://example.com/{feed_id}.xml"},
+                    [
+                        {
+                            "enclosureUrl": f"https://cdn.example.com/{feed_id}/{i}.mp3",
+                            "description": "Lorem ipsum " * 40,
+                        },
+                    ],
+                )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    feeds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_feed = int(sys.argv[2]) if len(sys.argv) > 2 else 50  # noqa: PLR2004
+    profiles = {
+        "sqlite defaults": SQLITE_DEFAULTS,
+        "ingest profile": INGEST_PROFILE,
+        "ingest, no mmap": replace(INGEST_PROFILE, mmap_size=0),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = {
+            name: ingest(Path(tmp) / f"{n}.db", profile, feeds, per_feed)
+            for n, (name, profile) in enumerate(profiles.items())
+        }
+    baseline = timings["sqlite defaults"]
+    print(f"{feeds} feeds x {per_feed} episodes")
+    for name, seconds in timings.items():
+        print(f"  {name:<16} {seconds:7.2f}s  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
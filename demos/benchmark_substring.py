@@ -0,0 +1,99 @@
+# ruff: noqa: INP001
+"""Compare substring search with LIKE scans and with the trigram index.
+
+Run with: uv run python demos/benchmark_substring.py [episodes]
+"""
+
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from overcast_to_sqlite.datastore import Datastore
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+FRAGMENTS = ("ocke", "ntervie", "quantum", "zzq")
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+
+
+def populate(db: Datastore, episodes: int) -> None:
+    rng = random.Random(42)
+    vocabulary = [_word(rng) for _ in range(50_000)]
+    vocabulary += ["hockey", "rocket", "interview", "quantum"]
+    batch = 10_000
+    for offset in range(0, episodes, batch):
+        db.save_extended_feed_and_episodes(
+            {"xmlUrl": "https://example.com/feed.xml", "title": "Feed"},
+            [
+                {
+                    "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+                    "feedXmlUrl": "https://example.com/feed.xml",
+                    "title": " ".join(rng.choices(vocabulary, k=6)),
+                    "description": " ".join(rng.choices(vocabulary, k=80)),
+                }
+                for i in range(offset, min(offset + batch, episodes))
+            ],
+        )
+
+
+def timed(run: Callable[[], object], repeat: int = 3) -> tuple[float, object]:
+    """Return the best time in milliseconds and the result of run()."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main() -> None:
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        db = Datastore(str(db_path))
+        populate(db, episodes)
+        size = db_path.stat().st_size
+        start = time.perf_counter()
+        db.create_trigram_indexes()
+        db.db.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        print(
+            f"{episodes:,} episodes: trigram index built in "
+            f"{time.perf_counter() - start:.1f}s, "
+            f"+{(db_path.stat().st_size - size) / 2**20:.0f} MB",
+        )
+        headings = ("LIKE", "MATCH", "top 20")
+        print(f"  {'fragment':<10} {'matches':>8}", *(f"{h:>10}" for h in headings))
+        for fragment in FRAGMENTS:
+            like_ms, like = timed(
+                lambda f=f"%{fragment}%": db.db.execute(
+                    "SELECT count(*) FROM episodes_extended "
+                    "WHERE title LIKE ? OR description LIKE ?",
+                    [f, f],
+                ).fetchone()[0],
+            )
+            match_ms, match = timed(
+                lambda f=f'"{fragment}"': db.db.execute(
+                    "SELECT count(*) FROM episodes_extended_trigram "
+                    "WHERE episodes_extended_trigram MATCH ?",
+                    [f],
+                ).fetchone()[0],
+            )
+            search_ms, _ = timed(lambda f=fragment: db.search(f, substring=True))
+            assert like == match, (fragment, like, match)  # noqa: S101
+            print(
+                f"  {fragment:<10} {match:>8,} {like_ms:>8.1f}ms "
+                f"{match_ms:>8.1f}ms {search_ms:>8.1f}ms",
+            )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Content-addressed storage so identical archived files are kept only once."""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .download import CHUNK_SIZE
+
+if TYPE_CHECKING:
+    from .datastore import Datastore
+
+BLOB_KIND_CHAPTERS = "chapters"
+BLOB_KIND_ENCLOSURE = "enclosure"
+BLOB_KIND_TRANSCRIPT = "transcript"
+
+
+@dataclasses.dataclass
+class StoredBlob:
+    """A file in the blob store; created is False when it was already stored."""
+
+    sha256: str
+    path: Path
+    size: int
+    created: bool
+
+
+def hash_file(path: Path) -> str:
+    """Return the hex SHA-256 of a file, read in constant memory."""
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_path(root: Path, sha256: str, suffix: str) -> Path:
+    """Return root/ab/abcdef….suffix, sharded on the first byte of the hash."""
+    return root / sha256[:2] / f"{sha256}{suffix}"
+
+
+def store_blob(root: Path, source: Path, sha256: str | None = None) -> StoredBlob:
+    """Move source into the blob store under root.
+
+    Pass sha256 when it is already known to avoid reading source again. If a
+    blob with the same content is already stored, source is deleted and the
+    existing blob is returned instead.
+    """
+    sha256 = sha256 or hash_file(source)
+    size = source.stat().st_size
+    target = blob_path(root, sha256, source.suffix)
+    if target.parent.exists() and (
+        existing := next(target.parent.glob(f"{sha256}*"), None)
+    ):
+        if existing != source:
+            source.unlink()
+        return StoredBlob(sha256, existing, size, created=False)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    source.replace(target)
+    return StoredBlob(sha256, target, size, created=True)
+
+
+def adopt_legacy_transcripts(db: Datastore, root: Path) -> int:
+    """Move transcripts saved under title-derived paths into the blob store.
+
+    Returns the number of files adopted; copies with identical content are
+    removed from disk as they are adopted.
+    """
+    adopted: list[tuple[str, str, str, int]] = []
+    for enclosure, path_str in db.transcripts_outside_blob_store():
+        if not (path := Path(path_str)).is_file():
+            continue
+        blob = store_blob(root, path)
+        new_path = str(blob.path.absolute())
+        db.move_transcript(path_str, new_path)
+        adopted.append((enclosure, blob.sha256, new_path, blob.size))
+    db.save_blob_refs(BLOB_KIND_TRANSCRIPT, adopted)
+    return len(adopted)
+
+
+def verify_blobs(db: Datastore) -> list[tuple[str, str]]:
+    """Re-hash every stored blob, returning (path, problem) for each failure."""
+    problems = []
+    for sha256, path_str, size in db.get_blobs():
+        path = Path(path_str)
+        if not path.is_file():
+            problems.append((path_str, "missing"))
+        elif path.stat().st_size != size or hash_file(path) != sha256:
+            problems.append((path_str, "content does not match its hash"))
+    return problems
+
+
+def prune_blobs(db: Datastore) -> int:
+    """Delete blobs no longer referenced by any episode, returning the count."""
+    paths = db.delete_unreferenced_blobs()
+    for path_str in paths:
+        Path(path_str).unlink(missing_ok=True)
+    return len(paths)
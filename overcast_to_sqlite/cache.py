@@ -0,0 +1,140 @@
+"""Memoize read query results until the database changes."""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+DEFAULT_MAX_ENTRIES = 512
+
+
+def cache_path_for(db_path: str) -> Path:
+    """Return where to save the query cache of the database at db_path."""
+    return Path(f"{db_path}-cache.json")
+
+
+def database_fingerprint(db_path: str) -> list[list[int] | None]:
+    """Return the size and mtime of the database and its WAL.
+
+    Any committed write changes one of them, so a fingerprint that matches
+    the one saved with a cache file means the database is unchanged.
+    """
+    fingerprint: list[list[int] | None] = []
+    for path in (Path(db_path), Path(f"{db_path}-wal")):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            fingerprint.append(None)
+        else:
+            fingerprint.append([stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Counters for how well the cache is working."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class QueryCache:
+    """Least recently used cache of query results, optionally saved to disk.
+
+    Keys are (generation, sql, params), where generation identifies the
+    state of the database, so a write elsewhere simply stops old entries
+    from matching and they age out. Pass path to keep results between runs;
+    they are only reused if the database files are unchanged since saving.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        path: Path | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.path = path
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, list[tuple]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> list[tuple] | None:
+        """Return a copy of the cached rows for key, or None on a miss."""
+        with self._lock:
+            if (rows := self._entries.get(key)) is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return list(rows)
+
+    def put(self, key: Hashable, rows: list[tuple]) -> None:
+        """Cache rows for key, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = list(rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def load(self, generation: Hashable, fingerprint: list) -> int:
+        """Read saved entries into generation if the fingerprint still matches.
+
+        Returns the number of entries loaded.
+        """
+        if self.path is None or not self.path.is_file():
+            return 0
+        try:
+            saved = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return 0
+        if saved.get("fingerprint") != fingerprint:
+            return 0
+        entries = saved.get("entries", [])
+        for sql, params, rows in entries:
+            # Named parameters are saved as [name, value] lists.
+            key = tuple(tuple(p) if isinstance(p, list) else p for p in params)
+            self.put(
+                (generation, sql, key),
+                [tuple(row) for row in rows],
+            )
+        return len(entries)
+
+    def save(self, generation: Hashable, fingerprint: list) -> None:
+        """Write the entries cached for generation to path.
+
+        Entries whose rows are not JSON serializable stay in memory only.
+        """
+        if self.path is None:
+            return
+        entries = []
+        with self._lock:
+            for (entry_generation, sql, params), rows in self._entries.items():
+                if entry_generation != generation:
+                    continue
+                try:
+                    entries.append(json.dumps([sql, params, rows]))
+                except TypeError:
+                    continue
+        partial = self.path.with_name(f"{self.path.name}.part")
+        partial.write_text(
+            f'{{"fingerprint": {json.dumps(fingerprint)}, '
+            f'"entries": [{", ".join(entries)}]}}',
+        )
+        partial.replace(self.path)
@@ -1,39 +1,84 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor
+import tempfile
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 from podcast_chapter_tools.entities import ChapterType
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from overcast_to_sqlite.blobs import StoredBlob
+    from overcast_to_sqlite.profiles import ConnectionProfile
 from podcast_chapter_tools.extractors import (
     extract_description_chapters,
     extract_psc_chapters_from_file,
     get_and_extract_pci_chapters,
 )
 
-from overcast_to_sqlite.constants import BATCH_SIZE, CHAPTERS, FEEDS
+from overcast_to_sqlite.blobs import BLOB_KIND_CHAPTERS, store_blob
+from overcast_to_sqlite.constants import _CPU_COUNT, CHAPTERS, FEEDS
 from overcast_to_sqlite.datastore import Datastore
-from overcast_to_sqlite.more_itertools import chunked
+from overcast_to_sqlite.pipeline import fetch_pipeline
+from overcast_to_sqlite.profiles import INGEST_PROFILE
 from overcast_to_sqlite.utils import _headers_ua, _sanitize_for_path
 
+_DESCRIPTION_BATCH_SIZE = 1000
+_WRITE_BATCH_SIZE = 500
 
-def backfill_chapters_description(db: Datastore) -> None:
-    candidates = 0
+
+def _extract_description_batch(
+    batch: list[tuple[str, str, str]],
+) -> tuple[int, list[tuple[str, str, str, int, str, str | None, str | None]]]:
+    """Extract description chapters for a batch; runs inside a worker process."""
     found = 0
     to_insert = []
-
-    for url, guid, description in db.get_description_no_chapters():
-        candidates += 1
+    for url, guid, description in batch:
         if (chapters := extract_description_chapters(description)) is not None:
             found += 1
             to_insert.extend(
                 [(url, guid, ChapterType.DESCRIPTION.value, *c) for c in chapters],
             )
+    return found, to_insert
+
+
+def backfill_chapters_description(db: Datastore, workers: int = _CPU_COUNT) -> None:
+    candidates = 0
+    found = 0
+    batches = db.get_description_no_chapters(batch_size=_DESCRIPTION_BATCH_SIZE)
+
+    def _save(
+        batch_found: int,
+        to_insert: list[tuple[str, str, str, int, str, str | None, str | None]],
+    ) -> None:
+        nonlocal found
+        found += batch_found
+        db.insert_chapters(to_insert)
+
+    if workers <= 1:
+        for batch in batches:
+            candidates += len(batch)
+            _save(*_extract_description_batch(batch))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending: set[Future] = set()
+            for batch in batches:
+                candidates += len(batch)
+                pending.add(executor.submit(_extract_description_batch, batch))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _save(*future.result())
+            for future in as_completed(pending):
+                _save(*future.result())
     if found > 0:
         print(f"Description chapters: {found} podcasts in {candidates} candidates")
-    db.insert_chapters(to_insert)
 
 
 def backfill_chapters_pci(db: Datastore, chapters_path: Path) -> None:
@@ -43,31 +88,72 @@ def backfill_chapters_pci(db: Datastore, chapters_path: Path) -> None:
 
     def _get_and_extract(
         podcast: tuple[str, str, str, str],
-    ) -> None | list[tuple[str, str, str, int, str, str | None, str | None]]:
+    ) -> (
+        str
+        | tuple[
+            list[tuple[str, str, str, int, str, str | None, str | None]],
+            StoredBlob | None,
+        ]
+    ):
         enc_url, guid, title, chap_url = podcast
-        try:
-            extracted = get_and_extract_pci_chapters(
-                url=chap_url,
-                headers=_headers_ua(),
-                archive_path_json=chapters_path / f"{_sanitize_for_path(title)}.json",
-            )
-            if extracted is not None:
-                return [(enc_url, guid, ChapterType.PCI.value, *c) for c in extracted]
-        except Exception as e:  # noqa: BLE001
-            print(f"Error fetching PCI chapters for {title}: {e}")
-        return None
-
-    no_pci_chapters = list(db.get_no_pci_chapters())
-    chunks = chunked(no_pci_chapters, BATCH_SIZE)
-    for batch in chunks:
-        with ThreadPoolExecutor(max_workers=BATCH_SIZE) as executor:
-            to_insert = []
-            for result in executor.map(_get_and_extract, batch):
-                candidates += 1
-                if result is not None:
-                    to_insert.extend(result)
-                    found += 1
-            db.insert_chapters(to_insert)
+        # A directory of its own per fetch, as workers run at once and titles
+        # repeat; it sits under chapters_path so store_blob can rename from it.
+        with tempfile.TemporaryDirectory(dir=chapters_path) as tmp:
+            archive_path_json = Path(tmp) / "chapters.json"
+            try:
+                extracted = get_and_extract_pci_chapters(
+                    url=chap_url,
+                    headers=_headers_ua(),
+                    archive_path_json=archive_path_json,
+                )
+                if extracted is None:
+                    return "No chapters extracted"
+                blob = (
+                    store_blob(chapters_path, archive_path_json)
+                    if archive_path_json.is_file()
+                    else None
+                )
+            except Exception as e:  # noqa: BLE001
+                print(f"Error fetching PCI chapters for {title}: {e}")
+                return str(e)
+        return [(enc_url, guid, ChapterType.PCI.value, *c) for c in extracted], blob
+
+    to_insert: list[tuple[str, str, str, int, str, str | None, str | None]] = []
+    fetched: list[str] = []
+    failures: list[tuple[str, str, str]] = []
+    blob_refs: list[tuple[str, str, str, int]] = []
+
+    def _flush() -> None:
+        db.insert_chapters(to_insert)
+        db.save_blob_refs(BLOB_KIND_CHAPTERS, blob_refs)
+        db.clear_fetch_failures(fetched)
+        db.record_fetch_failures(ChapterType.PCI.value, failures)
+        to_insert.clear()
+        blob_refs.clear()
+        fetched.clear()
+        failures.clear()
+
+    for podcast, result in fetch_pipeline(
+        list(db.get_no_pci_chapters()),
+        _get_and_extract,
+        url_of=lambda podcast: podcast[3],
+    ):
+        candidates += 1
+        enc_url, _, _, chap_url = podcast
+        if isinstance(result, str):
+            failures.append((chap_url, enc_url, result))
+        else:
+            found += 1
+            rows, blob = result
+            to_insert.extend(rows)
+            fetched.append(chap_url)
+            if blob is not None:
+                blob_refs.append(
+                    (enc_url, blob.sha256, str(blob.path.absolute()), blob.size),
+                )
+        if len(to_insert) + len(failures) >= _WRITE_BATCH_SIZE:
+            _flush()
+    _flush()
     if found > 0:
         print(f"PCI chapters: {found} podcasts in {candidates} candidates")
 
@@ -90,8 +176,13 @@ def backfill_chapters_psc(db: Datastore, feeds_root: Path) -> None:
     db.insert_chapters(to_insert)
 
 
-def backfill_all_chapters(db_path: str, archive_root: Path) -> None:
-    db = Datastore(db_path)
-    backfill_chapters_description(db)
-    backfill_chapters_pci(db, archive_root / CHAPTERS)
-    backfill_chapters_psc(db, archive_root / FEEDS)
+def backfill_all_chapters(
+    db_path: str,
+    archive_root: Path,
+    workers: int = _CPU_COUNT,
+    profile: ConnectionProfile = INGEST_PROFILE,
+) -> None:
+    with Datastore(db_path, profile) as db, db.deferred_fts():
+        backfill_chapters_description(db, workers=workers)
+        backfill_chapters_pci(db, archive_root / CHAPTERS)
+        backfill_chapters_psc(db, archive_root / FEEDS)
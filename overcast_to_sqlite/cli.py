@@ -1,11 +1,17 @@
 #!/usr/bin/env python
+import dataclasses
+import functools
+import hashlib
+import json
 import os
+import sqlite3
+import sys
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING
 from xml.etree import ElementTree
 
 import click
-import requests
 
 from overcast_to_sqlite.chapters_backfill import backfill_all_chapters
 from overcast_to_sqlite.html.page import (
@@ -14,9 +20,27 @@ from overcast_to_sqlite.html.page import (
     generate_html_starred,
 )
 
-from .constants import BATCH_SIZE, TITLE
+from .blobs import (
+    BLOB_KIND_TRANSCRIPT,
+    StoredBlob,
+    adopt_legacy_transcripts,
+    prune_blobs,
+    store_blob,
+    verify_blobs,
+)
+from .cache import QueryCache, cache_path_for
+from .compressed import CODECS, DEFAULT_CODEC
+from .constants import _CPU_COUNT, BATCH_SIZE, TITLE
 from .datastore import Datastore
+from .download import download_to_file, partial_path_for
+from .enclosures import archive_enclosures, parse_size
+from .episode_query import DEFAULT_FIELDS as DEFAULT_EPISODE_FIELDS
+from .episode_query import DEFAULT_PAGE_SIZE, EPISODE_FIELDS, EpisodeFilter
+from .exceptions import DownloadError, RunInProgressError, SearchQueryError
 from .feed import fetch_xml_and_extract
+from .locking import run_lock
+from .maintenance import DEFAULT_VACUUM_PAGES
+from .maintenance import maintain as run_maintenance
 from .overcast import (
     _session_from_cookie,
     _session_from_json,
@@ -25,6 +49,16 @@ from .overcast import (
     extract_playlists_from_opml,
     fetch_opml,
 )
+from .pipeline import DEFAULT_PER_HOST, PipelineStats, fetch_pipeline
+from .pool import ReadPool
+from .profiles import (
+    DEFAULT_PROFILE,
+    INGEST_PROFILE,
+    READ_PROFILE,
+    ConnectionProfile,
+)
+from .storage import DEFAULT_SAMPLE
+from .transcripts import ingest_transcripts
 from .utils import (
     _archive_path,
     _file_extension_for_type,
@@ -32,6 +66,15 @@ from .utils import (
     _sanitize_for_path,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+_TRANSCRIPT_FLUSH_SIZE = 100
+_TRANSCRIPT_MAX_BYTES = 50 * 1024 * 1024
+_TRANSCRIPT_HOST_DELAY = 0.25
+# ctx.meta key for the --busy-timeout of the running command, in milliseconds.
+_BUSY_TIMEOUT = "overcast_to_sqlite.busy_timeout"
+
 
 @click.group()
 @click.version_option()
@@ -39,6 +82,112 @@ def cli() -> None:
     """Save listening history and feed/episode info from Overcast to SQLite."""
 
 
+def _open_datastore(
+    db_path: str,
+    profile: ConnectionProfile = DEFAULT_PROFILE,
+    *,
+    cache: bool = False,
+    verbose: bool = False,
+) -> Datastore:
+    """Open the database for the running command and close it when it ends.
+
+    With cache, read results are saved next to the database and reused by
+    later runs until the database changes. With verbose as well, how often
+    the cache was hit is printed when the command ends.
+    """
+    query_cache = QueryCache(path=cache_path_for(db_path)) if cache else None
+    db = Datastore(db_path, profile, query_cache)
+    context = click.get_current_context()
+    context.call_on_close(db.close)
+    if query_cache is not None and verbose:
+        context.call_on_close(functools.partial(_print_cache_stats, query_cache))
+    return db
+
+
+def _print_cache_stats(cache: QueryCache) -> None:
+    counts = cache.stats
+    print(
+        f"📊Query cache: {counts.hits} hits, {counts.misses} misses, "
+        f"{counts.evictions} evictions ({counts.hit_rate:.0%} hit rate)",
+    )
+
+
+def _read_concurrently[T](
+    db_path: str,
+    calls: list[Callable[[Datastore], T]],
+    *,
+    cache: bool = False,
+    verbose: bool = False,
+) -> list[T]:
+    """Run independent reads at once on a pool of read-only connections.
+
+    Query results are cached per connection, so with cache the reads run
+    in turn on the one cached connection instead.
+    """
+    if cache:
+        db = _open_datastore(db_path, READ_PROFILE, cache=True, verbose=verbose)
+        return [call(db) for call in calls]
+    with ReadPool(db_path, size=len(calls)) as pool:
+        return pool.map(calls)
+
+
+def _locked_run[**P, T](
+    command: Callable[P, T],
+    *,
+    only_with: str | None = None,
+) -> Callable[P, T]:
+    """Hold the database's run lock while command runs, so runs never overlap.
+
+    If another run holds the lock the command is skipped, or with --wait
+    it waits and fails if the lock is still held after that long. Commands
+    that only write when given a flag name it as only_with, and take the
+    lock only when it is set.
+    """
+
+    @click.option(
+        "--wait",
+        default=0.0,
+        type=click.FloatRange(min=0),
+        help="Seconds to wait for a running command on the same database",
+    )
+    @click.option(
+        "--busy-timeout",
+        default=DEFAULT_PROFILE.busy_timeout / 1000,
+        type=click.FloatRange(min=0),
+        help="Seconds a write waits for another connection before retrying",
+    )
+    @functools.wraps(command)
+    def run(*args: P.args, wait: float, busy_timeout: float, **kwargs: P.kwargs) -> T:
+        ctx = click.get_current_context()
+        db_path = str(kwargs["db_path"])
+        if only_with is not None and not kwargs[only_with]:
+            return command(*args, **kwargs)
+        try:
+            previous = ctx.with_resource(
+                run_lock(db_path, ctx.command_path, wait=wait),
+            )
+        except RunInProgressError as e:
+            if wait:
+                raise click.ClickException(str(e)) from e
+            print(f"⏭️Skipping, {e.holder or 'another run'} is still running")
+            ctx.exit(0)
+        if previous is not None:
+            print(f"⚠️The last run, {previous.command}, did not finish cleanly")
+        # A nested command, such as save within all, keeps the outer setting.
+        ctx.meta.setdefault(_BUSY_TIMEOUT, int(busy_timeout * 1000))
+        return command(*args, **kwargs)
+
+    return run
+
+
+def _locked_profile(profile: ConnectionProfile = INGEST_PROFILE) -> ConnectionProfile:
+    """Return profile with the running command's busy timeout."""
+    busy_timeout = click.get_current_context().meta.get(_BUSY_TIMEOUT)
+    if busy_timeout is None:
+        return profile
+    return dataclasses.replace(profile, busy_timeout=busy_timeout)
+
+
 def _run_auth_flow(auth_path: str) -> None:
     click.echo("Please login to Overcast")
     click.echo(
@@ -85,6 +234,7 @@ def auth(auth_path: str) -> None:
 )
 @click.option("-na", "--no-archive", is_flag=True)
 @click.option("-v", "--verbose", is_flag=True)
+@_locked_run
 def save(
     db_path: str,
     auth_path: str,
@@ -93,7 +243,7 @@ def save(
     verbose: bool,
 ) -> None:
     """Save Overcast info to SQLite database."""
-    db = Datastore(db_path)
+    db = _open_datastore(db_path, _locked_profile())
     ingested_feed_ids = set()
     if load:
         xml = Path(load).read_text()
@@ -111,7 +261,7 @@ def save(
     for playlist in extract_playlists_from_opml(root):
         if verbose:
             print(f"▶️Saving playlist: {playlist.title}")
-        db.save_playlist(playlist)
+        db.retry_busy(functools.partial(db.save_playlist, playlist))
 
     for feed, episodes in extract_feed_and_episodes_from_opml(root):
         if not episodes:
@@ -121,10 +271,10 @@ def save(
         if verbose:
             print(f"⤵️Saving {feed.title} (latest: {episodes[0].title})")
         ingested_feed_ids.add(feed.overcastId)
-        db.save_feed_and_episodes(feed, episodes)
+        db.retry_busy(functools.partial(db.save_feed_and_episodes, feed, episodes))
 
-    db.mark_feed_removed_if_missing(ingested_feed_ids)
-    db.cleanup_old_episodes()
+    db.retry_busy(functools.partial(db.mark_feed_removed_if_missing, ingested_feed_ids))
+    db.retry_busy(db.cleanup_old_episodes)
 
 
 def _auth_and_fetch(auth_path: str, archive: Path | None) -> str:
@@ -155,13 +305,14 @@ def _html_output_dir(db_path: str, output_path: str | None) -> Path:
 )
 @click.option("-na", "--no-archive", is_flag=True)
 @click.option("-v", "--verbose", is_flag=True)
+@_locked_run
 def extend(
     db_path: str,
     no_archive: bool,
     verbose: bool,
 ) -> None:
     """Download XML feed and extract all feed and episode tags and attributes."""
-    db = Datastore(db_path)
+    db = _open_datastore(db_path, _locked_profile())
     feeds_to_extend = db.get_feeds_to_extend()
     print(f"➡️Extending {len(feeds_to_extend)} feeds")
 
@@ -192,8 +343,82 @@ def extend(
 
     if verbose:
         print(f"Saving {len(results)} feeds to database")
-    for feed, episodes in results:
-        db.save_extended_feed_and_episodes(feed, episodes)
+    with db.deferred_fts():
+        for feed, episodes in results:
+            db.retry_busy(
+                functools.partial(db.save_extended_feed_and_episodes, feed, episodes),
+            )
+
+
+def _print_host_stats(stats: PipelineStats, *, verbose: bool) -> None:
+    if verbose:
+        for line in stats.summary():
+            print(f"📊{line}")
+
+
+def _download_transcript(
+    transcript: tuple[str, str, str, str, str, str | None, str | None],
+    *,
+    transcripts_path: Path,
+    verbose: bool,
+) -> tuple[str, str, str | None, str | None, StoredBlob] | str | None:
+    """Download one transcript into the blob store, returning an error string.
+
+    Returns (enclosure, path, etag, last_modified, blob) once it is stored.
+    """
+    title, url, mimetype, enclosure, _, etag, last_modified = transcript
+    if verbose:
+        print(f"⬇️Downloading {title} @ {url}")
+    incoming_path = transcripts_path / ".incoming"
+    file_stem = hashlib.sha256(url.encode()).hexdigest()
+    try:
+        result = download_to_file(
+            url,
+            partial_path_for(incoming_path, file_stem),
+            lambda headers: (
+                incoming_path
+                / (file_stem + _file_extension_for_type(headers, mimetype))
+            ),
+            headers=_headers_ua(),
+            max_bytes=_TRANSCRIPT_MAX_BYTES,
+            etag=etag,
+            last_modified=last_modified,
+        )
+    except DownloadError as e:
+        print(f"⛔ {e}")
+        return str(e)
+    if result.path is None:
+        if verbose:
+            print(f"✅{title} is unchanged")
+        return None
+    blob = store_blob(transcripts_path, result.path, result.sha256)
+    if verbose:
+        print(f"📝Saved {blob.path}" if blob.created else f"♻️{title} is a copy")
+    return (
+        enclosure,
+        str(blob.path.absolute()),
+        result.etag,
+        result.last_modified,
+        blob,
+    )
+
+
+def _save_transcripts(
+    db: Datastore,
+    completed: list[tuple[str, str, str | None, str | None, StoredBlob]],
+) -> int:
+    """Record a batch of stored transcripts, then empty it; returns its size."""
+    db.update_transcript_download_paths([row[:4] for row in completed])
+    db.save_blob_refs(
+        BLOB_KIND_TRANSCRIPT,
+        [
+            (enclosure, blob.sha256, path, blob.size)
+            for enclosure, path, *_, blob in completed
+        ],
+    )
+    saved = len(completed)
+    completed.clear()
+    return saved
 
 
 @cli.command()
@@ -209,15 +434,37 @@ def extend(
     type=click.Path(file_okay=False, dir_okay=True, allow_dash=False),
 )
 @click.option("-s", "--starred-only", is_flag=True)
+@click.option(
+    "-r",
+    "--refresh",
+    is_flag=True,
+    help="Revalidate already downloaded transcripts with conditional requests",
+)
+@click.option(
+    "--per-host",
+    default=DEFAULT_PER_HOST,
+    type=click.IntRange(min=1),
+    help="Concurrent downloads allowed from the same host",
+)
+@click.option(
+    "--host-delay",
+    default=_TRANSCRIPT_HOST_DELAY,
+    type=click.FloatRange(min=0),
+    help="Minimum seconds between starting downloads from the same host",
+)
 @click.option("-v", "--verbose", is_flag=True)
-def transcripts(  # noqa: C901
+@_locked_run
+def transcripts(  # noqa: PLR0913, PLR0917
     db_path: str,
     archive_path: str | None,
     starred_only: bool,
+    refresh: bool,
+    per_host: int,
+    host_delay: float,
     verbose: bool,
 ) -> None:
     """Download available transcripts for all or starred episodes."""
-    db = Datastore(db_path)
+    db = _open_datastore(db_path, _locked_profile())
 
     transcripts_path = (
         Path(archive_path) if archive_path else _archive_path(db_path, "transcripts")
@@ -225,58 +472,49 @@ def transcripts(  # noqa: C901
 
     transcripts_path.mkdir(parents=True, exist_ok=True)
 
-    if db.ensure_transcript_columns():
-        print("⚠️No transcript URLs found in database, please run `extend`")
-
     transcripts_to_download = list(
-        db.transcripts_to_download(starred_only=starred_only),
+        db.transcripts_to_download(starred_only=starred_only, refresh=refresh),
     )
 
     if verbose:
         print(f"🔉Downloading {len(transcripts_to_download)} transcripts...")
 
-    def _fetch_and_write_transcript(
-        transcript: tuple[str, str, str, str, str],
-    ) -> tuple[str, str] | None:
-
-        title, url, mimetype, enclosure, feed_title = transcript
-        if verbose:
-            print(f"⬇️Downloading {title} @ {url}")
-        try:
-            response = requests.get(url, headers=_headers_ua())
-        except requests.exceptions.RequestException as e:
-            print(f"⛔ Error downloading {url}: {e}")
-            return None
+    if (adopted := adopt_legacy_transcripts(db, transcripts_path)) and verbose:
+        print(f"📦Moved {adopted} existing transcripts into the blob store")
 
-        if not response.ok:
-            print(f"⛔ Error code {response.status_code} downloading {url}")
-            if verbose:
-                print(response.headers)
-            return None
-        feed_path = transcripts_path / _sanitize_for_path(feed_title)
-        feed_path.mkdir(exist_ok=True)
-        file_ext = _file_extension_for_type(response.headers, mimetype)
-        file_path = feed_path / (_sanitize_for_path(title) + file_ext)
-        if verbose:
-            print(f"📝Saving {file_path}")
-        with file_path.open(mode="wb") as file:
-            file.write(response.content)
-        return enclosure, str(file_path.absolute())
+    saved = 0
+    completed: list[tuple[str, str, str | None, str | None, StoredBlob]] = []
+    downloaded_paths: list[str] = []
+    host_stats = PipelineStats()
+    for _, row in fetch_pipeline(
+        transcripts_to_download,
+        functools.partial(
+            _download_transcript,
+            transcripts_path=transcripts_path,
+            verbose=verbose,
+        ),
+        url_of=lambda transcript: transcript[1],
+        per_host=per_host,
+        min_interval=host_delay,
+        is_error=lambda row: isinstance(row, str),
+        stats=host_stats,
+    ):
+        if isinstance(row, tuple):
+            completed.append(row)
+            if row[4].created:
+                downloaded_paths.append(row[1])
+        if len(completed) >= _TRANSCRIPT_FLUSH_SIZE:
+            saved += _save_transcripts(db, completed)
+            _print_host_stats(host_stats, verbose=verbose)
+    saved += _save_transcripts(db, completed)
 
-    with ThreadPoolExecutor(max_workers=BATCH_SIZE) as executor:
-        results = list(
-            executor.map(_fetch_and_write_transcript, transcripts_to_download),
-        )
+    _print_host_stats(host_stats, verbose=verbose)
+    if verbose:
+        print(f"Saved {saved} transcripts to database")
 
+    indexed = ingest_transcripts(db, downloaded_paths, verbose=verbose)
     if verbose:
-        print(f"Saving {len(results)} transcripts to database")
-    for row in results:
-        if row is not None:
-            enclosure, file_path = row
-            db.update_transcript_download_paths(
-                enclosure,
-                str(file_path),
-            )
+        print(f"🔎Indexed {indexed} transcripts for search")
 
 
 @cli.command()
@@ -291,15 +529,166 @@ def transcripts(  # noqa: C901
     "archive_path",
     type=click.Path(file_okay=False, dir_okay=True, allow_dash=False),
 )
+@click.option(
+    "-w",
+    "--workers",
+    default=_CPU_COUNT,
+    type=click.IntRange(min=1),
+    help="Processes used to extract chapters from descriptions",
+)
+@_locked_run
 def chapters(
     db_path: str,
     archive_path: str | None,
+    workers: int,
 ) -> None:
     """Download and store available chapters for all or starred episodes."""
     archive_root = (
         Path(archive_path) if archive_path else Path(db_path).parent / "archive"
     )
-    backfill_all_chapters(db_path, archive_root)
+    backfill_all_chapters(
+        db_path,
+        archive_root,
+        workers=workers,
+        profile=_locked_profile(),
+    )
+
+
+@cli.command()
+@click.argument(
+    "db_path",
+    type=click.Path(file_okay=True, dir_okay=False, allow_dash=False),
+    default="overcast.db",
+)
+@click.option(
+    "-p",
+    "--path",
+    "archive_path",
+    type=click.Path(file_okay=False, dir_okay=True, allow_dash=False),
+)
+@click.option("-s", "--starred", is_flag=True, help="Archive starred episodes")
+@click.option("--played", is_flag=True, help="Archive played episodes")
+@click.option(
+    "-f",
+    "--feed",
+    "feeds",
+    multiple=True,
+    help="Only archive episodes of the feed with this title (repeatable)",
+)
+@click.option(
+    "-q",
+    "--quota",
+    help="Total size to keep, e.g. 20G; least recently used audio is evicted",
+)
+@click.option("-v", "--verbose", is_flag=True)
+@_locked_run
+def enclosures(  # noqa: PLR0913, PLR0917
+    db_path: str,
+    archive_path: str | None,
+    starred: bool,
+    played: bool,
+    feeds: tuple[str, ...],
+    quota: str | None,
+    verbose: bool,
+) -> None:
+    """Download episode audio for starred (default) or played episodes."""
+    try:
+        quota_bytes = parse_size(quota) if quota else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--quota") from e
+    downloaded = archive_enclosures(
+        _open_datastore(db_path, _locked_profile()),
+        Path(archive_path) if archive_path else _archive_path(db_path, "enclosures"),
+        starred=starred or not played,
+        played=played,
+        feeds=feeds,
+        quota_bytes=quota_bytes,
+        verbose=verbose,
+    )
+    print(f"🎧Downloaded {downloaded} episodes")
+
+
+@cli.command()
+@click.argument(
+    "db_path",
+    type=click.Path(file_okay=True, dir_okay=False, allow_dash=False),
+    default="overcast.db",
+)
+@click.option(
+    "--prune",
+    is_flag=True,
+    help="Delete archived files no longer referenced by any episode",
+)
+@functools.partial(_locked_run, only_with="prune")
+def verify(db_path: str, prune: bool) -> None:
+    """Check archived transcripts, chapters and audio against their hashes."""
+    db = _open_datastore(db_path, _locked_profile(DEFAULT_PROFILE))
+    if prune:
+        print(f"🗑️Pruned {prune_blobs(db)} unreferenced files")
+    problems = verify_blobs(db)
+    for path, problem in problems:
+        print(f"⛔ {path}: {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"✅Verified {len(db.get_blobs())} archived files")
+
+
+@cli.command()
+@click.argument(
+    "db_path",
+    type=click.Path(file_okay=True, dir_okay=False, allow_dash=False),
+    default="overcast.db",
+)
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Full integrity check, ANALYZE and FTS optimize, and a one-time VACUUM "
+    "to enable incremental vacuum; holds the write lock for longer",
+)
+@click.option(
+    "--vacuum-pages",
+    default=DEFAULT_VACUUM_PAGES,
+    type=click.IntRange(min=0),
+    help="Most free pages to return to the filesystem",
+)
+@click.option(
+    "--vacuum-into",
+    "vacuum_target",
+    type=click.Path(file_okay=True, dir_okay=False, allow_dash=False, path_type=Path),
+    help="Also write a compacted copy of the database to this new file",
+)
+@_locked_run
+def maintain(
+    db_path: str,
+    full: bool,
+    vacuum_pages: int,
+    vacuum_target: Path | None,
+) -> None:
+    """Check, defragment, analyze and vacuum the database; safe to run from cron."""
+    if vacuum_target is not None and vacuum_target.exists():
+        msg = f"{vacuum_target} already exists"
+        raise click.BadParameter(msg, param_hint="--vacuum-into")
+    db = _open_datastore(db_path, _locked_profile(DEFAULT_PROFILE))
+    steps = run_maintenance(
+        db,
+        full=full,
+        vacuum_pages=vacuum_pages,
+        vacuum_target=vacuum_target,
+    )
+    for step in steps:
+        print(
+            f"  {step.name:<12} {step.seconds:7.2f}s "
+            f"{_format_bytes(step.reclaimed_bytes):>10}  {step.detail}",
+        )
+    problems = [problem for step in steps for problem in step.problems]
+    for problem in problems:
+        print(f"⛔ {problem}")
+    if problems:
+        sys.exit(1)
+    reclaimed = sum(
+        step.reclaimed_bytes for step in steps if step.name != "vacuum into"
+    )
+    print(f"✅Reclaimed {_format_bytes(reclaimed)}")
 
 
 @cli.command()
@@ -314,9 +703,17 @@ def chapters(
     "output_path",
     type=click.Path(file_okay=False, dir_okay=True, allow_dash=False),
 )
+@click.option(
+    "--cache",
+    is_flag=True,
+    help="Reuse query results saved by earlier runs while the database is unchanged",
+)
+@click.option("-v", "--verbose", is_flag=True)
 def html(
     db_path: str,
     output_path: str | None,
+    cache: bool,
+    verbose: bool,
 ) -> None:
     """Generate HTML pages for recently played, starred, and deleted episodes."""
     output_dir = _html_output_dir(db_path=db_path, output_path=output_path)
@@ -325,9 +722,16 @@ def html(
     starred_path = output_dir / "overcast-starred.html"
     deleted_path = output_dir / "overcast-deleted.html"
 
-    generate_html_played(db_path, played_path)
-    generate_html_starred(db_path, starred_path)
-    generate_html_deleted(db_path, deleted_path)
+    _read_concurrently(
+        db_path,
+        [
+            functools.partial(generate_html_played, html_output_path=played_path),
+            functools.partial(generate_html_starred, html_output_path=starred_path),
+            functools.partial(generate_html_deleted, html_output_path=deleted_path),
+        ],
+        cache=cache,
+        verbose=verbose,
+    )
 
     print("📝Saved HTML files to:")
     print(f"  Recently Played: file://{played_path.absolute()}")
@@ -351,6 +755,7 @@ def html(
     help="Path to auth.json file",
 )
 @click.option("-v", "--verbose", is_flag=True)
+@_locked_run
 def save_extend_download(
     ctx: click.core.Context,
     db_path: str,
@@ -376,12 +781,16 @@ def save_extend_download(
         db_path=db_path,
         archive_path=None,
         starred_only=False,
+        refresh=False,
+        per_host=DEFAULT_PER_HOST,
+        host_delay=_TRANSCRIPT_HOST_DELAY,
         verbose=verbose,
     )
     ctx.invoke(
         chapters,
         db_path=db_path,
         archive_path=None,
+        workers=_CPU_COUNT,
     )
 
 
@@ -394,16 +803,142 @@ def _format_duration(seconds: int) -> str:
     return f"{minutes}m"
 
 
+def _format_bytes(size: int) -> str:
+    """Format a byte count with a binary unit, e.g. 1.5 MiB."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024 or unit == "GiB":  # noqa: PLR2004
+            break
+        size /= 1024
+    return f"{size:,.0f} {unit}" if unit == "B" else f"{size:,.1f} {unit}"
+
+
+def _format_timestamp(seconds: float) -> str:
+    """Format an offset in seconds as H:MM:SS or M:SS."""
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours > 0:
+        return f"{hours}:{minutes:02}:{secs:02}"
+    return f"{minutes}:{secs:02}"
+
+
+@cli.command("storage-report")
+@click.argument(
+    "db_path",
+    type=click.Path(file_okay=True, dir_okay=False, allow_dash=False),
+    default="overcast.db",
+)
+@click.option(
+    "--sample",
+    default=DEFAULT_SAMPLE,
+    type=click.IntRange(min=1),
+    help="Rows sampled per table to measure its columns",
+)
+@click.option(
+    "--top",
+    default=20,
+    type=click.IntRange(min=0),
+    help="Objects and columns to list, largest first (0 for all)",
+)
+def storage_report(db_path: str, sample: int, top: int) -> None:
+    """Show which tables, indexes and columns take up the database's space."""
+    db = _open_datastore(db_path, READ_PROFILE)
+    try:
+        report = db.storage_report(sample=sample)
+    except sqlite3.OperationalError as e:
+        if "no such table: dbstat" not in str(e):
+            raise
+        msg = (
+            "storage-report needs the dbstat virtual table, which this SQLite "
+            "was built without (SQLITE_ENABLE_DBSTAT_VTAB)"
+        )
+        raise click.ClickException(msg) from e
+    limit = top or None
+
+    print(
+        f"{_format_bytes(report.size)} in {report.page_count:,} pages of "
+        f"{_format_bytes(report.page_size)}, {report.freelist_count:,} free",
+    )
+    print()
+    print(
+        f"  {'object':<36} {'kind':<6} {'size':>10} {'pages':>8} "
+        f"{'rows':>10} {'unused':>7}",
+    )
+    for usage in report.objects[:limit]:
+        rows = "" if usage.rows is None else f"{usage.rows:,}"
+        print(
+            f"  {usage.name:<36} {usage.kind:<6} {_format_bytes(usage.size):>10} "
+            f"{usage.pages:>8,} {rows:>10} {usage.unused / usage.size:>7.0%}",
+        )
+    print()
+    print(
+        f"  {'column (sampled up to ' + f'{sample:,} rows)':<48} {'null':>5} "
+        f"{'avg bytes':>10} {'est. size':>10}",
+    )
+    for column in report.columns[:limit]:
+        print(
+            f"  {column.table + '.' + column.name:<48} {column.null_ratio:>5.0%} "
+            f"{column.avg_payload:>10,.0f} {_format_bytes(column.estimated_size):>10}",
+        )
+    if report.candidates:
+        print()
+        print("Candidates")
+        for candidate in report.candidates:
+            print(f"  {candidate.action:<10} {candidate.target:<48} {candidate.reason}")
+
+
 @cli.command()
 @click.argument(
     "db_path",
     type=click.Path(file_okay=True, dir_okay=False, allow_dash=False),
     default="overcast.db",
 )
-def stats(db_path: str) -> None:
+@click.option(
+    "--verify",
+    "verify_only",
+    is_flag=True,
+    help="Recount the statistics and report any drift from the stored values",
+)
+@click.option(
+    "--rebuild",
+    is_flag=True,
+    help="Recompute the stored statistics from scratch before showing them",
+)
+@click.option(
+    "--cache",
+    is_flag=True,
+    help="Reuse query results saved by earlier runs while the database is unchanged",
+)
+@click.option("-v", "--verbose", is_flag=True)
+@functools.partial(_locked_run, only_with="rebuild")
+def stats(
+    db_path: str,
+    verify_only: bool,
+    rebuild: bool,
+    cache: bool,
+    verbose: bool,
+) -> None:
     """Show listening statistics."""
-    db = Datastore(db_path)
-    listening_stats = db.get_listening_stats()
+    if rebuild:
+        with Datastore(db_path, _locked_profile(DEFAULT_PROFILE)) as db:
+            db.rebuild_stats()
+    if verify_only:
+        problems = _open_datastore(db_path, READ_PROFILE).verify_stats()
+        for problem in problems:
+            print(f"⛔ {problem}")
+        if problems:
+            sys.exit(1)
+        print("✅Statistics match a full recount")
+        return
+    listening_stats, top_episodes, top_time = _read_concurrently(
+        db_path,
+        [
+            Datastore.get_listening_stats,
+            Datastore.get_top_podcasts_by_episodes,
+            Datastore.get_top_podcasts_by_time,
+        ],
+        cache=cache,
+        verbose=verbose,
+    )
 
     print("Listening Statistics")
     print("=" * 40)
@@ -416,7 +951,6 @@ def stats(db_path: str) -> None:
     print(f"  Feeds subscribed:     {listening_stats['feeds_subscribed']:,}")
     print(f"  Feeds removed:        {listening_stats['feeds_removed']:,}")
 
-    top_episodes = db.get_top_podcasts_by_episodes()
     if top_episodes:
         print()
         print("Top Podcasts by Episodes Played")
@@ -424,7 +958,6 @@ def stats(db_path: str) -> None:
         for i, (title, count) in enumerate(top_episodes, 1):
             print(f"  {i:2}. {title:<30} {count:>5}")
 
-    top_time = db.get_top_podcasts_by_time()
     if top_time:
         print()
         print("Top Podcasts by Listening Time")
@@ -445,35 +978,195 @@ def stats(db_path: str) -> None:
     "--limit",
     default=20,
     type=int,
-    help="Maximum number of results per category",
+    help="Maximum number of results per page",
 )
-def search(query: str, db_path: str, limit: int) -> None:
-    """Search episodes, feeds, and chapters using full-text search."""
-    db = Datastore(db_path)
+@click.option(
+    "--after",
+    help="Show the page after this cursor, as printed below the previous page",
+)
+@click.option(
+    "--raw",
+    is_flag=True,
+    help="Use FTS5 query syntax (AND, OR, NOT, NEAR, column filters) as is",
+)
+@click.option(
+    "-s",
+    "--substring",
+    is_flag=True,
+    help="Also match words inside other words, after whole-word matches "
+    "(needs substring-index)",
+)
+@click.option(
+    "--cache",
+    is_flag=True,
+    help="Reuse query results saved by earlier runs while the database is unchanged",
+)
+@click.option("-v", "--verbose", is_flag=True)
+def search(  # noqa: PLR0913, PLR0917
+    query: str,
+    db_path: str,
+    limit: int,
+    after: str | None,
+    raw: bool,
+    substring: bool,
+    cache: bool,
+    verbose: bool,
+) -> None:
+    """Search episodes, feeds, chapters, and transcripts using full-text search.
 
-    episodes = db.search_episodes(query=query, limit=limit)
-    feeds = db.search_feeds(query=query, limit=limit)
-    chapters = db.search_chapters(query=query, limit=limit)
+    Results from all four are ranked together by relevance, with matching
+    words highlighted in [brackets].
+    """
+    db = _open_datastore(db_path, READ_PROFILE, cache=cache, verbose=verbose)
+    if substring and not db.has_trigram_indexes():
+        msg = "Run substring-index first to build the substring search index"
+        raise click.UsageError(msg)
+    try:
+        page = db.search(
+            query,
+            limit=limit,
+            after=after,
+            raw=raw,
+            substring=substring,
+        )
+    except SearchQueryError as e:
+        raise click.BadParameter(str(e), param_hint="QUERY") from e
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--after") from e
 
-    if not episodes and not feeds and not chapters:
+    if not page.hits:
         print(f"No results found for '{query}'")
         return
 
-    if episodes:
-        print(f"\nEpisodes ({len(episodes)} results)")
-        for ep_title, feed_title in episodes:
-            feed = feed_title or "Unknown"
-            print(f'  "{ep_title}" -- {feed}')
-
-    if feeds:
-        print(f"\nFeeds ({len(feeds)} results)")
-        for (feed_title,) in feeds:
-            print(f"  {feed_title}")
-
-    if chapters:
-        print(f"\nChapters ({len(chapters)} results)")
-        for (content,) in chapters:
-            print(f"  {content}")
+    for hit in page.hits:
+        if hit.kind == "feed":
+            heading = hit.title
+        else:
+            heading = f'"{hit.title}" -- {hit.context or "Unknown"}'
+        if hit.start is not None:
+            heading = f"[{_format_timestamp(hit.start)}] {heading}"
+        print(f"  {hit.kind:<10} {heading}")
+        print(f"             {' '.join(hit.snippet.split())}")
+
+    if page.next_cursor is not None:
+        print(f"\nMore results: --after={page.next_cursor}")
+
+
+@cli.command()
+@click.argument(
+    "db_path",
+    type=click.Path(file_okay=True, dir_okay=False, allow_dash=False),
+    default="overcast.db",
+)
+@click.option(
+    "-f",
+    "--fields",
+    default=",".join(DEFAULT_EPISODE_FIELDS),
+    show_default=True,
+    help=f"Comma-separated fields to print, from: {', '.join(EPISODE_FIELDS)}",
+)
+@click.option("--feed-id", type=int, help="Only episodes of this feed")
+@click.option("--since", help="Only episodes updated on or after this date")
+@click.option("--until", help="Only episodes updated before this date")
+@click.option("--starred/--not-starred", default=None, help="Filter by starred")
+@click.option("--played/--unplayed", default=None, help="Filter by played")
+@click.option(
+    "-l",
+    "--limit",
+    default=DEFAULT_PAGE_SIZE,
+    type=int,
+    help="Maximum number of episodes per page",
+)
+@click.option(
+    "--after",
+    help="Show the page after this cursor, as printed below the previous page",
+)
+@click.option(
+    "--all",
+    "all_pages",
+    is_flag=True,
+    help="Print every matching episode instead of one page",
+)
+def episodes(  # noqa: PLR0913, PLR0917
+    db_path: str,
+    fields: str,
+    feed_id: int | None,
+    since: str | None,
+    until: str | None,
+    starred: bool | None,
+    played: bool | None,
+    limit: int,
+    after: str | None,
+    all_pages: bool,
+) -> None:
+    """List episodes as JSON lines, most recently updated first."""
+    db = _open_datastore(db_path, READ_PROFILE)
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    if unknown := [field for field in selected if field not in EPISODE_FIELDS]:
+        msg = f"Unknown fields: {', '.join(unknown)}"
+        raise click.BadParameter(msg, param_hint="--fields")
+    filters = EpisodeFilter(feed_id, since, until, starred, played)
+    try:
+        if all_pages:
+            for episode in db.iter_episodes(selected, filters, after=after):
+                print(json.dumps(episode))
+            return
+        page = db.episode_page(selected, filters, after=after, limit=limit)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--after") from e
+
+    for episode in page.episodes:
+        print(json.dumps(episode))
+    if page.next_cursor is not None:
+        print(f"\nMore episodes: --after={page.next_cursor}", file=sys.stderr)
+
+
+@cli.command("substring-index")
+@click.argument(
+    "db_path",
+    type=click.Path(file_okay=True, dir_okay=False, allow_dash=False),
+    default="overcast.db",
+)
+@click.option("--drop", is_flag=True, help="Remove the index instead")
+@_locked_run
+def substring_index(db_path: str, drop: bool) -> None:
+    """Build the trigram index that lets search --substring match inside words."""
+    db = _open_datastore(db_path, _locked_profile(DEFAULT_PROFILE))
+    if drop:
+        db.drop_trigram_indexes()
+        print("🗑️Dropped the substring search index")
+        return
+    db.create_trigram_indexes()
+    print("✅Built the substring search index")
+
+
+@cli.command("compress-text")
+@click.argument(
+    "db_path",
+    type=click.Path(file_okay=True, dir_okay=False, allow_dash=False),
+    default="overcast.db",
+)
+@click.option(
+    "--codec",
+    type=click.Choice(CODECS),
+    default=DEFAULT_CODEC,
+    show_default=True,
+    help="Compression to store episode text with",
+)
+@click.option("--decompress", is_flag=True, help="Store the text uncompressed again")
+@_locked_run
+def compress_text(db_path: str, codec: str, decompress: bool) -> None:
+    """Compress episode content:encoded to shrink the database."""
+    db = _open_datastore(db_path, _locked_profile(DEFAULT_PROFILE))
+    if decompress:
+        before, after = db.decompress_text_columns()
+        done = "Decompressed episode text"
+    else:
+        before, after = db.compress_text_columns(codec)
+        done = f"Compressed episode text with {codec}"
+    print(f"✅{done}: {_format_bytes(before)} → {_format_bytes(after)}")
+    if after < before:
+        print("Run maintain to return the freed pages to the filesystem")
 
 
 if __name__ == "__main__":
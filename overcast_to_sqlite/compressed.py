@@ -0,0 +1,144 @@
+"""Opt-in compression of the long HTML text columns of episodes_extended.
+
+Compressed values are stored as BLOBs in place of the text, so the
+narrow columns of each row fit in fewer pages. The decompress() SQL
+function, registered on every Datastore connection, returns the text of
+a value whether or not it is compressed. Only columns no full-text index
+reads are compressed, so no trigger, view or index depends on the
+function and other tools can keep using the database as is.
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import TYPE_CHECKING
+
+from .constants import (
+    COMPRESSED_COLUMNS,
+    CONTENT_ENCODED,
+    EPISODES_EXTENDED,
+)
+
+try:
+    from compression import zstd
+except ImportError:  # Python built without libzstd
+    zstd = None
+
+if TYPE_CHECKING:
+    from sqlite_utils import Database
+
+DEFAULT_CODEC = "zlib"
+CODECS = ("zlib", "zstd") if zstd is not None else ("zlib",)
+# Columns that can be compressed. description is left out: the word and
+# trigram indexes read it, and their triggers could not without decompress().
+COMPRESSIBLE_COLUMNS = {EPISODES_EXTENDED: (CONTENT_ENCODED,)}
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def compress_text(text: str | None, codec: str = DEFAULT_CODEC) -> str | bytes | None:
+    """Compress text with codec, keeping it as text if that is no smaller."""
+    if not isinstance(text, str):
+        return text
+    raw = text.encode()
+    blob = zstd.compress(raw) if codec == "zstd" and zstd else zlib.compress(raw)
+    return blob if len(blob) < len(raw) else text
+
+
+def decompress_text(value: str | bytes | None) -> str | None:
+    """Return the text of a value from a compressible column."""
+    if not isinstance(value, bytes):
+        return value
+    if value.startswith(_ZSTD_MAGIC):
+        if zstd is None:
+            msg = "zstd-compressed text needs Python built with zstd"
+            raise RuntimeError(msg)
+        return zstd.decompress(value).decode()
+    return zlib.decompress(value).decode()
+
+
+def register_functions(db: Database) -> None:
+    """Make decompress() available to queries."""
+    db.register_function(
+        decompress_text,
+        deterministic=True,
+        replace=True,
+        name="decompress",
+    )
+
+
+def column_codecs(db: Database, table: str) -> dict[str, str]:
+    """Map each compressed column of table to its codec."""
+    if (
+        db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;",
+            [COMPRESSED_COLUMNS],
+        ).fetchone()
+        is None
+    ):
+        return {}
+    return dict(
+        db.execute(
+            f"SELECT columnName, codec FROM {COMPRESSED_COLUMNS} WHERE tableName = ?;",
+            [table],
+        ).fetchall(),
+    )
+
+
+def stored_bytes(db: Database, table: str) -> int:
+    """Return the bytes the compressible columns of table take up as stored."""
+    existing = {row[1] for row in db.execute(f"PRAGMA table_info({table});")}
+    columns = [c for c in COMPRESSIBLE_COLUMNS[table] if c in existing]
+    if not columns:
+        return 0
+    lengths = " + ".join(f'coalesce(length(CAST("{c}" AS BLOB)), 0)' for c in columns)
+    return db.execute(f"SELECT coalesce(sum({lengths}), 0) FROM {table};").fetchone()[0]
+
+
+def compress_columns(db: Database, table: str, codec: str) -> None:
+    """Compress the text of every row and record the codec for new rows.
+
+    Runs inside the caller's transaction, with full-text triggers dropped
+    so rewriting the rows does not reindex them.
+    """
+    existing = {row[1] for row in db.execute(f"PRAGMA table_info({table});")}
+    previous = column_codecs(db, table)
+    db.execute(
+        f"CREATE TABLE IF NOT EXISTS {COMPRESSED_COLUMNS} ("
+        "tableName TEXT NOT NULL, columnName TEXT NOT NULL, codec TEXT NOT NULL, "
+        "PRIMARY KEY (tableName, columnName));",
+    )
+    db.register_function(
+        lambda text: compress_text(text, codec),
+        deterministic=True,
+        replace=True,
+        name="compress",
+    )
+    for column in COMPRESSIBLE_COLUMNS[table]:
+        if column not in existing:
+            db.execute(f'ALTER TABLE {table} ADD COLUMN "{column}" TEXT;')
+        # Values already compressed with another codec are recompressed.
+        if previous.get(column) == codec:
+            where = f"typeof(\"{column}\") = 'text'"
+        else:
+            where = f'"{column}" IS NOT NULL'
+        db.execute(
+            f'UPDATE {table} SET "{column}" = compress(decompress("{column}")) '
+            f"WHERE {where};",
+        )
+        db.execute(
+            f"INSERT OR REPLACE INTO {COMPRESSED_COLUMNS} VALUES (?, ?, ?);",
+            [table, column, codec],
+        )
+
+
+def decompress_columns(db: Database, table: str) -> None:
+    """Store the text of every row uncompressed again and forget the codecs.
+
+    Runs inside the caller's transaction, with full-text triggers dropped.
+    """
+    for column in column_codecs(db, table):
+        db.execute(
+            f'UPDATE {table} SET "{column}" = decompress("{column}") '
+            f"WHERE typeof(\"{column}\") = 'blob';",
+        )
+    db.execute(f"DELETE FROM {COMPRESSED_COLUMNS} WHERE tableName = ?;", [table])
@@ -1,32 +1,55 @@
 from os import cpu_count
 
+BLOBS = "blobs"
+BLOB_REFS = "blob_refs"
 CHAPTERS = "chapters"
+CHAPTERS_URL = '"podcast:chapters:url"'
+COMPRESSED_COLUMNS = "compressed_columns"
 CONTENT = "content"
+CONTENT_ENCODED = "content:encoded"
 DESCRIPTION = "description"
 ENCLOSURE_DL_PATH = "enclosureDownloadPath"
+ENCLOSURE_DOWNLOADED_AT = "enclosureDownloadedAt"
+ENCLOSURE_ID = "enclosureId"
+ENCLOSURE_SHA256 = "enclosureSha256"
+ENCLOSURE_SIZE = "enclosureSize"
+ENCLOSURE_SOURCE_URL = "enclosureSourceUrl"
 ENCLOSURE_URL = "enclosureUrl"
+ENCLOSURES = "enclosures"
 EPISODES = "episodes"
 EPISODES_EXTENDED = "episodes_extended"
+EPISODES_EXTENDED_HOT = "episodes_extended_hot"
 FEEDS = "feeds"
 FEEDS_EXTENDED = "feeds_extended"
 FEED_ID = "feedId"
+FEED_STATS = "feed_stats"
 FEED_TITLE = "feedTitle"
 FEED_XML_URL = "feedXmlUrl"
+FETCH_FAILURES = "fetch_failures"
+FTS_PENDING = "fts_pending"
+FTS_SUSPENDED_TRIGGERS = "fts_suspended_triggers"
 GUID = "guid"
 IMAGE = "image"
 INCLUDE_PODCAST_IDS = "includePodcastIds"
 LAST_UPDATED = "lastUpdated"
 LINK = "link"
 OVERCAST_ID = "overcastId"
+PLAYED_PROGRESS = 300  # seconds listened after which an episode counts as played
 PLAYLISTS = "playlists"
 PROGRESS = "progress"
 PUB_DATE = "pubDate"
+SHA256 = "sha256"
 SMART = "smart"
 SORTING = "sorting"
 SOURCE = "source"
+STATS_SUMMARY = "stats_summary"
 TIME = "time"
 TITLE = "title"
+TRANSCRIPTS = "transcripts"
 TRANSCRIPT_DL_PATH = "transcriptDownloadPath"
+TRANSCRIPT_ETAG = "transcriptEtag"
+TRANSCRIPT_LAST_MODIFIED = "transcriptLastModified"
+TRANSCRIPT_SEGMENTS = "transcript_segments"
 TRANSCRIPT_TYPE = '"podcast:transcript:type"'
 TRANSCRIPT_URL = '"podcast:transcript:url"'
 URL = "url"
@@ -1,55 +1,120 @@
 from __future__ import annotations
 
 # mypy: disable-error-code="union-attr"
+import contextlib
 import datetime
+import json
 import os
 import sqlite3
-from typing import TYPE_CHECKING, cast
+import zlib
+from typing import TYPE_CHECKING, Self, cast
 
 from sqlite_utils import Database
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import Callable, Iterable, Iterator, Mapping
 
     from sqlite_utils.db import Table
 
+    from .cache import QueryCache
     from .models import Episode, Feed, Playlist
 
+from .blobs import BLOB_KIND_ENCLOSURE
+from .cache import database_fingerprint
+from .compressed import (
+    DEFAULT_CODEC,
+    column_codecs,
+    compress_columns,
+    compress_text,
+    decompress_columns,
+    register_functions,
+    stored_bytes,
+)
 from .constants import (
+    BLOB_REFS,
+    BLOBS,
     CHAPTERS,
+    CHAPTERS_URL,
     CONTENT,
     DESCRIPTION,
+    ENCLOSURE_DL_PATH,
+    ENCLOSURE_DOWNLOADED_AT,
+    ENCLOSURE_ID,
+    ENCLOSURE_SHA256,
+    ENCLOSURE_SIZE,
+    ENCLOSURE_SOURCE_URL,
     ENCLOSURE_URL,
+    ENCLOSURES,
     EPISODES,
     EPISODES_EXTENDED,
+    EPISODES_EXTENDED_HOT,
     FEED_ID,
+    FEED_STATS,
     FEED_XML_URL,
     FEEDS,
     FEEDS_EXTENDED,
+    FETCH_FAILURES,
     GUID,
     IMAGE,
-    INCLUDE_PODCAST_IDS,
     LAST_UPDATED,
-    LINK,
     OVERCAST_ID,
+    PLAYED_PROGRESS,
     PLAYLISTS,
     PROGRESS,
     PUB_DATE,
-    SMART,
-    SORTING,
+    SHA256,
     SOURCE,
+    STATS_SUMMARY,
     TIME,
     TITLE,
     TRANSCRIPT_DL_PATH,
+    TRANSCRIPT_ETAG,
+    TRANSCRIPT_LAST_MODIFIED,
+    TRANSCRIPT_SEGMENTS,
     TRANSCRIPT_TYPE,
     TRANSCRIPT_URL,
+    TRANSCRIPTS,
     URL,
     USER_REC_DATE,
     USER_UPDATED_DATE,
     XML_URL,
 )
+from .episode_query import (
+    DEFAULT_FIELDS,
+    DEFAULT_PAGE_SIZE,
+    EpisodeFilter,
+    EpisodePage,
+    episode_sql,
+)
+from .episode_query import build_page as build_episode_page
+from .episode_query import format_cursor as format_episode_cursor
+from .exceptions import SchemaOutdatedError, SearchQueryError
+from .fts import (
+    drop_word_index_triggers,
+    rebuild_word_index,
+    resume_fts_triggers,
+    suspend_fts_triggers,
+)
+from .hot import sync_hot_table
+from .locking import retry_busy
+from .migrations import SCHEMA_VERSION, migrate
+from .profiles import DEFAULT_PROFILE, ConnectionProfile, read_only_connection
+from .search import (
+    DEFAULT_HIGHLIGHT,
+    KINDS,
+    TRIGRAM_COLUMNS,
+    SearchPage,
+    build_page,
+    create_trigram_indexes,
+    drop_trigram_indexes,
+    search_params,
+    search_sql,
+)
+from .stats import STATS_COLUMNS, rebuild_stats, verify_stats
+from .storage import DEFAULT_SAMPLE, StorageReport, storage_report
 
 _DEFAULT_EPISODE_LIMIT = 100
+_MAX_FAILURE_BACKOFF_DAYS = 30
 
 
 def _overcast_limit_days() -> int | None:
@@ -65,15 +130,117 @@ def _overcast_limit_days() -> int | None:
 class Datastore:
     """Object responsible for all database interactions."""
 
-    def __init__(self, db_path: str) -> None:
-        """Instantiate and ensure tables exist with expected columns."""
-        self.db: Database = Database(db_path)
-        self._prepare_db()
+    def __init__(
+        self,
+        db_path: str,
+        profile: ConnectionProfile = DEFAULT_PROFILE,
+        cache: QueryCache | None = None,
+        *,
+        read_only: bool = False,
+    ) -> None:
+        """Instantiate and ensure tables exist with expected columns.
+
+        Pass a QueryCache to memoize the results of read queries. With
+        read_only the file is opened through a mode=ro URI, usable from any
+        thread; it cannot be migrated or backfilled, so SchemaOutdatedError
+        is raised unless both are already done.
+        """
+        fingerprint = database_fingerprint(db_path) if cache is not None else []
+        self.db: Database = Database(
+            read_only_connection(db_path) if read_only else db_path,
+        )
+        self.db_path = db_path
+        self.profile = profile = profile.read_only() if read_only else profile
+        self.cache = cache
+        self._closed = False
+        profile.apply(self._conn())
+        register_functions(self.db)
+        if read_only:
+            version = self.db.execute("PRAGMA user_version;").fetchone()[0]
+            if version < SCHEMA_VERSION or self._tables_missing_enclosure_ids():
+                self.db.close()
+                raise SchemaOutdatedError(db_path, version)
+            migrated = backfilled = False
+        else:
+            migrated = migrate(self.db) != SCHEMA_VERSION
+            backfilled = self._backfill_enclosure_ids()
+        if cache is not None and not migrated and not backfilled:
+            cache.load(self._generation(), fingerprint)
+        if profile.query_only:
+            self.db.execute("PRAGMA query_only = 1;")
+        else:
+            # Finish indexing left pending by a bulk load that was interrupted.
+            resume_fts_triggers(self.db)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    @contextlib.contextmanager
+    def deferred_fts(self) -> Iterator[None]:
+        """Postpone full-text indexing of rows written inside the block.
+
+        The FTS triggers only log changed rowids while the block runs; on
+        exit the logged rows are indexed in one pass and each index is
+        optimized. Rows added inside the block are not searchable until it
+        ends. Nested blocks defer to the outermost one.
+        """
+        suspended = suspend_fts_triggers(self.db)
+        try:
+            yield
+        finally:
+            if suspended:
+                resume_fts_triggers(self.db)
+
+    def close(self) -> None:
+        """Close the connection, first letting SQLite refresh its statistics."""
+        if self._closed:
+            return
+        generation = self._generation()
+        if self.profile.optimize_on_close:
+            # Only advisory: while another connection writes, a later close runs it.
+            with contextlib.suppress(sqlite3.OperationalError):
+                self.db.execute("PRAGMA optimize;")
+        self.db.close()
+        self._closed = True
+        if self.cache is not None:
+            self.cache.save(generation, database_fingerprint(self.db_path))
+
+    def _generation(self) -> tuple[int, int]:
+        """Identify the database state this connection sees.
+
+        data_version changes when another connection commits and
+        total_changes when this one writes.
+        """
+        data_version = self.db.execute("PRAGMA data_version;").fetchone()[0]
+        return data_version, self._conn().total_changes
+
+    def _read(self, sql: str, params: Iterable | Mapping = ()) -> list[tuple]:
+        """Run a read query, answering from the cache if nothing has changed."""
+        if not isinstance(params, dict):
+            params = tuple(params)
+        if self.cache is None:
+            return self.db.execute(sql, params).fetchall()
+        key = (
+            self._generation(),
+            sql,
+            tuple(sorted(params.items())) if isinstance(params, dict) else params,
+        )
+        if (rows := self.cache.get(key)) is None:
+            rows = self.db.execute(sql, params).fetchall()
+            self.cache.put(key, rows)
+        return rows
 
     def _table(self, name: str) -> Table:
         """Return a table handle with a concrete type for static checkers."""
         return cast("Table", self.db[name])
 
+    def retry_busy[T](self, call: Callable[[], T]) -> T:
+        """Run a write, retrying it while another connection holds the lock."""
+        return retry_busy(self._conn(), call)
+
     def _conn(self) -> sqlite3.Connection:
         """Return the underlying SQLite connection."""
         if self.db.conn is None:
@@ -81,145 +248,6 @@ class Datastore:
             raise RuntimeError(msg)
         return self.db.conn
 
-    def _prepare_db(self) -> None:
-        if FEEDS not in self.db.table_names():
-            self._table(FEEDS).create(
-                {
-                    OVERCAST_ID: int,
-                    TITLE: str,
-                    "subscribed": bool,
-                    "overcastAddedDate": datetime.datetime,
-                    "notifications": bool,
-                    XML_URL: str,
-                    "htmlUrl": str,
-                    "dateRemoveDetected": datetime.datetime,
-                },
-                pk=OVERCAST_ID,
-            )
-        if FEEDS_EXTENDED not in self.db.table_names():
-            self._table(FEEDS_EXTENDED).create(
-                {
-                    XML_URL: str,
-                    TITLE: str,
-                    DESCRIPTION: str,
-                    LAST_UPDATED: datetime.datetime,
-                    LINK: str,
-                    GUID: str,
-                },
-                pk=XML_URL,
-                foreign_keys=[(XML_URL, FEEDS, XML_URL)],
-            )
-            self._table(FEEDS_EXTENDED).enable_fts(
-                [TITLE, DESCRIPTION],
-                create_triggers=True,
-            )
-        if EPISODES not in self.db.table_names():
-            self._table(EPISODES).create(
-                {
-                    OVERCAST_ID: int,
-                    FEED_ID: int,
-                    TITLE: str,
-                    URL: str,
-                    "overcastUrl": str,
-                    "played": bool,
-                    PROGRESS: int,
-                    ENCLOSURE_URL: str,
-                    USER_UPDATED_DATE: datetime.datetime,
-                    USER_REC_DATE: datetime.datetime,
-                    PUB_DATE: datetime.datetime,
-                    "userDeleted": bool,
-                },
-                pk=OVERCAST_ID,
-                foreign_keys=[(OVERCAST_ID, FEEDS, OVERCAST_ID)],
-            )
-        if EPISODES_EXTENDED not in self.db.table_names():
-            self._table(EPISODES_EXTENDED).create(
-                {
-                    ENCLOSURE_URL: str,
-                    FEED_XML_URL: str,
-                    TITLE: str,
-                    DESCRIPTION: str,
-                    LINK: str,
-                    GUID: str,
-                },
-                pk=ENCLOSURE_URL,
-                foreign_keys=[
-                    (ENCLOSURE_URL, EPISODES, ENCLOSURE_URL),
-                    (FEED_XML_URL, FEEDS_EXTENDED, XML_URL),
-                ],
-            )
-            self._table(EPISODES_EXTENDED).enable_fts(
-                [TITLE, DESCRIPTION],
-                create_triggers=True,
-            )
-        if PLAYLISTS not in self.db.table_names():
-            self._table(PLAYLISTS).create(
-                {
-                    TITLE: str,
-                    SMART: int,
-                    SORTING: str,
-                    INCLUDE_PODCAST_IDS: str,
-                },
-                pk=TITLE,
-            )
-        if CHAPTERS not in self.db.table_names():
-            self._table(CHAPTERS).create(
-                {
-                    ENCLOSURE_URL: str,
-                    GUID: str,
-                    SOURCE: str,
-                    TIME: int,
-                    CONTENT: str,
-                    URL: str,
-                    IMAGE: str,
-                },
-                foreign_keys=[
-                    (ENCLOSURE_URL, EPISODES, ENCLOSURE_URL),
-                ],
-            )
-            self._table(CHAPTERS).enable_fts(
-                [CONTENT],
-                create_triggers=True,
-            )
-            self._table(CHAPTERS).create_index([ENCLOSURE_URL, GUID, SOURCE])
-        self.db.create_view(
-            "episodes_played",
-            (
-                "SELECT "
-                f"{EPISODES}.{TITLE}, {FEEDS}.{TITLE} as feed, played, progress, "
-                f"CASE WHEN {USER_REC_DATE} IS NOT NULL THEN 1 ELSE 0 END AS starred, "
-                f"{USER_UPDATED_DATE}, {EPISODES}.{URL}, {ENCLOSURE_URL} "
-                f"FROM {EPISODES} "
-                f"LEFT JOIN {FEEDS} ON {EPISODES}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
-                f"WHERE played=1 OR progress>300 ORDER BY {USER_UPDATED_DATE} DESC"
-            ),
-            ignore=True,
-        )
-        self.db.create_view(
-            "episodes_deleted",
-            (
-                "SELECT "
-                f"{EPISODES}.{TITLE}, {FEEDS}.{TITLE} as feed, played, progress, "
-                f"{USER_UPDATED_DATE}, {EPISODES}.{URL}, {ENCLOSURE_URL} "
-                f"FROM {EPISODES} "
-                f"LEFT JOIN {FEEDS} ON {EPISODES}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
-                f"WHERE userDeleted=1 AND played=0 ORDER BY {USER_UPDATED_DATE} DESC"
-            ),
-            ignore=True,
-        )
-        self.db.create_view(
-            "episodes_starred",
-            (
-                "SELECT "
-                f"{EPISODES}.{TITLE}, {FEEDS}.{TITLE} as feed, played, progress, "
-                f"{USER_REC_DATE}, {EPISODES}.{URL}, {ENCLOSURE_URL} "
-                f"FROM {EPISODES} "
-                f"LEFT JOIN {FEEDS} ON {EPISODES}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
-                f"WHERE {USER_REC_DATE} IS NOT NULL ORDER BY {USER_UPDATED_DATE} DESC"
-            ),
-            ignore=True,
-        )
-
     def save_feed_and_episodes(
         self,
         feed: Feed,
@@ -239,10 +267,8 @@ class Datastore:
             ]
 
         self._table(FEEDS).upsert(feed.to_dict(), pk=OVERCAST_ID)
-        self._table(EPISODES).upsert_all(
-            [e.to_dict() for e in episodes],
-            pk=OVERCAST_ID,
-        )
+        rows = [e.to_dict() for e in episodes]
+        self._table(EPISODES).upsert_all(self._with_enclosure_ids(rows), pk=OVERCAST_ID)
 
     def save_extended_feed_and_episodes(
         self,
@@ -251,12 +277,80 @@ class Datastore:
     ) -> None:
         """Upsert feed info (with new columns) and insert episodes (ignore existing)."""
         self._table(FEEDS_EXTENDED).upsert(feed, pk=XML_URL, alter=True)
+        if codecs := column_codecs(self.db, EPISODES_EXTENDED):
+            episodes = [
+                {
+                    key: compress_text(value, codecs[key]) if key in codecs else value
+                    for key, value in episode.items()
+                }
+                for episode in episodes
+            ]
         self._table(EPISODES_EXTENDED).insert_all(
-            episodes,
+            self._with_enclosure_ids(episodes),
             pk=ENCLOSURE_URL,
             ignore=True,
             alter=True,
         )
+        connection = self._conn()
+        with connection:
+            sync_hot_table(self.db)
+
+    def enclosure_ids(self, urls: Iterable[str]) -> dict[str, int]:
+        """Return the integer id of each enclosure URL, assigning new ones."""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        connection = self._conn()
+        with connection:
+            connection.executemany(
+                f"INSERT OR IGNORE INTO {ENCLOSURES} ({ENCLOSURE_URL}) VALUES (?);",
+                [(url,) for url in urls],
+            )
+        return dict(
+            connection.execute(
+                f"SELECT {ENCLOSURE_URL}, id FROM {ENCLOSURES} "
+                f"WHERE {ENCLOSURE_URL} IN (SELECT value FROM json_each(?));",
+                [json.dumps(urls)],
+            ).fetchall(),
+        )
+
+    def _tables_missing_enclosure_ids(self) -> list[str]:
+        """Return the tables with rows saved without an enclosure id.
+
+        Other tools can save such rows, and the joins match on enclosureId
+        alone, so they would drop out of them. Finding none costs one index
+        lookup per table.
+        """
+        return [
+            table
+            for table in (EPISODES, EPISODES_EXTENDED, CHAPTERS)
+            if self.db.execute(
+                f"SELECT 1 FROM {table} WHERE {ENCLOSURE_ID} IS NULL "
+                f"AND {ENCLOSURE_URL} IS NOT NULL LIMIT 1;",
+            ).fetchone()
+        ]
+
+    def _backfill_enclosure_ids(self) -> bool:
+        """Assign ids to rows saved without one; return whether there were any."""
+        tables = self._tables_missing_enclosure_ids()
+        missing = f"{ENCLOSURE_ID} IS NULL AND {ENCLOSURE_URL} IS NOT NULL"
+        for table in tables:
+            connection = self._conn()
+            with connection:
+                connection.execute(
+                    f"INSERT OR IGNORE INTO {ENCLOSURES} ({ENCLOSURE_URL}) "
+                    f"SELECT {ENCLOSURE_URL} FROM {table} WHERE {missing};",
+                )
+                connection.execute(
+                    f"UPDATE {table} SET {ENCLOSURE_ID} = ("
+                    f"SELECT id FROM {ENCLOSURES} "
+                    f"WHERE {ENCLOSURES}.{ENCLOSURE_URL} = {table}.{ENCLOSURE_URL}) "
+                    f"WHERE {missing};",
+                )
+        return bool(tables)
+
+    def _with_enclosure_ids(self, rows: list[dict]) -> list[dict]:
+        """Add the enclosureId matching each row's enclosureUrl."""
+        ids = self.enclosure_ids(row.get(ENCLOSURE_URL) for row in rows)
+        return [{**row, ENCLOSURE_ID: ids.get(row.get(ENCLOSURE_URL))} for row in rows]
 
     def mark_feed_removed_if_missing(
         self,
@@ -278,13 +372,13 @@ class Datastore:
         return self.db.execute(
             f"SELECT {FEEDS}.{TITLE}, {FEEDS}.{XML_URL} "
             f"FROM {EPISODES} "
-            f"LEFT JOIN {EPISODES_EXTENDED} "
-            f"ON {EPISODES}.{ENCLOSURE_URL} = {EPISODES_EXTENDED}.{ENCLOSURE_URL} "
+            f"LEFT JOIN {EPISODES_EXTENDED_HOT} "
+            f"ON {EPISODES}.{ENCLOSURE_ID} = {EPISODES_EXTENDED_HOT}.{ENCLOSURE_ID} "
             f"LEFT JOIN {FEEDS} "
             f"ON {EPISODES}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
             f"LEFT JOIN {FEEDS_EXTENDED} "
             f"ON {FEEDS}.{XML_URL} = {FEEDS_EXTENDED}.{XML_URL} "
-            f"WHERE {EPISODES_EXTENDED}.{ENCLOSURE_URL} IS NULL "
+            f"WHERE {EPISODES_EXTENDED_HOT}.{ENCLOSURE_ID} IS NULL "
             f"AND ({FEEDS_EXTENDED}.{LAST_UPDATED} IS NULL "
             f"OR {FEEDS_EXTENDED}.{LAST_UPDATED} < {EPISODES}.{PUB_DATE}) "
             f"GROUP BY {EPISODES}.{FEED_ID};",
@@ -294,171 +388,506 @@ class Datastore:
         """Upsert playlist into database."""
         self._table(PLAYLISTS).upsert(playlist.to_dict(), pk=TITLE)
 
-    def ensure_transcript_columns(self) -> bool:
-        """Ensure transcript columns exist in database.
-
-        Returns bool indicating if columns were added.
-        """
-        columns_added = False
-        try:
-            self.db.execute(f"SELECT {TRANSCRIPT_URL} FROM {EPISODES_EXTENDED} LIMIT 1")
-        except sqlite3.OperationalError:
-            self._table(EPISODES_EXTENDED).add_column(TRANSCRIPT_URL, str)
-            columns_added = True
-        try:
-            self.db.execute(
-                f"SELECT {TRANSCRIPT_DL_PATH} FROM {EPISODES_EXTENDED} LIMIT 1",
-            )
-        except sqlite3.OperationalError:
-            self._table(EPISODES_EXTENDED).add_column(TRANSCRIPT_DL_PATH, str)
-            columns_added = True
-        return columns_added
-
     # TRANSCRIPTS
 
     def transcripts_to_download(
         self,
         *,
         starred_only: bool,
-    ) -> Iterable[tuple[str, str, str, str, str]]:
-        """Find episodes with transcripts to download.
+        refresh: bool = False,
+    ) -> Iterable[tuple[str, str, str, str, str, str | None, str | None]]:
+        """Find episodes with transcripts to download, most wanted first.
 
-        Yields (title, url, mime_type, enclosure_url, feed_title)
+        Starred episodes come first, then episodes by most recent activity.
+        With refresh, already downloaded transcripts are included so they can be
+        revalidated with a conditional request.
+
+        Yields (title, url, mime_type, enclosure_url, feed_title, etag,
+        last_modified)
         """
-        select = (
-            f"SELECT {EPISODES_EXTENDED}.{TITLE}, {TRANSCRIPT_URL}, "
-            f"{TRANSCRIPT_TYPE}, {EPISODES_EXTENDED}.{ENCLOSURE_URL}, "
-            f"{FEEDS_EXTENDED}.{TITLE} FROM {EPISODES_EXTENDED} "
-        )
-        where = f"WHERE {TRANSCRIPT_DL_PATH} IS NULL AND {TRANSCRIPT_URL} IS NOT NULL"
-        order = f"ORDER BY {FEEDS_EXTENDED}.{TITLE} ASC"
+        where = f"WHERE {TRANSCRIPT_URL} IS NOT NULL"
+        if not refresh:
+            where += f" AND {TRANSCRIPT_DL_PATH} IS NULL"
+        if starred_only:
+            where += f" AND {USER_REC_DATE} IS NOT NULL"
         query = (
-            (
-                f"{select} LEFT JOIN {FEEDS_EXTENDED} "
-                f"ON {EPISODES_EXTENDED}.{FEED_XML_URL} = {FEEDS_EXTENDED}.{XML_URL} "
-                f"{where} {order}"
-            )
-            if not starred_only
-            else (
-                f"{select} "
-                f"LEFT JOIN {EPISODES} "
-                f"ON {EPISODES_EXTENDED}.{ENCLOSURE_URL} = {EPISODES}.{ENCLOSURE_URL} "
-                f"LEFT JOIN {FEEDS_EXTENDED} "
-                f"ON {EPISODES_EXTENDED}.{FEED_XML_URL} = {FEEDS_EXTENDED}.{XML_URL} "
-                f"{where} AND {USER_REC_DATE} IS NOT NULL {order}"
-            )
+            f"SELECT {EPISODES_EXTENDED_HOT}.{TITLE}, {TRANSCRIPT_URL}, "
+            f"{TRANSCRIPT_TYPE}, {EPISODES_EXTENDED_HOT}.{ENCLOSURE_URL}, "
+            f"{FEEDS_EXTENDED}.{TITLE}, {TRANSCRIPT_ETAG}, {TRANSCRIPT_LAST_MODIFIED} "
+            f"FROM {EPISODES_EXTENDED_HOT} "
+            f"LEFT JOIN {EPISODES} "
+            f"ON {EPISODES_EXTENDED_HOT}.{ENCLOSURE_ID} = {EPISODES}.{ENCLOSURE_ID} "
+            f"LEFT JOIN {FEEDS_EXTENDED} "
+            f"ON {EPISODES_EXTENDED_HOT}.{FEED_XML_URL} = {FEEDS_EXTENDED}.{XML_URL} "
+            f"{where} "
+            f"ORDER BY {USER_REC_DATE} IS NULL, {USER_UPDATED_DATE} DESC, "
+            f"{FEEDS_EXTENDED}.{TITLE} ASC"
         )
 
         yield from self.db.execute(query)
 
     def update_transcript_download_paths(
         self,
-        enclosure: str,
-        transcript_path: str,
+        downloads: list[tuple[str, str, str | None, str | None]],
     ) -> None:
-        """Update episode with transcript download path."""
-        self._table(EPISODES_EXTENDED).update(
-            enclosure,
-            {TRANSCRIPT_DL_PATH: transcript_path},
+        """Store (enclosure, path, etag, last_modified) rows in one transaction.
+
+        A refreshed transcript with new content gets a new path; the parsed
+        segments of the old path are dropped once no episode refers to it.
+        """
+        connection = self._conn()
+        with connection:
+            old_paths = {
+                path
+                for (path,) in connection.execute(
+                    f"SELECT DISTINCT {TRANSCRIPT_DL_PATH} FROM {EPISODES_EXTENDED} "
+                    f"WHERE {ENCLOSURE_URL} IN (SELECT value FROM json_each(?)) "
+                    f"AND {TRANSCRIPT_DL_PATH} IS NOT NULL;",
+                    [json.dumps([enclosure for enclosure, *_ in downloads])],
+                )
+            }
+            connection.executemany(
+                f"UPDATE {EPISODES_EXTENDED} SET {TRANSCRIPT_DL_PATH} = ?, "
+                f"{TRANSCRIPT_ETAG} = ?, {TRANSCRIPT_LAST_MODIFIED} = ? "
+                f"WHERE {ENCLOSURE_URL} = ?;",
+                [
+                    (path, etag, last_modified, enclosure)
+                    for enclosure, path, etag, last_modified in downloads
+                ],
+            )
+            for path in old_paths:
+                if (
+                    connection.execute(
+                        f"SELECT 1 FROM {EPISODES_EXTENDED} "
+                        f"WHERE {TRANSCRIPT_DL_PATH} = ? LIMIT 1;",
+                        [path],
+                    ).fetchone()
+                    is None
+                ):
+                    self._delete_transcript(path)
+
+    def transcripts_to_ingest(self, changed_paths: Iterable[str] = ()) -> list[str]:
+        """Find downloaded transcripts missing from the segment store.
+
+        changed_paths (e.g. files just re-downloaded) are always included.
+        """
+        new_paths = [
+            path
+            for (path,) in self.db.execute(
+                f"SELECT DISTINCT {TRANSCRIPT_DL_PATH} FROM {EPISODES_EXTENDED_HOT} "
+                f"LEFT JOIN {TRANSCRIPTS} "
+                f"ON {TRANSCRIPTS}.path = {EPISODES_EXTENDED_HOT}.{TRANSCRIPT_DL_PATH} "
+                f"WHERE {TRANSCRIPT_DL_PATH} IS NOT NULL AND {TRANSCRIPTS}.id IS NULL",
+            )
+        ]
+        return list(dict.fromkeys([*new_paths, *changed_paths]))
+
+    def _delete_transcript(self, path: str) -> None:
+        """Remove a transcript, its segments and their FTS entries."""
+        connection = self._conn()
+        if (
+            existing := connection.execute(
+                f"SELECT id, text FROM {TRANSCRIPTS} WHERE path = ?",
+                [path],
+            ).fetchone()
+        ) is None:
+            return
+        transcript_id, blob = existing
+        text = zlib.decompress(blob).decode()
+        connection.executemany(
+            f"INSERT INTO {TRANSCRIPT_SEGMENTS}_fts ({TRANSCRIPT_SEGMENTS}_fts, "
+            "rowid, text) VALUES ('delete', ?, ?)",
+            [
+                (segment_id, text[start:end])
+                for segment_id, start, end in connection.execute(
+                    f"SELECT id, textStart, textEnd FROM {TRANSCRIPT_SEGMENTS} "
+                    "WHERE transcriptId = ?",
+                    [transcript_id],
+                )
+            ],
         )
+        connection.execute(
+            f"DELETE FROM {TRANSCRIPT_SEGMENTS} WHERE transcriptId = ?",
+            [transcript_id],
+        )
+        connection.execute(f"DELETE FROM {TRANSCRIPTS} WHERE id = ?", [transcript_id])
+
+    def save_transcript_segments(
+        self,
+        path: str,
+        transcript_format: str,
+        size: int,
+        mtime: float,
+        segments: list[tuple[float | None, float | None, str | None, str]],
+    ) -> None:
+        """Replace the stored segments of a transcript file and index their text.
+
+        The text of all segments is stored once, zlib-compressed, on the
+        transcript row; segments keep character offsets into it.
+        """
+        offsets = []
+        position = 0
+        for *_, text in segments:
+            offsets.append((position, position + len(text)))
+            position += len(text) + 1
+        full_text = "\n".join(text for *_, text in segments)
+
+        connection = self._conn()
+        with connection:
+            self._delete_transcript(path)
+            transcript_id = connection.execute(
+                f"INSERT INTO {TRANSCRIPTS} "
+                "(path, format, size, mtime, segmentCount, ingestedAt, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    path,
+                    transcript_format,
+                    size,
+                    mtime,
+                    len(segments),
+                    datetime.datetime.now(tz=datetime.UTC).isoformat(),
+                    zlib.compress(full_text.encode()),
+                ],
+            ).lastrowid
+            connection.executemany(
+                f"INSERT INTO {TRANSCRIPT_SEGMENTS} (transcriptId, idx, startTime, "
+                "endTime, speaker, textStart, textEnd) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (transcript_id, idx, start, end, speaker, *offsets[idx])
+                    for idx, (start, end, speaker, _) in enumerate(segments)
+                ],
+            )
+            connection.executemany(
+                f"INSERT INTO {TRANSCRIPT_SEGMENTS}_fts (rowid, text) VALUES (?, ?)",
+                [
+                    (segment_id, segments[idx][3])
+                    for segment_id, idx in connection.execute(
+                        f"SELECT id, idx FROM {TRANSCRIPT_SEGMENTS} "
+                        "WHERE transcriptId = ?",
+                        [transcript_id],
+                    )
+                ],
+            )
+
+    # BLOBS
+
+    def save_blob_refs(
+        self,
+        kind: str,
+        refs: list[tuple[str, str, str, int]],
+    ) -> None:
+        """Point each (enclosure, sha256, path, size) episode at a stored blob."""
+        connection = self._conn()
+        now = datetime.datetime.now(tz=datetime.UTC).isoformat()
+        with connection:
+            connection.executemany(
+                f"INSERT INTO {BLOBS} ({SHA256}, path, size, createdAt) "
+                f"VALUES (?, ?, ?, ?) ON CONFLICT({SHA256}) DO NOTHING;",
+                [(sha256, path, size, now) for _, sha256, path, size in refs],
+            )
+            connection.executemany(
+                f"INSERT INTO {BLOB_REFS} ({ENCLOSURE_URL}, kind, {SHA256}) "
+                f"VALUES (?, ?, ?) ON CONFLICT({ENCLOSURE_URL}, kind) "
+                f"DO UPDATE SET {SHA256} = excluded.{SHA256};",
+                [(enclosure, kind, sha256) for enclosure, sha256, _, _ in refs],
+            )
+
+    def get_blobs(self) -> list[tuple[str, str, int]]:
+        """Return (sha256, path, size) for every stored blob."""
+        return self.db.execute(
+            f"SELECT {SHA256}, path, size FROM {BLOBS} ORDER BY path",
+        ).fetchall()
+
+    def delete_unreferenced_blobs(self) -> list[str]:
+        """Forget blobs no episode refers to and return their paths."""
+        connection = self._conn()
+        with connection:
+            paths = [
+                path
+                for (path,) in connection.execute(
+                    f"SELECT path FROM {BLOBS} WHERE {SHA256} NOT IN "
+                    f"(SELECT {SHA256} FROM {BLOB_REFS})",
+                )
+            ]
+            for path in paths:
+                self._delete_transcript(path)
+            connection.execute(
+                f"DELETE FROM {BLOBS} WHERE {SHA256} NOT IN "
+                f"(SELECT {SHA256} FROM {BLOB_REFS})",
+            )
+        return paths
+
+    def transcripts_outside_blob_store(self) -> list[tuple[str, str]]:
+        """Return (enclosure, path) of transcripts downloaded before the blob store."""
+        return self.db.execute(
+            f"SELECT {ENCLOSURE_URL}, {TRANSCRIPT_DL_PATH} "
+            f"FROM {EPISODES_EXTENDED_HOT} WHERE {TRANSCRIPT_DL_PATH} IS NOT NULL "
+            f"AND {TRANSCRIPT_DL_PATH} NOT IN (SELECT path FROM {BLOBS})",
+        ).fetchall()
+
+    def move_transcript(self, old_path: str, new_path: str) -> None:
+        """Repoint episodes and parsed segments from old_path to new_path."""
+        connection = self._conn()
+        with connection:
+            connection.execute(
+                f"UPDATE {EPISODES_EXTENDED} SET {TRANSCRIPT_DL_PATH} = ? "
+                f"WHERE {TRANSCRIPT_DL_PATH} = ?;",
+                [new_path, old_path],
+            )
+            connection.execute(
+                f"UPDATE OR IGNORE {TRANSCRIPTS} SET path = ? WHERE path = ?;",
+                [new_path, old_path],
+            )
+            # Already parsed under new_path, so the copy's segments are redundant.
+            self._delete_transcript(old_path)
+
+    # ENCLOSURES
+
+    def enclosures_to_download(
+        self,
+        *,
+        starred: bool,
+        played: bool,
+        feeds: Iterable[str] = (),
+    ) -> list[tuple[str, str, str, str | None]]:
+        """Find episodes whose audio is not archived yet, most wanted first.
+
+        Episodes are selected if starred or played (whichever are requested),
+        optionally restricted to feeds with the given titles.
+
+        Returns (enclosure_url, source_url, title, userUpdatedDate), where
+        source_url is the URL to download from and enclosure_url the key.
+        """
+        selected = []
+        if starred:
+            selected.append(f"{EPISODES}.{USER_REC_DATE} IS NOT NULL")
+        if played:
+            selected.append(
+                f"({EPISODES}.played = 1 OR {EPISODES}.{PROGRESS} > {PLAYED_PROGRESS})",
+            )
+        where = (
+            f"WHERE {EPISODES}.{ENCLOSURE_URL} IS NOT NULL "
+            f"AND {EPISODES}.{ENCLOSURE_DL_PATH} IS NULL "
+            f"AND ({' OR '.join(selected) or '1'})"
+        )
+        params = list(feeds)
+        if params:
+            where += (
+                f" AND {FEEDS}.{TITLE} COLLATE NOCASE "
+                f"IN ({', '.join('?' for _ in params)})"
+            )
+        return self.db.execute(
+            f"SELECT {EPISODES}.{ENCLOSURE_URL}, "
+            f"coalesce({EPISODES}.{ENCLOSURE_SOURCE_URL}, {EPISODES}.{ENCLOSURE_URL}), "
+            f"{EPISODES}.{TITLE}, {EPISODES}.{USER_UPDATED_DATE} FROM {EPISODES} "
+            f"LEFT JOIN {FEEDS} ON {EPISODES}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
+            f"{where} "
+            f"ORDER BY {EPISODES}.{USER_REC_DATE} IS NULL, "
+            f"{EPISODES}.{USER_UPDATED_DATE} DESC",
+            params,
+        ).fetchall()
+
+    def save_enclosure_downloads(
+        self,
+        downloads: list[tuple[str, str, int, str]],
+    ) -> None:
+        """Store (enclosure, path, size, sha256) rows in one transaction."""
+        connection = self._conn()
+        now = datetime.datetime.now(tz=datetime.UTC).isoformat()
+        with connection:
+            connection.executemany(
+                f"UPDATE {EPISODES} SET {ENCLOSURE_DL_PATH} = ?, {ENCLOSURE_SIZE} = ?, "
+                f"{ENCLOSURE_SHA256} = ?, {ENCLOSURE_DOWNLOADED_AT} = ? "
+                f"WHERE {ENCLOSURE_ID} = "
+                f"(SELECT id FROM {ENCLOSURES} WHERE {ENCLOSURE_URL} = ?);",
+                [
+                    (path, size, sha256, now, enclosure)
+                    for enclosure, path, size, sha256 in downloads
+                ],
+            )
+
+    def archived_enclosures(self) -> list[tuple[str, str, int, str]]:
+        """Return (enclosure, path, size, last_used) of archived audio, oldest first.
+
+        An episode was last used when it was last updated in Overcast, or when
+        it was downloaded if it never was.
+        """
+        return self.db.execute(
+            f"SELECT {ENCLOSURE_URL}, {ENCLOSURE_DL_PATH}, {ENCLOSURE_SIZE}, "
+            f"COALESCE({USER_UPDATED_DATE}, {ENCLOSURE_DOWNLOADED_AT}) AS lastUsed "
+            f"FROM {EPISODES} WHERE {ENCLOSURE_DL_PATH} IS NOT NULL "
+            f"ORDER BY lastUsed ASC",
+        ).fetchall()
+
+    def evict_enclosures(self, enclosures: list[str]) -> list[str]:
+        """Forget archived audio for enclosures.
+
+        Returns the paths no other episode still uses, which can be deleted.
+        """
+        connection = self._conn()
+        with connection:
+            paths = {
+                path
+                for (path,) in connection.execute(
+                    f"SELECT {ENCLOSURE_DL_PATH} FROM {EPISODES} "
+                    f"WHERE {ENCLOSURE_ID} IN (SELECT id FROM {ENCLOSURES} "
+                    f"WHERE {ENCLOSURE_URL} IN "
+                    f"({', '.join('?' for _ in enclosures)}))",
+                    enclosures,
+                )
+            }
+            connection.executemany(
+                f"UPDATE {EPISODES} SET {ENCLOSURE_DL_PATH} = NULL, "
+                f"{ENCLOSURE_SIZE} = NULL, {ENCLOSURE_SHA256} = NULL, "
+                f"{ENCLOSURE_DOWNLOADED_AT} = NULL WHERE {ENCLOSURE_ID} = "
+                f"(SELECT id FROM {ENCLOSURES} WHERE {ENCLOSURE_URL} = ?);",
+                [(enclosure,) for enclosure in enclosures],
+            )
+            connection.executemany(
+                f"DELETE FROM {BLOB_REFS} WHERE {ENCLOSURE_URL} = ? AND kind = ?;",
+                [(enclosure, BLOB_KIND_ENCLOSURE) for enclosure in enclosures],
+            )
+            unused = [
+                path
+                for path in sorted(paths)
+                if connection.execute(
+                    f"SELECT 1 FROM {EPISODES} WHERE {ENCLOSURE_DL_PATH} = ?",
+                    [path],
+                ).fetchone()
+                is None
+            ]
+            connection.executemany(
+                f"DELETE FROM {BLOBS} WHERE path = ?;",
+                [(path,) for path in unused],
+            )
+        return unused
 
     # CHAPTERS
     def insert_chapters(
         self,
         chapters: list[tuple[str, str, str, int, str, str | None, str | None]],
     ) -> None:
-        """Insert chapters into the chapters DB table."""
+        """Upsert chapters into the chapters DB table in a single transaction.
+
+        Chapters are keyed on (enclosureUrl, source, time), so rerunning a
+        backfill updates existing rows instead of duplicating them.
+        """
+        ids = self.enclosure_ids(chapter[0] for chapter in chapters)
         connection = self._conn()
-        connection.executemany(
-            f"INSERT INTO {CHAPTERS} "
-            f"({ENCLOSURE_URL}, {GUID}, {SOURCE}, {TIME}, {CONTENT}, {URL}, {IMAGE}) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?);",
-            chapters,
-        )
-        connection.commit()
+        with connection:
+            connection.executemany(
+                f"INSERT INTO {CHAPTERS} "
+                f"({ENCLOSURE_URL}, {GUID}, {SOURCE}, {TIME}, "
+                f"{CONTENT}, {URL}, {IMAGE}, {ENCLOSURE_ID}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                f"ON CONFLICT({ENCLOSURE_URL}, {SOURCE}, {TIME}) DO UPDATE SET "
+                f"{GUID} = excluded.{GUID}, {CONTENT} = excluded.{CONTENT}, "
+                f"{URL} = excluded.{URL}, {IMAGE} = excluded.{IMAGE} "
+                f"WHERE ({GUID}, {CONTENT}, {URL}, {IMAGE}) IS NOT "
+                f"(excluded.{GUID}, excluded.{CONTENT}, excluded.{URL}, "
+                f"excluded.{IMAGE});",
+                [(*chapter, ids.get(chapter[0])) for chapter in chapters],
+            )
 
-    def get_description_no_chapters(self) -> Iterable[tuple[str, str, str]]:
-        """Find episodes with no chapters."""
-        yield from self.db.execute(
-            f"SELECT {EPISODES_EXTENDED}.{ENCLOSURE_URL}, {EPISODES_EXTENDED}.{GUID}, "
-            f"{DESCRIPTION} "
-            f"FROM {EPISODES_EXTENDED} "
-            f"LEFT JOIN {CHAPTERS} "
-            f"ON {EPISODES_EXTENDED}.{ENCLOSURE_URL} = {CHAPTERS}.{ENCLOSURE_URL} "
-            f"WHERE {CHAPTERS}.{ENCLOSURE_URL} IS NULL "
-            f"AND {DESCRIPTION} IS NOT NULL;",
-        )
+    def get_description_no_chapters(
+        self,
+        batch_size: int = 1000,
+    ) -> Iterable[list[tuple[str, str, str]]]:
+        """Find episodes with no chapters, yielded in batches of batch_size.
+
+        Each batch is a separate keyset query on rowid, so no read cursor is
+        held open while the caller writes chapters between batches.
+        """
+        last_rowid = 0
+        while True:
+            rows = self.db.execute(
+                f"SELECT {EPISODES_EXTENDED}.rowid, "
+                f"{EPISODES_EXTENDED}.{ENCLOSURE_URL}, {EPISODES_EXTENDED}.{GUID}, "
+                f"{DESCRIPTION} "
+                f"FROM {EPISODES_EXTENDED} "
+                f"LEFT JOIN {CHAPTERS} "
+                f"ON {EPISODES_EXTENDED}.{ENCLOSURE_ID} = {CHAPTERS}.{ENCLOSURE_ID} "
+                f"WHERE {CHAPTERS}.{ENCLOSURE_ID} IS NULL "
+                f"AND {DESCRIPTION} IS NOT NULL "
+                f"AND {EPISODES_EXTENDED}.rowid > ? "
+                f"ORDER BY {EPISODES_EXTENDED}.rowid LIMIT ?;",
+                [last_rowid, batch_size],
+            ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [(url, guid, description) for _, url, guid, description in rows]
 
     def get_no_pci_chapters(self) -> Iterable[tuple[str, str, str, str]]:
-        """Find episodes with no PCI type chapters."""
+        """Find episodes with no PCI type chapters, skipping recent failures."""
         yield from self.db.execute(
-            f"SELECT {EPISODES_EXTENDED}.{ENCLOSURE_URL}, {EPISODES_EXTENDED}.{GUID}, "
-            f'{EPISODES_EXTENDED}.{TITLE}, "podcast:chapters:url"'
-            f"FROM {EPISODES_EXTENDED} "
-            f"LEFT JOIN {CHAPTERS} "
-            f"ON {EPISODES_EXTENDED}.{ENCLOSURE_URL} = {CHAPTERS}.{ENCLOSURE_URL} "
-            f"WHERE {CHAPTERS}.{ENCLOSURE_URL} IS NULL "
-            'AND "podcast:chapters:url" IS NOT NULL '
-            f"AND ({CHAPTERS}.{SOURCE} IS NULL OR {CHAPTERS}.{SOURCE} != 'pci');",
+            f"SELECT ee.{ENCLOSURE_URL}, ee.{GUID}, ee.{TITLE}, {CHAPTERS_URL} "
+            f"FROM {EPISODES_EXTENDED_HOT} ee "
+            f"LEFT JOIN {CHAPTERS} ON ee.{ENCLOSURE_ID} = {CHAPTERS}.{ENCLOSURE_ID} "
+            f"WHERE {CHAPTERS}.{ENCLOSURE_ID} IS NULL "
+            f"AND {CHAPTERS_URL} IS NOT NULL "
+            f"AND ({CHAPTERS}.{SOURCE} IS NULL OR {CHAPTERS}.{SOURCE} != 'pci') "
+            f"AND NOT EXISTS ({self._backed_off_failure(CHAPTERS_URL)});",
+            [datetime.datetime.now(tz=datetime.UTC).isoformat()],
         )
 
     def get_no_psc_chapters(self) -> Iterable[tuple[str, str, str]]:
         """Find episodes with no PCI type chapters."""
         yield from self.db.execute(
-            f"SELECT {EPISODES_EXTENDED}.{ENCLOSURE_URL}, {EPISODES_EXTENDED}.{GUID}, "
-            f"{FEEDS_EXTENDED}.{TITLE} "
-            f"FROM {EPISODES_EXTENDED} "
-            f"LEFT JOIN {CHAPTERS} "
-            f"ON {EPISODES_EXTENDED}.{ENCLOSURE_URL} = {CHAPTERS}.{ENCLOSURE_URL} "
+            f"SELECT ee.{ENCLOSURE_URL}, ee.{GUID}, {FEEDS_EXTENDED}.{TITLE} "
+            f"FROM {EPISODES_EXTENDED_HOT} ee "
+            f"LEFT JOIN {CHAPTERS} ON ee.{ENCLOSURE_ID} = {CHAPTERS}.{ENCLOSURE_ID} "
             f"LEFT JOIN {FEEDS_EXTENDED} "
-            f"ON {EPISODES_EXTENDED}.{FEED_XML_URL} = {FEEDS_EXTENDED}.{XML_URL} "
-            f"WHERE {CHAPTERS}.{ENCLOSURE_URL} IS NULL "
+            f"ON ee.{FEED_XML_URL} = {FEEDS_EXTENDED}.{XML_URL} "
+            f"WHERE {CHAPTERS}.{ENCLOSURE_ID} IS NULL "
             'AND "psc:chapters:version" IS NOT NULL '
             f"AND ({CHAPTERS}.{SOURCE} IS NULL OR {CHAPTERS}.{SOURCE} != 'psc');",
         )
 
-    def _clean_enclosure_urls(self, *, deduplicate: bool = False) -> None:
-        """Clean and normalize enclosure URLs by removing query parameters."""
-        self.db.execute(
-            f"UPDATE {EPISODES} "
-            f"SET {ENCLOSURE_URL} = "
-            f"substr({ENCLOSURE_URL}, 1, instr({ENCLOSURE_URL}, '?') - 1) "
-            f"WHERE {ENCLOSURE_URL} LIKE '%?%'",
+    # FETCH FAILURES
+
+    def _backed_off_failure(self, url_column: str) -> str:
+        """Return a subquery matching failures still inside their retry backoff.
+
+        The backoff doubles with every attempt (1, 2, 4... days), capped at
+        _MAX_FAILURE_BACKOFF_DAYS. Expects the current time as a bound parameter.
+        """
+        return (
+            f"SELECT 1 FROM {FETCH_FAILURES} ff WHERE ff.{URL} = {url_column} "
+            "AND julianday(ff.lastAttempt) "
+            f"+ min({_MAX_FAILURE_BACKOFF_DAYS}, 1 << (ff.attempts - 1)) "
+            "> julianday(?)"
         )
-        self._conn().commit()
 
-        if deduplicate:
-            self.db.execute(
-                f"""
-                DELETE FROM {EPISODES_EXTENDED} WHERE rowid IN (
-                    SELECT t1.rowid
-                    FROM {EPISODES_EXTENDED} t1
-                    JOIN (
-                        SELECT
-                            substr({ENCLOSURE_URL}, 1,
-                                   instr({ENCLOSURE_URL}, '?') - 1)
-                            AS base_url,
-                            MIN(rowid) AS min_rowid
-                        FROM {EPISODES_EXTENDED}
-                        WHERE {ENCLOSURE_URL} LIKE '%?%'
-                        GROUP BY base_url
-                    ) t2 ON
-                    substr(t1.{ENCLOSURE_URL}, 1,
-                           instr(t1.{ENCLOSURE_URL}, '?') - 1)
-                    = t2.base_url
-                    WHERE  t1.rowid > t2.min_rowid
-                )
-                """,
-            )
-            self._conn().commit()
+    def record_fetch_failures(
+        self,
+        source: str,
+        failures: list[tuple[str, str, str]],
+    ) -> None:
+        """Record (url, enclosure_url, error) failures so they are not retried soon."""
+        now = datetime.datetime.now(tz=datetime.UTC).isoformat()
+        connection = self._conn()
+        connection.executemany(
+            f"INSERT INTO {FETCH_FAILURES} "
+            f"({URL}, {SOURCE}, {ENCLOSURE_URL}, error, attempts, lastAttempt) "
+            "VALUES (?, ?, ?, ?, 1, ?) "
+            f"ON CONFLICT({URL}) DO UPDATE SET error = excluded.error, "
+            "attempts = attempts + 1, lastAttempt = excluded.lastAttempt;",
+            [
+                (url, source, enclosure, error, now)
+                for url, enclosure, error in failures
+            ],
+        )
+        connection.commit()
 
-        self.db.execute(
-            f"UPDATE OR IGNORE {EPISODES_EXTENDED} "
-            f"SET {ENCLOSURE_URL} = "
-            f"substr({ENCLOSURE_URL}, 1, instr({ENCLOSURE_URL}, '?') - 1) "
-            f"WHERE {ENCLOSURE_URL} LIKE '%?%'",
+    def clear_fetch_failures(self, urls: list[str]) -> None:
+        """Forget previous failures for URLs that have now been fetched."""
+        connection = self._conn()
+        connection.executemany(
+            f"DELETE FROM {FETCH_FAILURES} WHERE {URL} = ?;",
+            [(url,) for url in urls],
         )
-        self._conn().commit()
+        connection.commit()
 
     def _get_base_fields(self) -> list[str]:
         """Get the base field list for episode queries."""
@@ -468,13 +897,10 @@ class Datastore:
             f"{FEEDS_EXTENDED}.{TITLE} as feed_title",
             f"{FEEDS_EXTENDED}.'itunes:image:href' as image_",
             f"{FEEDS_EXTENDED}.link as link_",
-            (
-                f"coalesce({EPISODES_EXTENDED}.description, "
-                f"'No description') as description"
-            ),
-            f"{EPISODES_EXTENDED}.pubDate as pubDate",
-            f"{EPISODES_EXTENDED}.'itunes:image:href' as 'images.'",
-            f"{EPISODES_EXTENDED}.link as 'links.'",
+            f"{EPISODES_EXTENDED_HOT}.id as episodeRowid",
+            f"{EPISODES_EXTENDED_HOT}.pubDate as pubDate",
+            f"{EPISODES_EXTENDED_HOT}.'itunes:image:href' as 'images.'",
+            f"{EPISODES_EXTENDED_HOT}.link as 'links.'",
         ]
 
     def _build_episode_query(
@@ -487,10 +913,10 @@ class Datastore:
         return (
             "SELECT " + ", ".join(fields) + " "
             f"FROM {EPISODES} "
-            f"JOIN {EPISODES_EXTENDED} ON "
-            f"{EPISODES}.{ENCLOSURE_URL} = {EPISODES_EXTENDED}.{ENCLOSURE_URL} "
+            f"JOIN {EPISODES_EXTENDED_HOT} ON "
+            f"{EPISODES}.{ENCLOSURE_ID} = {EPISODES_EXTENDED_HOT}.{ENCLOSURE_ID} "
             f"JOIN {FEEDS_EXTENDED} "
-            f"ON {EPISODES_EXTENDED}.{FEED_XML_URL} = {FEEDS_EXTENDED}.{XML_URL} "
+            f"ON {EPISODES_EXTENDED_HOT}.{FEED_XML_URL} = {FEEDS_EXTENDED}.{XML_URL} "
             f"WHERE {where_clause} ORDER BY {order_by} "
             f"LIMIT {_DEFAULT_EPISODE_LIMIT}"
         )
@@ -501,7 +927,7 @@ class Datastore:
         fields: list[str],
     ) -> list[dict[str, object]]:
         """Process query results into a list of dictionaries."""
-        return [
+        episodes = [
             {
                 fields[i].split(" ")[-1].replace("s.", "_").replace("'", ""): v
                 for (i, v) in enumerate(result)
@@ -509,11 +935,25 @@ class Datastore:
             }
             for result in results
         ]
+        self._add_descriptions(episodes)
+        return episodes
+
+    def _add_descriptions(self, episodes: list[dict[str, object]]) -> None:
+        """Fetch the descriptions of episodes from the cold table in one query."""
+        rowids = [episode.pop("episodeRowid") for episode in episodes]
+        descriptions = dict(
+            self._read(
+                f"SELECT rowid, coalesce({DESCRIPTION}, 'No description') "
+                f"FROM {EPISODES_EXTENDED} "
+                "WHERE rowid IN (SELECT value FROM json_each(?))",
+                [json.dumps(rowids)],
+            ),
+        )
+        for rowid, episode in zip(rowids, episodes, strict=True):
+            episode["description"] = descriptions.get(rowid, "No description")
 
     def get_recently_played(self) -> list[dict[str, object]]:
         """Retrieve a list of recently played episodes with metadata."""
-        self._clean_enclosure_urls(deduplicate=True)
-
         base_fields = self._get_base_fields()
         fields = [
             *base_fields,
@@ -523,17 +963,15 @@ class Datastore:
 
         query = self._build_episode_query(
             fields=fields,
-            where_clause="played=1 OR progress>300",
+            where_clause=f"played=1 OR progress>{PLAYED_PROGRESS}",
             order_by=f"{USER_UPDATED_DATE} DESC",
         )
 
-        results = self.db.execute(query).fetchall()
+        results = self._read(query)
         return self._process_query_results(results=results, fields=fields)
 
     def get_starred_episodes(self) -> list[dict[str, object]]:
         """Retrieve a list of starred episodes with metadata."""
-        self._clean_enclosure_urls()
-
         base_fields = self._get_base_fields()
         fields = [
             *base_fields,
@@ -547,13 +985,11 @@ class Datastore:
             order_by=f"{USER_REC_DATE} DESC",
         )
 
-        results = self.db.execute(query).fetchall()
+        results = self._read(query)
         return self._process_query_results(results=results, fields=fields)
 
     def get_deleted_episodes(self) -> list[dict[str, object]]:
         """Retrieve a list of deleted episodes with metadata."""
-        self._clean_enclosure_urls()
-
         base_fields = self._get_base_fields()
         fields = [
             *base_fields,
@@ -567,9 +1003,54 @@ class Datastore:
             order_by=f"{USER_UPDATED_DATE} DESC",
         )
 
-        results = self.db.execute(query).fetchall()
+        results = self._read(query)
         return self._process_query_results(results=results, fields=fields)
 
+    def episode_page(
+        self,
+        fields: tuple[str, ...] = DEFAULT_FIELDS,
+        filters: EpisodeFilter | None = None,
+        *,
+        after: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> EpisodePage:
+        """Return one page of episodes, newest activity first.
+
+        Pass the page's next_cursor as after to get the page that follows.
+        """
+        sql, params = episode_sql(
+            fields,
+            filters or EpisodeFilter(),
+            after=after,
+            limit=limit + 1,
+        )
+        return build_episode_page(self._read(sql, params), fields, limit=limit)
+
+    def iter_episodes(
+        self,
+        fields: tuple[str, ...] = DEFAULT_FIELDS,
+        filters: EpisodeFilter | None = None,
+        *,
+        after: str | None = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[dict[str, object]]:
+        """Stream every matching episode, newest activity first.
+
+        Rows are read a page at a time, each page starting after the last
+        row yielded, so memory and the cost of each page stay flat however
+        far the iteration goes.
+        """
+        filters = filters or EpisodeFilter()
+        while True:
+            sql, params = episode_sql(fields, filters, after=after, limit=page_size)
+            rows = 0
+            for *values, date, rowid in self.db.execute(sql, params):
+                rows += 1
+                after = format_episode_cursor(date, rowid)
+                yield dict(zip(fields, values, strict=True))
+            if rows < page_size:
+                return
+
     def cleanup_old_episodes(self) -> None:
         """Delete episodes older than OVERCAST_LIMIT_DAYS.
 
@@ -598,69 +1079,140 @@ class Datastore:
     # STATS
 
     def get_listening_stats(self) -> dict[str, int]:
-        """Get aggregate listening statistics."""
-        played = self.db.execute(
-            f"SELECT COUNT(*) FROM {EPISODES} WHERE played=1",
-        ).fetchone()[0]
-
-        total_progress = self.db.execute(
-            f"SELECT COALESCE(SUM({PROGRESS}), 0) FROM {EPISODES} "
-            f"WHERE {PROGRESS} > 0",
-        ).fetchone()[0]
-
-        feeds_subscribed = self.db.execute(
-            f"SELECT COUNT(*) FROM {FEEDS} WHERE subscribed=1",
-        ).fetchone()[0]
-
-        feeds_removed = self.db.execute(
-            f"SELECT COUNT(*) FROM {FEEDS} WHERE dateRemoveDetected IS NOT NULL",
-        ).fetchone()[0]
-
-        starred = self.db.execute(
-            f"SELECT COUNT(*) FROM {EPISODES} WHERE {USER_REC_DATE} IS NOT NULL",
-        ).fetchone()[0]
-
-        return {
-            "episodes_played": played,
-            "total_progress_seconds": total_progress,
-            "feeds_subscribed": feeds_subscribed,
-            "feeds_removed": feeds_removed,
-            "episodes_starred": starred,
-        }
+        """Get aggregate listening statistics, kept up to date by triggers."""
+        rows = self._read(
+            f"SELECT {', '.join(STATS_COLUMNS.values())} FROM {STATS_SUMMARY};",
+        )
+        row = rows[0] if rows else (0,) * len(STATS_COLUMNS)
+        return dict(zip(STATS_COLUMNS, row, strict=True))
 
     def get_top_podcasts_by_episodes(
         self,
         limit: int = 10,
     ) -> list[tuple[str, int]]:
         """Get top podcasts ranked by number of played episodes."""
-        return self.db.execute(
-            f"SELECT {FEEDS}.{TITLE}, COUNT(*) as count "
-            f"FROM {EPISODES} "
-            f"JOIN {FEEDS} ON {EPISODES}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
-            f"WHERE played=1 "
-            f"GROUP BY {EPISODES}.{FEED_ID} "
-            f"ORDER BY count DESC LIMIT ?",
+        return self._read(
+            f"SELECT {FEEDS}.{TITLE}, {FEED_STATS}.played "
+            f"FROM {FEED_STATS} "
+            f"JOIN {FEEDS} ON {FEED_STATS}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
+            f"WHERE {FEED_STATS}.played > 0 "
+            f"ORDER BY {FEED_STATS}.played DESC LIMIT ?",
             [limit],
-        ).fetchall()
+        )
 
     def get_top_podcasts_by_time(
         self,
         limit: int = 10,
     ) -> list[tuple[str, int]]:
         """Get top podcasts ranked by total listening time."""
-        return self.db.execute(
-            f"SELECT {FEEDS}.{TITLE}, "
-            f"COALESCE(SUM({PROGRESS}), 0) as total_time "
-            f"FROM {EPISODES} "
-            f"JOIN {FEEDS} ON {EPISODES}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
-            f"WHERE {PROGRESS} > 0 "
-            f"GROUP BY {EPISODES}.{FEED_ID} "
-            f"ORDER BY total_time DESC LIMIT ?",
+        return self._read(
+            f"SELECT {FEEDS}.{TITLE}, {FEED_STATS}.progressSeconds "
+            f"FROM {FEED_STATS} "
+            f"JOIN {FEEDS} ON {FEED_STATS}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
+            f"WHERE {FEED_STATS}.progressSeconds > 0 "
+            f"ORDER BY {FEED_STATS}.progressSeconds DESC LIMIT ?",
             [limit],
-        ).fetchall()
+        )
+
+    def verify_stats(self) -> list[str]:
+        """Recount the statistics, describing any drift from the stored values."""
+        return verify_stats(self.db)
+
+    def rebuild_stats(self) -> None:
+        """Recompute the stored statistics from episodes and feeds."""
+        connection = self._conn()
+        with connection:
+            rebuild_stats(self.db)
 
     # SEARCH
 
+    def search(  # noqa: PLR0913
+        self,
+        query: str,
+        *,
+        limit: int = 20,
+        after: str | None = None,
+        weights: Mapping[str, tuple[float, ...]] | None = None,
+        highlight: tuple[str, str] = DEFAULT_HIGHLIGHT,
+        raw: bool = False,
+        substring: bool = False,
+    ) -> SearchPage:
+        """Search episodes, feeds, chapters and transcripts in one bm25 ranking.
+
+        The query's words must all match, taken literally; pass raw=True to
+        use FTS5 query syntax instead. weights maps a kind from search.KINDS
+        to its bm25 column weights. Pass a page's next_cursor as after to
+        fetch the following page.
+
+        With substring=True and the trigram indexes built, episodes and
+        chapters containing every word inside other words also match,
+        ranked after all whole-word matches.
+        """
+        params = search_params(
+            query,
+            limit=limit,
+            after=after,
+            weights=weights or {},
+            highlight=highlight,
+            raw=raw,
+            substring=substring and not raw,
+        )
+        if not params["query"]:
+            return SearchPage([], None)
+        sources = list(KINDS)
+        if TRANSCRIPT_DL_PATH not in self._table(EPISODES_EXTENDED).columns_dict:
+            sources.remove("transcript")
+        if params["substring"] and self.has_trigram_indexes():
+            sources += ["episode substring", "chapter substring"]
+        try:
+            rows = self._read(search_sql(sources, after=after is not None), params)
+        except sqlite3.OperationalError as e:
+            raise SearchQueryError(query, str(e)) from e
+        return build_page(rows, query=query, limit=limit, highlight=highlight)
+
+    def has_trigram_indexes(self) -> bool:
+        """Return whether the substring search indexes have been built."""
+        return all(self.db[f"{table}_trigram"].exists() for table in TRIGRAM_COLUMNS)
+
+    def create_trigram_indexes(self) -> None:
+        """Build the trigram indexes used by substring search."""
+        create_trigram_indexes(self.db)
+
+    def drop_trigram_indexes(self) -> None:
+        """Remove the trigram indexes, reclaiming their space on the next VACUUM."""
+        drop_trigram_indexes(self.db)
+
+    # COMPRESSION
+
+    def compress_text_columns(self, codec: str = DEFAULT_CODEC) -> tuple[int, int]:
+        """Store episode content:encoded compressed with codec.
+
+        Returns the bytes the column took up before and after.
+        """
+        return self._rewrite_text_columns(
+            lambda: compress_columns(self.db, EPISODES_EXTENDED, codec),
+        )
+
+    def decompress_text_columns(self) -> tuple[int, int]:
+        """Store compressed episode text as plain text again."""
+        return self._rewrite_text_columns(
+            lambda: decompress_columns(self.db, EPISODES_EXTENDED),
+        )
+
+    def _rewrite_text_columns(self, rewrite: Callable[[], None]) -> tuple[int, int]:
+        before = stored_bytes(self.db, EPISODES_EXTENDED)
+        trigram = self.has_trigram_indexes()
+        if trigram:
+            drop_trigram_indexes(self.db)
+        with self._conn():
+            # The indexed text is unchanged, so index only once at the end.
+            drop_word_index_triggers(self.db, EPISODES_EXTENDED)
+            rewrite()
+            rebuild_word_index(self.db, EPISODES_EXTENDED)
+        if trigram:
+            create_trigram_indexes(self.db)
+        return before, stored_bytes(self.db, EPISODES_EXTENDED)
+
     def search_episodes(
         self,
         query: str,
@@ -668,16 +1220,16 @@ class Datastore:
     ) -> list[tuple[str, str]]:
         """Search episodes using full-text search."""
         try:
-            return self.db.execute(
+            return self._read(
                 f"SELECT ee.{TITLE}, fe.{TITLE} "
                 f"FROM {EPISODES_EXTENDED}_fts fts "
-                f"JOIN {EPISODES_EXTENDED} ee ON ee.rowid = fts.rowid "
+                f"JOIN {EPISODES_EXTENDED_HOT} ee ON ee.rowid = fts.rowid "
                 f"LEFT JOIN {FEEDS_EXTENDED} fe "
                 f"ON ee.{FEED_XML_URL} = fe.{XML_URL} "
                 f"WHERE {EPISODES_EXTENDED}_fts MATCH ? "
                 f"ORDER BY fts.rank LIMIT ?",
                 [query, limit],
-            ).fetchall()
+            )
         except sqlite3.OperationalError:
             return []
 
@@ -688,14 +1240,14 @@ class Datastore:
     ) -> list[tuple[str]]:
         """Search feeds using full-text search."""
         try:
-            return self.db.execute(
+            return self._read(
                 f"SELECT fe.{TITLE} "
                 f"FROM {FEEDS_EXTENDED}_fts fts "
                 f"JOIN {FEEDS_EXTENDED} fe ON fe.rowid = fts.rowid "
                 f"WHERE {FEEDS_EXTENDED}_fts MATCH ? "
                 f"ORDER BY fts.rank LIMIT ?",
                 [query, limit],
-            ).fetchall()
+            )
         except sqlite3.OperationalError:
             return []
 
@@ -706,13 +1258,53 @@ class Datastore:
     ) -> list[tuple[str]]:
         """Search chapters using full-text search."""
         try:
-            return self.db.execute(
+            return self._read(
                 f"SELECT ch.{CONTENT} "
                 f"FROM {CHAPTERS}_fts fts "
                 f"JOIN {CHAPTERS} ch ON ch.rowid = fts.rowid "
                 f"WHERE {CHAPTERS}_fts MATCH ? "
                 f"ORDER BY fts.rank LIMIT ?",
                 [query, limit],
-            ).fetchall()
+            )
+        except sqlite3.OperationalError:
+            return []
+
+    def search_transcripts(
+        self,
+        query: str,
+        limit: int = 20,
+    ) -> list[tuple[str | None, str | None, float | None, str]]:
+        """Search transcript segments using full-text search.
+
+        Returns (episode title, feed title, segment start seconds, segment text).
+        """
+        try:
+            rows = self._read(
+                f"SELECT t.id, t.text, s.startTime, s.textStart, s.textEnd, "
+                f"(SELECT ee.{TITLE} FROM {EPISODES_EXTENDED_HOT} ee "
+                f"WHERE ee.{TRANSCRIPT_DL_PATH} = t.path LIMIT 1), "
+                f"(SELECT fe.{TITLE} FROM {EPISODES_EXTENDED_HOT} ee "
+                f"JOIN {FEEDS_EXTENDED} fe ON ee.{FEED_XML_URL} = fe.{XML_URL} "
+                f"WHERE ee.{TRANSCRIPT_DL_PATH} = t.path LIMIT 1) "
+                f"FROM {TRANSCRIPT_SEGMENTS}_fts fts "
+                f"JOIN {TRANSCRIPT_SEGMENTS} s ON s.id = fts.rowid "
+                f"JOIN {TRANSCRIPTS} t ON t.id = s.transcriptId "
+                f"WHERE {TRANSCRIPT_SEGMENTS}_fts MATCH ? "
+                f"ORDER BY fts.rank LIMIT ?",
+                [query, limit],
+            )
         except sqlite3.OperationalError:
             return []
+        texts: dict[int, str] = {}
+        results = []
+        for transcript_id, blob, start_time, start, end, title, feed in rows:
+            if transcript_id not in texts:
+                texts[transcript_id] = zlib.decompress(blob).decode()
+            results.append((title, feed, start_time, texts[transcript_id][start:end]))
+        return results
+
+    # STORAGE
+
+    def storage_report(self, *, sample: int = DEFAULT_SAMPLE) -> StorageReport:
+        """Measure each table and index, and sample up to sample rows per table."""
+        return storage_report(self.db, sample=sample)
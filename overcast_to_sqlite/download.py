@@ -0,0 +1,199 @@
+"""Streaming, resumable HTTP downloads with constant memory per worker."""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+
+import requests
+
+from .exceptions import DownloadDeclinedError, DownloadError, DownloadTooLargeError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+    from pathlib import Path
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_TIMEOUT = (10.0, 60.0)
+_VALIDATOR_SUFFIX = ".validator"
+
+
+@dataclasses.dataclass
+class DownloadResult:
+    """Outcome of a download; path is None when the server answered 304."""
+
+    path: Path | None
+    size: int
+    etag: str | None
+    last_modified: str | None
+    sha256: str | None = None
+
+
+def _validator_path(part_path: Path) -> Path:
+    return part_path.with_name(part_path.name + _VALIDATOR_SUFFIX)
+
+
+def _resume_headers(part_path: Path) -> dict[str, str]:
+    """Return Range/If-Range headers when a partial download can be resumed.
+
+    A partial file is only resumed if the ETag or Last-Modified value of the
+    response that started it was kept, so a changed resource is refetched in
+    full instead of being spliced onto stale bytes.
+    """
+    validator_path = _validator_path(part_path)
+    if not part_path.exists() or not validator_path.exists():
+        return {}
+    if (offset := part_path.stat().st_size) == 0:
+        return {}
+    return {
+        "Range": f"bytes={offset}-",
+        "If-Range": validator_path.read_text(),
+    }
+
+
+def _request_headers(
+    headers: dict,
+    part_path: Path,
+    etag: str | None,
+    last_modified: str | None,
+) -> dict[str, str]:
+    """Add the resume and conditional request headers to headers."""
+    request_headers = {**headers, **_resume_headers(part_path)}
+    if etag:
+        request_headers["If-None-Match"] = etag
+    if last_modified:
+        request_headers["If-Modified-Since"] = last_modified
+    return request_headers
+
+
+def _content_range_start(response: requests.Response) -> int | None:
+    """Return the first byte offset of a 206 response's Content-Range."""
+    content_range = response.headers.get("content-range", "")
+    unit, _, byte_range = content_range.partition(" ")
+    start, _, _ = byte_range.partition("-")
+    return int(start) if unit == "bytes" and start.isdigit() else None
+
+
+def _discard_partial(part_path: Path) -> None:
+    part_path.unlink(missing_ok=True)
+    _validator_path(part_path).unlink(missing_ok=True)
+
+
+def _stream_to_part(
+    response: requests.Response,
+    part_path: Path,
+    offset: int,
+    max_bytes: int,
+) -> tuple[int, str]:
+    """Append the response body to part_path in chunks.
+
+    Returns the total size and SHA-256 of the file, hashing any resumed
+    prefix first so the digest always covers the whole file. A connection
+    that drops mid-body raises DownloadError and leaves part_path to resume.
+    """
+    digest = hashlib.sha256()
+    if offset:
+        with part_path.open("rb") as file:
+            while chunk := file.read(CHUNK_SIZE):
+                digest.update(chunk)
+    written = offset
+    try:
+        with part_path.open(mode="ab" if offset else "wb") as file:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    break
+                digest.update(chunk)
+                file.write(chunk)
+    except (requests.exceptions.RequestException, OSError) as e:
+        # The bytes written so far stay in part_path for the next attempt.
+        raise DownloadError(response.url, str(e)) from e
+    if written > max_bytes:
+        _discard_partial(part_path)
+        raise DownloadTooLargeError(response.url, max_bytes)
+    return written, digest.hexdigest()
+
+
+def download_to_file(  # noqa: PLR0913
+    url: str,
+    part_path: Path,
+    destination: Callable[[Mapping[str, str]], Path],
+    *,
+    headers: dict,
+    max_bytes: int,
+    timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+    etag: str | None = None,
+    last_modified: str | None = None,
+    reserve: Callable[[int], bool] | None = None,
+) -> DownloadResult:
+    """Stream url into part_path, then atomically rename it into place.
+
+    destination is called with the response headers to pick the final path.
+    Passing the etag/last_modified of a previous download makes the request
+    conditional. reserve, if given, is called with the expected size of the
+    file before its body is read; the download is abandoned with
+    DownloadDeclinedError if it returns False. Raises DownloadError on HTTP
+    errors and DownloadTooLargeError once more than max_bytes would be written.
+    """
+    try:
+        response = requests.get(
+            url,
+            headers=_request_headers(headers, part_path, etag, last_modified),
+            stream=True,
+            timeout=timeout,
+        )
+    except requests.exceptions.RequestException as e:
+        raise DownloadError(url, str(e)) from e
+
+    with response:
+        if response.status_code == HTTPStatus.NOT_MODIFIED:
+            return DownloadResult(None, 0, etag, last_modified)
+        if response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE:
+            _discard_partial(part_path)
+            raise DownloadError(url, "Stale partial download discarded")
+        if not response.ok:
+            raise DownloadError(url, f"Error code {response.status_code}")
+
+        resumed = response.status_code == HTTPStatus.PARTIAL_CONTENT
+        written = part_path.stat().st_size if resumed else 0
+        if resumed and _content_range_start(response) != written:
+            # Bytes from another offset would corrupt the file, so start over.
+            _discard_partial(part_path)
+            return download_to_file(
+                url,
+                part_path,
+                destination,
+                headers=headers,
+                max_bytes=max_bytes,
+                timeout=timeout,
+                etag=etag,
+                last_modified=last_modified,
+                reserve=reserve,
+            )
+        content_length = int(response.headers.get("content-length") or 0)
+        if written + content_length > max_bytes:
+            _discard_partial(part_path)
+            raise DownloadTooLargeError(url, max_bytes)
+        if reserve is not None and not reserve(written + content_length):
+            raise DownloadDeclinedError(url, written + content_length)
+
+        new_etag = response.headers.get("etag")
+        new_last_modified = response.headers.get("last-modified")
+        if not resumed and (validator := new_etag or new_last_modified):
+            _validator_path(part_path).write_text(validator)
+
+        written, sha256 = _stream_to_part(response, part_path, written, max_bytes)
+        final_path = destination(response.headers)
+
+    final_path.parent.mkdir(parents=True, exist_ok=True)
+    part_path.replace(final_path)
+    _validator_path(part_path).unlink(missing_ok=True)
+    return DownloadResult(final_path, written, new_etag, new_last_modified, sha256)
+
+
+def partial_path_for(directory: Path, stem: str) -> Path:
+    """Return the stable in-progress path used to resume a download of stem."""
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f".{stem}.part"
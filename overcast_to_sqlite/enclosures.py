@@ -0,0 +1,259 @@
+"""Archive episode audio within a disk quota, evicting least recently used files."""
+
+from __future__ import annotations
+
+import bisect
+import datetime
+import functools
+import hashlib
+import operator
+import re
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .blobs import BLOB_KIND_ENCLOSURE, StoredBlob, store_blob
+from .download import download_to_file, partial_path_for
+from .exceptions import DownloadDeclinedError, DownloadError
+from .pipeline import DEFAULT_PER_HOST, PipelineStats, fetch_pipeline
+from .utils import _file_extension_for_type, _headers_ua
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .datastore import Datastore
+
+_WRITE_BATCH_SIZE = 20
+_ENCLOSURE_HOST_DELAY = 0.5
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$", re.IGNORECASE)
+
+
+def parse_size(size: str) -> int:
+    """Parse a size such as 500M, 20G or 1.5TB into bytes."""
+    if (match := _SIZE_PATTERN.match(size)) is None:
+        msg = f"Invalid size: {size}"
+        raise ValueError(msg)
+    return int(float(match[1]) * _SIZE_UNITS[match[2].upper()])
+
+
+class _Quota:
+    """Track archive usage and pick least recently used files to evict.
+
+    Downloads reserve their expected size before their body is read, so
+    downloads running at once cannot together overshoot the quota.
+    """
+
+    def __init__(self, db: Datastore, quota_bytes: int | None) -> None:
+        self.quota_bytes = quota_bytes
+        self.full = threading.Event()
+        self._archived = list(db.archived_enclosures())
+        self._sizes = {path: size or 0 for _, path, size, _ in self._archived}
+        self._refs = Counter(path for _, path, _, _ in self._archived)
+        self._reserved: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def usage(self) -> int:
+        return sum(self._sizes.values())
+
+    def reserve(self, enclosure: str, size: int, last_used: str) -> bool:
+        """Hold size bytes for a download of enclosure that is about to start.
+
+        Returns False, holding nothing, if size does not fit beside the
+        other reservations even after evicting every file last used before
+        last_used.
+        """
+        with self._lock:
+            if self.quota_bytes is None:
+                return True
+            newest: dict[str, str] = {}
+            for _, path, _, archived_last_used in self._archived:
+                newest[path] = max(newest.get(path, ""), archived_last_used)
+            evictable = sum(
+                self._sizes[path]
+                for path, archived_last_used in newest.items()
+                if archived_last_used < last_used
+            )
+            held = sum(self._reserved.values())
+            if self.usage - evictable + held + size > self.quota_bytes:
+                return False
+            self._reserved[enclosure] = size
+            return True
+
+    def release(self, enclosure: str) -> None:
+        """Drop the reservation of a download that finished or failed."""
+        with self._lock:
+            self._reserved.pop(enclosure, None)
+
+    def make_room(
+        self,
+        enclosure: str,
+        blob: StoredBlob,
+        last_used: str,
+    ) -> list[str] | None:
+        """Account for blob, returning the enclosures to evict to fit it.
+
+        Only files last used before last_used are evicted, including ones
+        downloaded earlier in the same run. Returns None, and changes nothing,
+        if blob cannot fit.
+        """
+        path = str(blob.path.absolute())
+        entry = (enclosure, path, blob.size, last_used)
+        with self._lock:
+            self._reserved.pop(enclosure, None)
+            if self.quota_bytes is None or path in self._sizes:
+                self._add(entry)
+                return []
+            return self._evict_for(entry)
+
+    def _evict_for(self, entry: tuple[str, str, int, str]) -> list[str] | None:
+        _, _, size, last_used = entry
+        refs = self._refs.copy()
+        evict: list[str] = []
+        freed = 0
+        for archived_enclosure, archived_path, _, archived_last_used in self._archived:
+            if self.usage + size - freed <= self.quota_bytes:
+                break
+            if archived_last_used >= last_used:
+                return None
+            evict.append(archived_enclosure)
+            refs[archived_path] -= 1
+            if refs[archived_path] == 0:
+                freed += self._sizes[archived_path]
+        if self.usage + size - freed > self.quota_bytes:
+            return None
+        for _, archived_path, _, _ in self._archived[: len(evict)]:
+            self._refs[archived_path] -= 1
+            if self._refs[archived_path] == 0:
+                del self._sizes[archived_path]
+        del self._archived[: len(evict)]
+        self._add(entry)
+        return evict
+
+    def _add(self, entry: tuple[str, str, int, str]) -> None:
+        _, path, size, _ = entry
+        self._sizes[path] = size
+        self._refs[path] += 1
+        bisect.insort(self._archived, entry, key=operator.itemgetter(3))
+
+
+def _download_enclosure(  # noqa: PLR0913
+    candidate: tuple[str, str, str, str | None],
+    *,
+    root: Path,
+    max_bytes: int,
+    quota: _Quota,
+    now: str,
+    verbose: bool,
+) -> StoredBlob | str | None:
+    """Download one enclosure into the blob store, returning an error string.
+
+    The audio is fetched from the source URL as the feed gave it; the
+    canonical URL may not be servable, and only names the partial download.
+    """
+    url, source_url, title, last_used = candidate
+    if quota.full.is_set():
+        return None
+    if verbose:
+        print(f"⬇️Downloading {title} @ {source_url}")
+    incoming_path = root / ".incoming"
+    file_stem = hashlib.sha256(url.encode()).hexdigest()
+    try:
+        result = download_to_file(
+            source_url,
+            partial_path_for(incoming_path, file_stem),
+            lambda headers: (
+                incoming_path
+                / (file_stem + _file_extension_for_type(headers, "audio/mpeg"))
+            ),
+            headers=_headers_ua(),
+            max_bytes=max_bytes,
+            reserve=lambda size: quota.reserve(url, size, last_used or now),
+        )
+    except DownloadDeclinedError:
+        print(f"⚠️Quota full, not downloading {title}")
+        quota.full.set()
+        return None
+    except DownloadError as e:
+        print(f"⛔ {e}")
+        return str(e)
+    if result.path is None:
+        return None
+    return store_blob(root, result.path, result.sha256)
+
+
+def archive_enclosures(  # noqa: C901, PLR0913
+    db: Datastore,
+    root: Path,
+    *,
+    starred: bool,
+    played: bool,
+    feeds: Iterable[str] = (),
+    quota_bytes: int | None = None,
+    per_host: int = DEFAULT_PER_HOST,
+    verbose: bool = False,
+) -> int:
+    """Stream the audio of selected episodes into a content-addressed archive.
+
+    Returns the number of episodes downloaded. Once an episode does not fit in
+    quota_bytes, even after evicting every less recently used file, no
+    further downloads are started.
+    """
+    quota = _Quota(db, quota_bytes)
+    now = datetime.datetime.now(tz=datetime.UTC).isoformat()
+
+    archived = 0
+    downloads: list[tuple[str, str, int, str]] = []
+
+    def _flush() -> None:
+        db.save_enclosure_downloads(downloads)
+        db.save_blob_refs(
+            BLOB_KIND_ENCLOSURE,
+            [(url, sha256, path, size) for url, path, size, sha256 in downloads],
+        )
+        downloads.clear()
+
+    stats = PipelineStats()
+    for (url, _, title, last_used), blob in fetch_pipeline(
+        db.enclosures_to_download(starred=starred, played=played, feeds=feeds),
+        functools.partial(
+            _download_enclosure,
+            root=root,
+            max_bytes=quota_bytes or sys.maxsize,
+            quota=quota,
+            now=now,
+            verbose=verbose,
+        ),
+        url_of=lambda candidate: candidate[1],
+        per_host=per_host,
+        min_interval=_ENCLOSURE_HOST_DELAY,
+        is_error=lambda blob: isinstance(blob, str),
+        stats=stats,
+    ):
+        if not isinstance(blob, StoredBlob):
+            quota.release(url)
+            continue
+        if (evict := quota.make_room(url, blob, last_used or now)) is None:
+            print(f"⚠️Quota full, not keeping {title}")
+            quota.full.set()
+            if blob.created:
+                blob.path.unlink()
+            continue
+        if evict:
+            _flush()
+            for path in db.evict_enclosures(evict):
+                Path(path).unlink(missing_ok=True)
+            if verbose:
+                print(f"🗑️Evicted {len(evict)} episodes to stay within quota")
+        downloads.append((url, str(blob.path.absolute()), blob.size, blob.sha256))
+        archived += 1
+        if len(downloads) >= _WRITE_BATCH_SIZE:
+            _flush()
+    _flush()
+    if verbose:
+        for line in stats.summary():
+            print(f"📊{line}")
+    return archived
@@ -13,7 +13,11 @@ from podcast_chapter_tools.extractors import (
 )
 
 from overcast_to_sqlite.constants import ENCLOSURE_URL, FEED_XML_URL, TITLE
-from overcast_to_sqlite.utils import _headers_ua, _parse_date_or_none
+from overcast_to_sqlite.utils import (
+    _canonical_enclosure_url,
+    _headers_ua,
+    _parse_date_or_none,
+)
 
 
 def _element_to_dict(element: ElementTree.Element) -> dict[str, Any]:
@@ -94,7 +98,9 @@ def extract_ep_attrs(
         ep_attrs.update(_element_to_dict(ep_el))
 
     if "enclosure:url" in ep_attrs:
-        ep_attrs[ENCLOSURE_URL] = ep_attrs.pop("enclosure:url").split("?")[0]
+        ep_attrs[ENCLOSURE_URL] = _canonical_enclosure_url(
+            ep_attrs.pop("enclosure:url"),
+        )
         # Need to figure out how to extract chapters more cheaply, this is expensive
         # to perform across all episodes.
         return ep_attrs, []
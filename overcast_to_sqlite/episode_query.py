@@ -0,0 +1,199 @@
+"""Page through listening history by keyset, newest activity first.
+
+Episodes are ordered by (userUpdatedDate, rowid) descending, and each
+page starts where the previous one ended instead of skipping rows with
+OFFSET, so every page reads only its own rows from the userUpdatedDate
+index however deep it is. Episodes without a userUpdatedDate come last.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+
+from .constants import (
+    DESCRIPTION,
+    ENCLOSURE_ID,
+    ENCLOSURE_URL,
+    EPISODES,
+    EPISODES_EXTENDED,
+    EPISODES_EXTENDED_HOT,
+    FEED_ID,
+    FEEDS,
+    OVERCAST_ID,
+    PLAYED_PROGRESS,
+    PROGRESS,
+    PUB_DATE,
+    TITLE,
+    URL,
+    USER_REC_DATE,
+    USER_UPDATED_DATE,
+)
+
+DEFAULT_PAGE_SIZE = 100
+# Fields that can be selected, and the SQL that reads each of them.
+EPISODE_FIELDS = {
+    OVERCAST_ID: f"e.{OVERCAST_ID}",
+    TITLE: f"e.{TITLE}",
+    FEED_ID: f"e.{FEED_ID}",
+    "feedTitle": f"f.{TITLE}",
+    URL: f"e.{URL}",
+    "overcastUrl": "e.overcastUrl",
+    ENCLOSURE_URL: f"e.{ENCLOSURE_URL}",
+    "played": "e.played",
+    PROGRESS: f"e.{PROGRESS}",
+    "starred": f"e.{USER_REC_DATE} IS NOT NULL",
+    "userDeleted": "e.userDeleted",
+    USER_UPDATED_DATE: f"e.{USER_UPDATED_DATE}",
+    USER_REC_DATE: f"e.{USER_REC_DATE}",
+    PUB_DATE: f"e.{PUB_DATE}",
+    "link": "ee.link",
+    "image": 'ee."itunes:image:href"',
+    # Read from the wide table only for the rows on the page.
+    DESCRIPTION: (
+        f"(SELECT x.{DESCRIPTION} FROM {EPISODES_EXTENDED} x WHERE x.rowid = ee.id)"
+    ),
+}
+DEFAULT_FIELDS = (
+    OVERCAST_ID,
+    TITLE,
+    "feedTitle",
+    USER_UPDATED_DATE,
+    "played",
+    PROGRESS,
+    "starred",
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class EpisodeFilter:
+    """Which episodes to list; None leaves a condition out.
+
+    since and until bound userUpdatedDate, since inclusive and until
+    exclusive, and compare as ISO 8601 strings, so a date alone works.
+    played matches episodes played or listened to for over five minutes,
+    as the episodes_played view does.
+    """
+
+    feed_id: int | None = None
+    since: str | None = None
+    until: str | None = None
+    starred: bool | None = None
+    played: bool | None = None
+
+
+@dataclasses.dataclass
+class EpisodePage:
+    """A page of episodes, with next_cursor set when more follow."""
+
+    episodes: list[dict[str, object]]
+    next_cursor: str | None
+
+
+def format_cursor(user_updated_date: str | None, rowid: int) -> str:
+    """Return the opaque position after the episode with these keys."""
+    return f"{rowid}:{user_updated_date or ''}"
+
+
+def parse_cursor(cursor: str) -> tuple[str | None, int]:
+    """Split a cursor back into (userUpdatedDate, rowid)."""
+    rowid, _, date = cursor.partition(":")
+    try:
+        return date or None, int(rowid)
+    except ValueError:
+        msg = f"Invalid episode cursor: {cursor}"
+        raise ValueError(msg) from None
+
+
+def _filter_conditions(filters: EpisodeFilter) -> tuple[list[str], dict[str, object]]:
+    conditions = []
+    params: dict[str, object] = {}
+    if filters.feed_id is not None:
+        conditions.append(f"{FEED_ID} = :feed_id")
+        params["feed_id"] = filters.feed_id
+    if filters.since is not None:
+        conditions.append(f"{USER_UPDATED_DATE} >= :since")
+        params["since"] = filters.since
+    if filters.until is not None:
+        conditions.append(f"{USER_UPDATED_DATE} < :until")
+        params["until"] = filters.until
+    if filters.starred is not None:
+        negate = "NOT " if filters.starred else ""
+        conditions.append(f"{USER_REC_DATE} IS {negate}NULL")
+    if filters.played is not None:
+        negate = "" if filters.played else "NOT "
+        listened = f"coalesce({PROGRESS}, 0) > {PLAYED_PROGRESS}"
+        conditions.append(f"{negate}(played = 1 OR {listened})")
+    return conditions, params
+
+
+def _page_rowids(conditions: list[str], order: str) -> str:
+    return (
+        f"SELECT * FROM (SELECT rowid, {USER_UPDATED_DATE} FROM {EPISODES} "
+        f"WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT :limit)"
+    )
+
+
+def episode_sql(
+    fields: tuple[str, ...],
+    filters: EpisodeFilter,
+    *,
+    after: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> tuple[str, dict[str, object]]:
+    """Return SQL and parameters for one page of episodes.
+
+    Each row holds the fields in order, then the userUpdatedDate and
+    rowid that make up its cursor. Dated and undated episodes are read
+    separately, as a single condition spanning both would stop SQLite
+    seeking into the index at the cursor.
+    """
+    unknown = [field for field in fields if field not in EPISODE_FIELDS]
+    if unknown:
+        msg = f"Unknown episode fields: {', '.join(unknown)}"
+        raise ValueError(msg)
+    conditions, params = _filter_conditions(filters)
+    params["limit"] = limit
+    dated = [*conditions, f"{USER_UPDATED_DATE} IS NOT NULL"]
+    undated = [*conditions, f"{USER_UPDATED_DATE} IS NULL"]
+    if after is not None:
+        params["after_date"], params["after_rowid"] = parse_cursor(after)
+        dated = [
+            *conditions,
+            f"{USER_UPDATED_DATE} <= :after_date",
+            f"({USER_UPDATED_DATE} < :after_date OR rowid < :after_rowid)",
+        ]
+        if params["after_date"] is None:
+            # Already past every dated episode.
+            dated = None
+            undated.append("rowid < :after_rowid")
+    sources = [_page_rowids(undated, "rowid DESC")]
+    if dated is not None:
+        order = f"{USER_UPDATED_DATE} DESC, rowid DESC"
+        sources.insert(0, _page_rowids(dated, order))
+    page = " UNION ALL ".join(sources)
+    columns = ", ".join(EPISODE_FIELDS[field] for field in fields)
+    sql = (
+        f"SELECT {columns}, e.{USER_UPDATED_DATE}, e.rowid "
+        f"FROM ({page}) page "
+        f"JOIN {EPISODES} e ON e.rowid = page.rowid "
+        f"LEFT JOIN {FEEDS} f ON f.{OVERCAST_ID} = e.{FEED_ID} "
+        f"LEFT JOIN {EPISODES_EXTENDED_HOT} ee "
+        f"ON ee.{ENCLOSURE_ID} = e.{ENCLOSURE_ID} "
+        f"ORDER BY page.{USER_UPDATED_DATE} DESC, page.rowid DESC LIMIT :limit"
+    )
+    return sql, params
+
+
+def build_page(
+    rows: list[tuple],
+    fields: tuple[str, ...],
+    *,
+    limit: int,
+) -> EpisodePage:
+    """Turn up to limit + 1 episode_sql rows into a page."""
+    episodes = [dict(zip(fields, row, strict=False)) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        *_, date, rowid = rows[limit - 1]
+        next_cursor = format_cursor(date, rowid)
+    return EpisodePage(episodes, next_cursor)
@@ -17,3 +17,43 @@ class OpmlFetchError(Exception):
 
     def __str__(self: OpmlFetchError) -> str:
         return repr(self.headers)
+
+
+class DownloadError(Exception):
+    def __init__(self, url: str, reason: str) -> None:
+        self.url = url
+        super().__init__(f"{reason} downloading {url}")
+
+
+class DownloadTooLargeError(DownloadError):
+    def __init__(self, url: str, max_bytes: int) -> None:
+        super().__init__(url, f"Exceeded {max_bytes:,} byte limit")
+
+
+class DownloadDeclinedError(DownloadError):
+    def __init__(self, url: str, size: int) -> None:
+        super().__init__(url, f"No room for {size:,} bytes")
+
+
+class SearchQueryError(Exception):
+    def __init__(self, query: str, reason: str) -> None:
+        self.query = query
+        super().__init__(f"Invalid search query {query!r}: {reason}")
+
+
+class SchemaOutdatedError(Exception):
+    def __init__(self, db_path: str, version: int) -> None:
+        self.db_path = db_path
+        self.version = version
+        super().__init__(
+            f"{db_path} (schema version {version}) needs upgrading by a "
+            "writable connection",
+        )
+
+
+class RunInProgressError(Exception):
+    def __init__(self, db_path: str, holder: object) -> None:
+        self.db_path = db_path
+        self.holder = holder
+        running = holder or "another run"
+        super().__init__(f"{running} is already writing to {db_path}")
@@ -0,0 +1,197 @@
+"""Rebuild the full-text indexes, or defer their maintenance during bulk loads."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .constants import (
+    CHAPTERS,
+    CONTENT,
+    DESCRIPTION,
+    EPISODES_EXTENDED,
+    FEEDS_EXTENDED,
+    FTS_PENDING,
+    FTS_SUSPENDED_TRIGGERS,
+    TITLE,
+)
+from .search import TRIGRAM_COLUMNS
+
+if TYPE_CHECKING:
+    from sqlite_utils import Database
+
+_DEFAULT_AUTOMERGE = 4
+
+# Word indexes created by sqlite-utils enable_fts, and the columns they cover.
+FTS_COLUMNS = {
+    FEEDS_EXTENDED: (TITLE, DESCRIPTION),
+    EPISODES_EXTENDED: (TITLE, DESCRIPTION),
+    CHAPTERS: (CONTENT,),
+}
+
+
+def _indexes(db: Database) -> dict[str, tuple[str, tuple[str, ...], str]]:
+    """Map each trigger-synced FTS table to (table, columns, trigger prefix)."""
+    indexes = {
+        f"{table}_fts": (table, columns, table)
+        for table, columns in FTS_COLUMNS.items()
+    }
+    for table, columns in TRIGRAM_COLUMNS.items():
+        if db[f"{table}_trigram"].exists():
+            indexes[f"{table}_trigram"] = (table, columns, f"{table}_trigram")
+    return indexes
+
+
+def _deferring_triggers(
+    fts: str,
+    table: str,
+    columns: tuple[str, ...],
+) -> dict[str, str]:
+    """Return triggers that log changed rows instead of indexing them.
+
+    Rows already in the index are still removed from it straight away,
+    because that needs their old values; only indexing is postponed.
+    """
+    names = ", ".join(columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    pending = f"{FTS_PENDING} WHERE ftsTable = '{fts}' AND contentRowid = old.rowid"
+    log = f"INSERT OR IGNORE INTO {FTS_PENDING} VALUES ('{fts}', new.rowid); "
+    forget = (
+        f"INSERT INTO {fts} ({fts}, rowid, {names}) "
+        f"SELECT 'delete', old.rowid, {old} "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {pending}); "
+        f"DELETE FROM {pending}; "
+    )
+    return {
+        "ai": f"AFTER INSERT ON {table} BEGIN {log}END;",
+        "ad": f"AFTER DELETE ON {table} BEGIN {forget}END;",
+        "au": f"AFTER UPDATE ON {table} BEGIN {forget}{log}END;",
+    }
+
+
+def fts_triggers_suspended(db: Database) -> bool:
+    """Return whether a bulk load has the FTS sync triggers suspended."""
+    return (
+        db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;",
+            [FTS_SUSPENDED_TRIGGERS],
+        ).fetchone()
+        is not None
+    )
+
+
+def suspend_fts_triggers(db: Database) -> bool:
+    """Swap the FTS sync triggers for ones that only log changed rowids.
+
+    The original trigger SQL is kept in fts_suspended_triggers, so another
+    connection, or a later run after a crash, can still resume. Returns
+    False if the triggers were already suspended.
+    """
+    if fts_triggers_suspended(db):
+        return False
+    with db.conn:
+        db.execute(
+            f"CREATE TABLE {FTS_PENDING} (ftsTable TEXT NOT NULL, "
+            "contentRowid INTEGER NOT NULL, PRIMARY KEY (ftsTable, contentRowid)) "
+            "WITHOUT ROWID;",
+        )
+        db.execute(
+            f"CREATE TABLE {FTS_SUSPENDED_TRIGGERS} "
+            "(name TEXT PRIMARY KEY, sql TEXT NOT NULL);",
+        )
+        for fts, (table, columns, prefix) in _indexes(db).items():
+            triggers = _deferring_triggers(fts, table, columns)
+            for suffix, trigger in triggers.items():
+                name = f"{prefix}_{suffix}"
+                db.execute(
+                    f"INSERT INTO {FTS_SUSPENDED_TRIGGERS} (name, sql) "
+                    "SELECT name, sql FROM sqlite_master "
+                    "WHERE type = 'trigger' AND name = ?;",
+                    [name],
+                )
+                db.execute(f'DROP TRIGGER IF EXISTS "{name}";')
+                db.execute(f'CREATE TRIGGER "{name}" {trigger}')
+    return True
+
+
+def resume_fts_triggers(db: Database) -> int:
+    """Restore the FTS sync triggers and index the rows logged meanwhile.
+
+    Each index that received rows is then optimized into a single b-tree,
+    undoing the fragmentation of a bulk load. Returns the number of rows
+    indexed.
+    """
+    if not fts_triggers_suspended(db):
+        return 0
+    indexed = 0
+    indexes = _indexes(db)
+    with db.conn:
+        for name, sql in db.execute(
+            f"SELECT name, sql FROM {FTS_SUSPENDED_TRIGGERS};",
+        ).fetchall():
+            db.execute(f'DROP TRIGGER IF EXISTS "{name}";')
+            db.execute(sql)
+        for (fts,) in db.execute(
+            f"SELECT DISTINCT ftsTable FROM {FTS_PENDING};",
+        ).fetchall():
+            table, columns, _ = indexes[fts]
+            names = ", ".join(columns)
+            # optimize merges everything at the end, so merging along the way
+            # would only repeat that work.
+            automerge = db.execute(
+                f"SELECT v FROM {fts}_config WHERE k = 'automerge';",
+            ).fetchone()
+            db.execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('automerge', 0);")
+            indexed += db.execute(
+                f"INSERT INTO {fts} (rowid, {names}) "
+                f"SELECT rowid, {names} FROM {table} WHERE rowid IN "
+                f"(SELECT contentRowid FROM {FTS_PENDING} WHERE ftsTable = ?);",
+                [fts],
+            ).rowcount
+            db.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize');")
+            db.execute(
+                f"INSERT INTO {fts} ({fts}, rank) VALUES ('automerge', ?);",
+                [automerge[0] if automerge else _DEFAULT_AUTOMERGE],
+            )
+        db.execute(f"DROP TABLE {FTS_PENDING};")
+        db.execute(f"DROP TABLE {FTS_SUSPENDED_TRIGGERS};")
+    return indexed
+
+
+def rebuild_word_index(db: Database, table: str) -> None:
+    """Recreate the word index of table and its sync triggers.
+
+    The index reads its text from table itself. Runs inside the caller's
+    transaction.
+    """
+    fts = f"{table}_fts"
+    columns = FTS_COLUMNS[table]
+    names = ", ".join(f'"{column}"' for column in columns)
+    new = ", ".join(f'new."{column}"' for column in columns)
+    old = ", ".join(f'old."{column}"' for column in columns)
+    delete = (
+        f'INSERT INTO "{fts}" ("{fts}", rowid, {names}) '
+        f"VALUES('delete', old.rowid, {old});"
+    )
+    insert = f'INSERT INTO "{fts}" (rowid, {names}) VALUES (new.rowid, {new});'
+    drop_word_index_triggers(db, table)
+    db.execute(f'DROP TABLE IF EXISTS "{fts}";')
+    db.execute(
+        f'CREATE VIRTUAL TABLE "{fts}" USING FTS5 ({names}, '
+        f"content=\"{table}\", content_rowid='rowid');",
+    )
+    db.execute(f'INSERT INTO "{fts}" ("{fts}") VALUES (\'rebuild\');')
+    for suffix, event, body in (
+        ("ai", "AFTER INSERT", insert),
+        ("ad", "AFTER DELETE", delete),
+        ("au", "AFTER UPDATE", f"{delete}\n  {insert}"),
+    ):
+        db.execute(
+            f'CREATE TRIGGER "{table}_{suffix}" {event} ON "{table}" BEGIN\n'
+            f"  {body}\nEND;",
+        )
+
+
+def drop_word_index_triggers(db: Database, table: str) -> None:
+    """Drop the triggers keeping the word index of table current."""
+    for suffix in ("ai", "ad", "au"):
+        db.execute(f'DROP TRIGGER IF EXISTS "{table}_{suffix}";')
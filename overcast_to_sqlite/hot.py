@@ -0,0 +1,130 @@
+"""A narrow copy of the small, often-read columns of episodes_extended.
+
+episodes_extended rows carry long descriptions, so scanning it for keys,
+dates or transcript and chapter URLs reads pages of text it does not
+need. Triggers copy those columns into episodes_extended_hot, keyed by
+the same rowid, and queries read the wide table only for the text.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .constants import (
+    CHAPTERS_URL,
+    ENCLOSURE_ID,
+    ENCLOSURE_URL,
+    EPISODES_EXTENDED,
+    EPISODES_EXTENDED_HOT,
+    FEED_XML_URL,
+    GUID,
+    LINK,
+    PUB_DATE,
+    TITLE,
+    TRANSCRIPT_DL_PATH,
+    TRANSCRIPT_ETAG,
+    TRANSCRIPT_LAST_MODIFIED,
+    TRANSCRIPT_TYPE,
+    TRANSCRIPT_URL,
+)
+
+if TYPE_CHECKING:
+    from sqlite_utils import Database
+
+HOT_COLUMNS = tuple(
+    column.strip('"')
+    for column in (
+        ENCLOSURE_ID,
+        ENCLOSURE_URL,
+        FEED_XML_URL,
+        GUID,
+        TITLE,
+        PUB_DATE,
+        LINK,
+        "itunes:image:href",
+        TRANSCRIPT_URL,
+        TRANSCRIPT_TYPE,
+        TRANSCRIPT_DL_PATH,
+        TRANSCRIPT_ETAG,
+        TRANSCRIPT_LAST_MODIFIED,
+        CHAPTERS_URL,
+        "psc:chapters:version",
+    )
+)
+_INDEXED_COLUMNS = (ENCLOSURE_ID, FEED_XML_URL, TRANSCRIPT_DL_PATH)
+
+
+def _triggers(columns: list[str]) -> dict[str, str]:
+    """Return the SQL of the triggers copying columns into the hot table."""
+    names = ", ".join(f'"{column}"' for column in columns)
+    new = ", ".join(f'new."{column}"' for column in columns)
+    delete = f"DELETE FROM {EPISODES_EXTENDED_HOT} WHERE id = old.rowid; "
+    insert = (
+        f"INSERT INTO {EPISODES_EXTENDED_HOT} (id, {names}) VALUES (new.rowid, {new}); "
+    )
+    events = {
+        "ai": f"AFTER INSERT ON {EPISODES_EXTENDED}",
+        "ad": f"AFTER DELETE ON {EPISODES_EXTENDED}",
+        "au": f"AFTER UPDATE OF {names} ON {EPISODES_EXTENDED}",
+    }
+    bodies = {"ai": insert, "ad": delete, "au": delete + insert}
+    return {
+        f"{EPISODES_EXTENDED_HOT}_{suffix}": (
+            f"CREATE TRIGGER {EPISODES_EXTENDED_HOT}_{suffix} {event} "
+            f"BEGIN {bodies[suffix]}END"
+        )
+        for suffix, event in events.items()
+    }
+
+
+def create_hot_table(db: Database) -> None:
+    """Create episodes_extended_hot and fill it from episodes_extended."""
+    columns = ", ".join(
+        f'"{column}" INTEGER' if column == ENCLOSURE_ID else f'"{column}"'
+        for column in HOT_COLUMNS
+    )
+    db.execute(
+        f"CREATE TABLE IF NOT EXISTS {EPISODES_EXTENDED_HOT} "
+        f"(id INTEGER PRIMARY KEY, {columns});",
+    )
+    for column in _INDEXED_COLUMNS:
+        db.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{EPISODES_EXTENDED_HOT}_{column} "
+            f"ON {EPISODES_EXTENDED_HOT} ({column});",
+        )
+    sync_hot_table(db)
+
+
+def sync_hot_table(db: Database) -> bool:
+    """Cover columns episodes_extended has gained since the triggers were made.
+
+    Feeds add columns to episodes_extended as new tags appear, so the
+    triggers copy only the hot columns that exist. When more exist, the
+    triggers are recreated and the hot table refilled. Returns whether
+    that happened. Runs inside the caller's transaction.
+    """
+    existing = {
+        row[1] for row in db.execute(f"PRAGMA table_info({EPISODES_EXTENDED});")
+    }
+    columns = [column for column in HOT_COLUMNS if column in existing]
+    triggers = _triggers(columns)
+    current = dict(
+        db.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = ? AND name LIKE ?;",
+            [EPISODES_EXTENDED, f"{EPISODES_EXTENDED_HOT}_%"],
+        ).fetchall(),
+    )
+    if current == triggers:
+        return False
+    names = ", ".join(f'"{column}"' for column in columns)
+    for name in current:
+        db.execute(f"DROP TRIGGER {name};")
+    db.execute(f"DELETE FROM {EPISODES_EXTENDED_HOT};")
+    db.execute(
+        f"INSERT INTO {EPISODES_EXTENDED_HOT} (id, {names}) "
+        f"SELECT rowid, {names} FROM {EPISODES_EXTENDED};",
+    )
+    for sql in triggers.values():
+        db.execute(sql)
+    return True
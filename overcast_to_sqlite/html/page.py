@@ -5,6 +5,7 @@ from pathlib import Path
 from overcast_to_sqlite.constants import DESCRIPTION
 from overcast_to_sqlite.datastore import Datastore
 from overcast_to_sqlite.html.htmltagfixer import HTMLTagFixer
+from overcast_to_sqlite.profiles import READ_PROFILE
 
 
 def _convert_urls_to_links(text: str) -> str:
@@ -94,8 +95,13 @@ def _generate_html_episodes(
     html_output_path.write_text(page_template.format_map(page_vars))
 
 
-def generate_html_played(db_path: str, html_output_path: Path) -> None:
-    db = Datastore(db_path)
+def _read_datastore(db: Datastore | str) -> Datastore:
+    """Reuse an open Datastore, or open db as a path with the read profile."""
+    return db if isinstance(db, Datastore) else Datastore(db, READ_PROFILE)
+
+
+def generate_html_played(db: Datastore | str, html_output_path: Path) -> None:
+    db = _read_datastore(db)
     episodes = db.get_recently_played()
     _generate_html_episodes(
         episodes=episodes,
@@ -104,8 +110,8 @@ def generate_html_played(db_path: str, html_output_path: Path) -> None:
     )
 
 
-def generate_html_starred(db_path: str, html_output_path: Path) -> None:
-    db = Datastore(db_path)
+def generate_html_starred(db: Datastore | str, html_output_path: Path) -> None:
+    db = _read_datastore(db)
     episodes = db.get_starred_episodes()
     _generate_html_episodes(
         episodes=episodes,
@@ -115,8 +121,8 @@ def generate_html_starred(db_path: str, html_output_path: Path) -> None:
     )
 
 
-def generate_html_deleted(db_path: str, html_output_path: Path) -> None:
-    db = Datastore(db_path)
+def generate_html_deleted(db: Datastore | str, html_output_path: Path) -> None:
+    db = _read_datastore(db)
     episodes = db.get_deleted_episodes()
     _generate_html_episodes(
         episodes=episodes,
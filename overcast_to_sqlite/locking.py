@@ -0,0 +1,159 @@
+"""Keep overlapping runs from interleaving writes, and ride out busy locks.
+
+A run lock is an advisory lock on a file next to the database, held for
+the whole of a writing command. The operating system releases it when
+the process exits, however it exits, so a crashed run never leaves the
+database locked; the details it wrote to the file are kept to report it.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import datetime
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .exceptions import RunInProgressError
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+DEFAULT_BUSY_RETRIES = 5
+_BUSY_RETRY_DELAY = 0.5
+_LOCK_POLL_INTERVAL = 1.0
+# Locks this process holds, so nested commands such as `all` re-enter them.
+_held: dict[Path, int] = {}
+
+
+@dataclasses.dataclass
+class RunInfo:
+    """Who holds, or last held, the run lock of a database."""
+
+    command: str
+    pid: int
+    started: str
+
+    @property
+    def running_for(self) -> datetime.timedelta:
+        started = datetime.datetime.fromisoformat(self.started)
+        return datetime.datetime.now(tz=datetime.UTC) - started
+
+    def __str__(self) -> str:
+        minutes = int(self.running_for.total_seconds() // 60)
+        return f"{self.command} (pid {self.pid}, started {minutes} minutes ago)"
+
+
+def lock_path_for(db_path: str) -> Path:
+    """Return the file whose lock guards runs against the database at db_path."""
+    return Path(f"{db_path}-run.lock")
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _read_info(fd: int) -> RunInfo | None:
+    os.lseek(fd, 0, os.SEEK_SET)
+    try:
+        return RunInfo(**json.loads(os.read(fd, 4096)))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _write_info(fd: int, info: RunInfo | None) -> None:
+    os.ftruncate(fd, 0)
+    if info is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, json.dumps(dataclasses.asdict(info)).encode())
+
+
+@contextlib.contextmanager
+def run_lock(
+    db_path: str,
+    command: str,
+    *,
+    wait: float = 0.0,
+) -> Iterator[RunInfo | None]:
+    """Hold the run lock of the database at db_path while the block runs.
+
+    If another run holds it, wait up to wait seconds for it to finish,
+    then raise RunInProgressError describing that run. Yields the details
+    of a previous run that exited without releasing the lock cleanly, or
+    None.
+    """
+    path = lock_path_for(db_path).absolute()
+    if path in _held:
+        _held[path] += 1
+        try:
+            yield None
+        finally:
+            _held[path] -= 1
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + wait
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                raise RunInProgressError(str(db_path), _read_info(fd))
+            time.sleep(_LOCK_POLL_INTERVAL)
+        # A clean exit empties the file, so details left in it are a crash's.
+        previous = _read_info(fd)
+        started = datetime.datetime.now(tz=datetime.UTC).isoformat()
+        _write_info(fd, RunInfo(command, os.getpid(), started))
+        _held[path] = 1
+        try:
+            yield previous
+        finally:
+            del _held[path]
+            _write_info(fd, None)
+    finally:
+        # Closing the file releases the lock.
+        os.close(fd)
+
+
+def is_busy_error(error: sqlite3.OperationalError) -> bool:
+    """Return whether error means another connection holds a lock."""
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def retry_busy[T](
+    connection: sqlite3.Connection,
+    call: Callable[[], T],
+    *,
+    retries: int = DEFAULT_BUSY_RETRIES,
+) -> T:
+    """Call call, retrying it when it gives up waiting on another writer.
+
+    Each attempt already waits up to the connection's busy timeout; the
+    open transaction is rolled back before the next attempt, and the pause
+    between attempts doubles each time.
+    """
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt >= retries:
+                raise
+            if connection.in_transaction:
+                connection.rollback()
+            time.sleep(_BUSY_RETRY_DELAY * 2**attempt)
+            attempt += 1
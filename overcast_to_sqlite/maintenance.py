@@ -0,0 +1,199 @@
+"""Keep a long-lived database compact, consistent and well planned."""
+
+from __future__ import annotations
+
+import dataclasses
+import sqlite3
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .locking import is_busy_error
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from sqlite_utils import Database
+
+    from .datastore import Datastore
+
+# Free pages returned to the filesystem per run, about 100 MB at 4 KiB pages.
+DEFAULT_VACUUM_PAGES = 25_000
+# Pages of FTS5 segment merging done per transaction.
+_FTS_MERGE_PAGES = 500
+_INCREMENTAL = 2
+
+
+@dataclasses.dataclass
+class MaintenanceStep:
+    """What one maintenance step did and how long it took."""
+
+    name: str
+    seconds: float = 0.0
+    reclaimed_bytes: int = 0
+    detail: str = ""
+    problems: list[str] = dataclasses.field(default_factory=list)
+
+
+def _pragma(db: Database, name: str) -> int:
+    return db.execute(f"PRAGMA {name};").fetchone()[0]
+
+
+def _logical_size(db: Database) -> int:
+    """Return the bytes the database occupies once the WAL is checkpointed."""
+    return _pragma(db, "page_count") * _pragma(db, "page_size")
+
+
+def _file_size(db_path: str) -> int:
+    return sum(
+        path.stat().st_size
+        for path in (Path(db_path), Path(f"{db_path}-wal"))
+        if path.is_file()
+    )
+
+
+def fts_tables(db: Database) -> list[str]:
+    """Return the names of every FTS5 table in the database."""
+    return [
+        name
+        for (name,) in db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND sql LIKE 'CREATE VIRTUAL TABLE%USING fts5%' ORDER BY name;",
+        )
+    ]
+
+
+def check_integrity(db: Database, *, full: bool = False) -> MaintenanceStep:
+    """Run quick_check, or with full integrity_check plus FTS5's own check."""
+    step = MaintenanceStep("integrity")
+    pragma = "integrity_check" if full else "quick_check"
+    step.problems = [
+        row[0] for row in db.execute(f"PRAGMA {pragma};") if row[0] != "ok"
+    ]
+    if full:
+        for fts in fts_tables(db):
+            try:
+                with db.conn:
+                    db.execute(f"INSERT INTO {fts} ({fts}) VALUES ('integrity-check');")
+            except sqlite3.DatabaseError as e:
+                step.problems.append(f"{fts}: {e}")
+    step.detail = pragma if not step.problems else f"{len(step.problems)} problems"
+    return step
+
+
+def optimize_fts(db: Database, *, full: bool = False) -> MaintenanceStep:
+    """Merge each FTS5 index's segments, in short transactions.
+
+    With full, each index is instead rewritten as a single b-tree, which
+    is fastest to query but holds the write lock while it runs.
+    """
+    tables = fts_tables(db)
+    for fts in tables:
+        if full:
+            with db.conn:
+                db.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize');")
+            continue
+        while True:
+            before = db.conn.total_changes
+            with db.conn:
+                db.execute(
+                    f"INSERT INTO {fts} ({fts}, rank) VALUES ('merge', ?);",
+                    [_FTS_MERGE_PAGES],
+                )
+            # Fewer than two changes means there was nothing left to merge.
+            if db.conn.total_changes - before < 2:  # noqa: PLR2004
+                break
+    verb = "optimized" if full else "merged"
+    return MaintenanceStep("fts", detail=f"{verb} {len(tables)} indexes")
+
+
+def analyze(db: Database, *, full: bool = False) -> MaintenanceStep:
+    """Refresh query planner statistics, only where stale unless full."""
+    db.execute("ANALYZE;" if full else "PRAGMA optimize;")
+    return MaintenanceStep("analyze", detail="ANALYZE" if full else "PRAGMA optimize")
+
+
+def vacuum(
+    db: Database,
+    *,
+    max_pages: int = DEFAULT_VACUUM_PAGES,
+    full: bool = False,
+) -> MaintenanceStep:
+    """Return up to max_pages free pages to the filesystem.
+
+    Databases created before incremental auto_vacuum was enabled need one
+    full VACUUM to switch over, which only runs with full.
+    """
+    step = MaintenanceStep("vacuum")
+    before = _logical_size(db)
+    if _pragma(db, "auto_vacuum") == _INCREMENTAL:
+        db.execute(f"PRAGMA incremental_vacuum({int(max_pages)});").fetchall()
+        step.detail = f"{_pragma(db, 'freelist_count')} free pages left"
+    elif full:
+        db.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+        db.execute("VACUUM;")
+        step.detail = "full VACUUM, incremental vacuum enabled"
+    else:
+        step.detail = "incremental vacuum not enabled, run with --full once"
+    step.reclaimed_bytes = before - _logical_size(db)
+    return step
+
+
+def checkpoint(db: Database, db_path: str) -> MaintenanceStep:
+    """Copy the WAL into the database and truncate it, if no reader needs it."""
+    before = _file_size(db_path)
+    busy, _, _ = db.execute("PRAGMA wal_checkpoint(TRUNCATE);").fetchone()
+    return MaintenanceStep(
+        "checkpoint",
+        reclaimed_bytes=before - _file_size(db_path),
+        detail="partial, other connections are busy" if busy else "WAL truncated",
+    )
+
+
+def vacuum_into(db: Database, target: Path) -> MaintenanceStep:
+    """Write a compacted copy of the database to target."""
+    db.execute("VACUUM INTO ?;", [str(target)])
+    size = target.stat().st_size
+    return MaintenanceStep(
+        "vacuum into",
+        reclaimed_bytes=_logical_size(db) - size,
+        detail=str(target),
+    )
+
+
+def _timed(name: str, run: Callable[[], MaintenanceStep]) -> MaintenanceStep:
+    """Run a step, recording a locked database as skipped rather than failing."""
+    start = time.perf_counter()
+    try:
+        step = run()
+    except sqlite3.OperationalError as e:
+        if not is_busy_error(e):
+            raise
+        step = MaintenanceStep(name, detail=f"skipped, {e}")
+    step.seconds = time.perf_counter() - start
+    return step
+
+
+def maintain(
+    store: Datastore,
+    *,
+    full: bool = False,
+    vacuum_pages: int = DEFAULT_VACUUM_PAGES,
+    vacuum_target: Path | None = None,
+) -> list[MaintenanceStep]:
+    """Check, merge, analyze, vacuum and checkpoint the database.
+
+    Every step but a full run's FTS optimize and VACUUM commits in short
+    transactions, so it can run while another command writes.
+    """
+    db = store.db
+    steps = [
+        _timed("integrity", lambda: check_integrity(db, full=full)),
+        _timed("fts", lambda: optimize_fts(db, full=full)),
+        _timed("analyze", lambda: analyze(db, full=full)),
+        _timed("vacuum", lambda: vacuum(db, max_pages=vacuum_pages, full=full)),
+        _timed("checkpoint", lambda: checkpoint(db, store.db_path)),
+    ]
+    if vacuum_target is not None:
+        steps.append(_timed("vacuum into", lambda: vacuum_into(db, vacuum_target)))
+    return steps
@@ -0,0 +1,522 @@
+"""Versioned schema migrations, tracked in the database's PRAGMA user_version."""
+
+from __future__ import annotations
+
+import datetime
+from typing import TYPE_CHECKING, cast
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from sqlite_utils import Database
+    from sqlite_utils.db import Table
+
+from .constants import (
+    BLOB_REFS,
+    BLOBS,
+    CHAPTERS,
+    CONTENT,
+    DESCRIPTION,
+    ENCLOSURE_DL_PATH,
+    ENCLOSURE_DOWNLOADED_AT,
+    ENCLOSURE_ID,
+    ENCLOSURE_SHA256,
+    ENCLOSURE_SIZE,
+    ENCLOSURE_SOURCE_URL,
+    ENCLOSURE_URL,
+    ENCLOSURES,
+    EPISODES,
+    EPISODES_EXTENDED,
+    FEED_ID,
+    FEED_XML_URL,
+    FEEDS,
+    FEEDS_EXTENDED,
+    FETCH_FAILURES,
+    GUID,
+    IMAGE,
+    INCLUDE_PODCAST_IDS,
+    LAST_UPDATED,
+    LINK,
+    OVERCAST_ID,
+    PLAYED_PROGRESS,
+    PLAYLISTS,
+    PROGRESS,
+    PUB_DATE,
+    SHA256,
+    SMART,
+    SORTING,
+    SOURCE,
+    TIME,
+    TITLE,
+    TRANSCRIPT_DL_PATH,
+    TRANSCRIPT_ETAG,
+    TRANSCRIPT_LAST_MODIFIED,
+    TRANSCRIPT_SEGMENTS,
+    TRANSCRIPT_TYPE,
+    TRANSCRIPT_URL,
+    TRANSCRIPTS,
+    URL,
+    USER_REC_DATE,
+    USER_UPDATED_DATE,
+    XML_URL,
+)
+from .hot import create_hot_table
+from .stats import create_stats_tables, rebuild_stats
+from .utils import _canonical_enclosure_url
+
+
+def _table(db: Database, name: str) -> Table:
+    """Return a table handle with a concrete type for static checkers."""
+    return cast("Table", db[name])
+
+
+def _create_table(
+    db: Database,
+    name: str,
+    columns: dict[str, type],
+    *,
+    pk: str | tuple[str, ...] | None = None,
+    foreign_keys: list[tuple[str, str, str]] | None = None,
+) -> None:
+    """Create a table like Table.create, but inside the caller's transaction."""
+    db.execute(db.create_table_sql(name, columns, pk=pk, foreign_keys=foreign_keys))
+
+
+def _enable_fts(db: Database, table: str, columns: list[str]) -> None:
+    """Index columns like Table.enable_fts with triggers, without committing."""
+    names = ", ".join(f"[{column}]" for column in columns)
+    old = ", ".join(f"old.[{column}]" for column in columns)
+    new = ", ".join(f"new.[{column}]" for column in columns)
+    db.execute(
+        f"CREATE VIRTUAL TABLE [{table}_fts] USING FTS5 (\n"
+        f"    {names},\n    content=[{table}]\n)",
+    )
+    db.execute(
+        f"INSERT INTO [{table}_fts] (rowid, {names}) "
+        f"SELECT rowid, {names} FROM [{table}];",
+    )
+    delete = (
+        f"INSERT INTO [{table}_fts] ([{table}_fts], rowid, {names}) "
+        f"VALUES('delete', old.rowid, {old});"
+    )
+    insert = f"INSERT INTO [{table}_fts] (rowid, {names}) VALUES (new.rowid, {new});"
+    db.execute(
+        f"CREATE TRIGGER [{table}_ai] AFTER INSERT ON [{table}] BEGIN {insert} END;",
+    )
+    db.execute(
+        f"CREATE TRIGGER [{table}_ad] AFTER DELETE ON [{table}] BEGIN {delete} END;",
+    )
+    db.execute(
+        f"CREATE TRIGGER [{table}_au] AFTER UPDATE ON [{table}] BEGIN "
+        f"{delete} {insert} END;",
+    )
+
+
+def _add_columns(db: Database, table: str, columns: dict[str, str]) -> None:
+    """Add the columns, given as SQL identifiers with their types, that are missing.
+
+    Databases from before versioning may already have some of them.
+    """
+    existing = _table(db, table).columns_dict
+    for column, column_type in columns.items():
+        if column.strip('"') not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type};")
+
+
+def _initial_schema(db: Database) -> None:  # noqa: C901
+    """Create the tables, FTS indexes and views that predate versioning.
+
+    Each step checks for existing objects, so databases created before
+    user_version was tracked are brought up to date without changes.
+    """
+    if FEEDS not in db.table_names():
+        _create_table(
+            db,
+            FEEDS,
+            {
+                OVERCAST_ID: int,
+                TITLE: str,
+                "subscribed": bool,
+                "overcastAddedDate": datetime.datetime,
+                "notifications": bool,
+                XML_URL: str,
+                "htmlUrl": str,
+                "dateRemoveDetected": datetime.datetime,
+            },
+            pk=OVERCAST_ID,
+        )
+    if FEEDS_EXTENDED not in db.table_names():
+        _create_table(
+            db,
+            FEEDS_EXTENDED,
+            {
+                XML_URL: str,
+                TITLE: str,
+                DESCRIPTION: str,
+                LAST_UPDATED: datetime.datetime,
+                LINK: str,
+                GUID: str,
+            },
+            pk=XML_URL,
+            foreign_keys=[(XML_URL, FEEDS, XML_URL)],
+        )
+        _enable_fts(db, FEEDS_EXTENDED, [TITLE, DESCRIPTION])
+    if EPISODES not in db.table_names():
+        _create_table(
+            db,
+            EPISODES,
+            {
+                OVERCAST_ID: int,
+                FEED_ID: int,
+                TITLE: str,
+                URL: str,
+                "overcastUrl": str,
+                "played": bool,
+                PROGRESS: int,
+                ENCLOSURE_URL: str,
+                USER_UPDATED_DATE: datetime.datetime,
+                USER_REC_DATE: datetime.datetime,
+                PUB_DATE: datetime.datetime,
+                "userDeleted": bool,
+            },
+            pk=OVERCAST_ID,
+            foreign_keys=[(OVERCAST_ID, FEEDS, OVERCAST_ID)],
+        )
+    if EPISODES_EXTENDED not in db.table_names():
+        _create_table(
+            db,
+            EPISODES_EXTENDED,
+            {
+                ENCLOSURE_URL: str,
+                FEED_XML_URL: str,
+                TITLE: str,
+                DESCRIPTION: str,
+                LINK: str,
+                GUID: str,
+            },
+            pk=ENCLOSURE_URL,
+            foreign_keys=[
+                (ENCLOSURE_URL, EPISODES, ENCLOSURE_URL),
+                (FEED_XML_URL, FEEDS_EXTENDED, XML_URL),
+            ],
+        )
+        _enable_fts(db, EPISODES_EXTENDED, [TITLE, DESCRIPTION])
+    if PLAYLISTS not in db.table_names():
+        _create_table(
+            db,
+            PLAYLISTS,
+            {
+                TITLE: str,
+                SMART: int,
+                SORTING: str,
+                INCLUDE_PODCAST_IDS: str,
+            },
+            pk=TITLE,
+        )
+    if CHAPTERS not in db.table_names():
+        _create_table(
+            db,
+            CHAPTERS,
+            {
+                ENCLOSURE_URL: str,
+                GUID: str,
+                SOURCE: str,
+                TIME: int,
+                CONTENT: str,
+                URL: str,
+                IMAGE: str,
+            },
+            foreign_keys=[
+                (ENCLOSURE_URL, EPISODES, ENCLOSURE_URL),
+            ],
+        )
+        _enable_fts(db, CHAPTERS, [CONTENT])
+        _table(db, CHAPTERS).create_index([ENCLOSURE_URL, GUID, SOURCE])
+    _ensure_chapters_natural_key(db)
+    if FETCH_FAILURES not in db.table_names():
+        _create_table(
+            db,
+            FETCH_FAILURES,
+            {
+                URL: str,
+                SOURCE: str,
+                ENCLOSURE_URL: str,
+                "error": str,
+                "attempts": int,
+                "lastAttempt": datetime.datetime,
+            },
+            pk=URL,
+        )
+    if TRANSCRIPTS not in db.table_names():
+        _create_table(
+            db,
+            TRANSCRIPTS,
+            {
+                "id": int,
+                "path": str,
+                "format": str,
+                "size": int,
+                "mtime": float,
+                "segmentCount": int,
+                "ingestedAt": datetime.datetime,
+                "text": bytes,
+            },
+            pk="id",
+        )
+        _table(db, TRANSCRIPTS).create_index(["path"], unique=True)
+    if TRANSCRIPT_SEGMENTS not in db.table_names():
+        _create_table(
+            db,
+            TRANSCRIPT_SEGMENTS,
+            {
+                "id": int,
+                "transcriptId": int,
+                "idx": int,
+                "startTime": float,
+                "endTime": float,
+                "speaker": str,
+                "textStart": int,
+                "textEnd": int,
+            },
+            pk="id",
+            foreign_keys=[("transcriptId", TRANSCRIPTS, "id")],
+        )
+        _table(db, TRANSCRIPT_SEGMENTS).create_index(
+            ["transcriptId", "idx"],
+            unique=True,
+        )
+        # Contentless: segment text lives zlib-compressed on its transcript.
+        db.execute(
+            f"CREATE VIRTUAL TABLE {TRANSCRIPT_SEGMENTS}_fts "
+            "USING fts5(text, content='');",
+        )
+    if BLOBS not in db.table_names():
+        _create_table(
+            db,
+            BLOBS,
+            {
+                SHA256: str,
+                "path": str,
+                "size": int,
+                "createdAt": datetime.datetime,
+            },
+            pk=SHA256,
+        )
+    if BLOB_REFS not in db.table_names():
+        _create_table(
+            db,
+            BLOB_REFS,
+            {
+                ENCLOSURE_URL: str,
+                "kind": str,
+                SHA256: str,
+            },
+            pk=(ENCLOSURE_URL, "kind"),
+            foreign_keys=[(SHA256, BLOBS, SHA256)],
+        )
+        _table(db, BLOB_REFS).create_index([SHA256])
+    db.create_view(
+        "episodes_played",
+        (
+            "SELECT "
+            f"{EPISODES}.{TITLE}, {FEEDS}.{TITLE} as feed, played, progress, "
+            f"CASE WHEN {USER_REC_DATE} IS NOT NULL THEN 1 ELSE 0 END AS starred, "
+            f"{USER_UPDATED_DATE}, {EPISODES}.{URL}, {ENCLOSURE_URL} "
+            f"FROM {EPISODES} "
+            f"LEFT JOIN {FEEDS} ON {EPISODES}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
+            f"WHERE played=1 OR progress>{PLAYED_PROGRESS} "
+            f"ORDER BY {USER_UPDATED_DATE} DESC"
+        ),
+        ignore=True,
+    )
+    db.create_view(
+        "episodes_deleted",
+        (
+            "SELECT "
+            f"{EPISODES}.{TITLE}, {FEEDS}.{TITLE} as feed, played, progress, "
+            f"{USER_UPDATED_DATE}, {EPISODES}.{URL}, {ENCLOSURE_URL} "
+            f"FROM {EPISODES} "
+            f"LEFT JOIN {FEEDS} ON {EPISODES}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
+            f"WHERE userDeleted=1 AND played=0 ORDER BY {USER_UPDATED_DATE} DESC"
+        ),
+        ignore=True,
+    )
+    db.create_view(
+        "episodes_starred",
+        (
+            "SELECT "
+            f"{EPISODES}.{TITLE}, {FEEDS}.{TITLE} as feed, played, progress, "
+            f"{USER_REC_DATE}, {EPISODES}.{URL}, {ENCLOSURE_URL} "
+            f"FROM {EPISODES} "
+            f"LEFT JOIN {FEEDS} ON {EPISODES}.{FEED_ID} = {FEEDS}.{OVERCAST_ID} "
+            f"WHERE {USER_REC_DATE} IS NOT NULL ORDER BY {USER_UPDATED_DATE} DESC"
+        ),
+        ignore=True,
+    )
+
+
+def _ensure_chapters_natural_key(db: Database) -> None:
+    """Deduplicate chapters once and enforce one row per (enclosure, source, time).
+
+    Databases created before the unique index existed may hold duplicate
+    rows from overlapping runs; the oldest copy of each chapter is kept.
+    """
+    if any(index.unique for index in _table(db, CHAPTERS).indexes):
+        return
+    db.execute(
+        f"DELETE FROM {CHAPTERS} WHERE rowid NOT IN ("
+        f"SELECT MIN(rowid) FROM {CHAPTERS} "
+        f"GROUP BY {ENCLOSURE_URL}, {SOURCE}, {TIME});",
+    )
+    _table(db, CHAPTERS).create_index(
+        [ENCLOSURE_URL, SOURCE, TIME],
+        unique=True,
+        if_not_exists=True,
+    )
+
+
+def _lookup_indexes(db: Database) -> None:
+    """Index the columns used to join episodes to feeds and sort by recency."""
+    _table(db, EPISODES).create_index([ENCLOSURE_URL], if_not_exists=True)
+    _table(db, EPISODES).create_index([FEED_ID], if_not_exists=True)
+    _table(db, EPISODES).create_index([USER_UPDATED_DATE], if_not_exists=True)
+    _table(db, EPISODES_EXTENDED).create_index([FEED_XML_URL], if_not_exists=True)
+
+
+def _download_columns(db: Database) -> None:
+    """Add the columns tracking downloaded transcripts and archived audio.
+
+    transcripts and enclosures used to add these on every run.
+    """
+    _add_columns(
+        db,
+        EPISODES_EXTENDED,
+        {
+            TRANSCRIPT_URL: "TEXT",
+            TRANSCRIPT_TYPE: "TEXT",
+            TRANSCRIPT_DL_PATH: "TEXT",
+            TRANSCRIPT_ETAG: "TEXT",
+            TRANSCRIPT_LAST_MODIFIED: "TEXT",
+        },
+    )
+    _table(db, EPISODES_EXTENDED).create_index(
+        [TRANSCRIPT_DL_PATH],
+        if_not_exists=True,
+    )
+    _add_columns(
+        db,
+        EPISODES,
+        {
+            ENCLOSURE_SOURCE_URL: "TEXT",
+            ENCLOSURE_DL_PATH: "TEXT",
+            ENCLOSURE_SIZE: "INTEGER",
+            ENCLOSURE_SHA256: "TEXT",
+            ENCLOSURE_DOWNLOADED_AT: "TEXT",
+        },
+    )
+    _table(db, EPISODES).create_index([ENCLOSURE_DL_PATH], if_not_exists=True)
+
+
+def _canonical_enclosure_urls(db: Database) -> None:
+    """Rewrite stored enclosure URLs into the form the parsers now save.
+
+    Where several URLs collapse into one on a table keyed by enclosure URL,
+    only the first row is kept.
+    """
+    db.register_function(
+        lambda url: None if url is None else _canonical_enclosure_url(url),
+        deterministic=True,
+        replace=True,
+        name="canonical_enclosure_url",
+    )
+    changed = f"{ENCLOSURE_URL} != canonical_enclosure_url({ENCLOSURE_URL})"
+    for table in (EPISODES, EPISODES_EXTENDED, CHAPTERS, FETCH_FAILURES, BLOB_REFS):
+        db.execute(
+            f"UPDATE OR IGNORE {table} "
+            f"SET {ENCLOSURE_URL} = canonical_enclosure_url({ENCLOSURE_URL}) "
+            f"WHERE {changed};",
+        )
+        db.execute(f"DELETE FROM {table} WHERE {changed};")
+
+
+def _enclosure_ids(db: Database) -> None:
+    """Give each enclosure URL an integer id for tables to join on.
+
+    enclosureUrl stays on every table as the natural key and for views and
+    ad hoc queries; Datastore fills in enclosureId beside it on write.
+    """
+    db.execute(
+        f"CREATE TABLE IF NOT EXISTS {ENCLOSURES} ("
+        f"id INTEGER PRIMARY KEY, {ENCLOSURE_URL} TEXT NOT NULL UNIQUE);",
+    )
+    for table in (EPISODES, EPISODES_EXTENDED, CHAPTERS):
+        _add_columns(db, table, {ENCLOSURE_ID: "INTEGER"})
+        db.execute(
+            f"INSERT OR IGNORE INTO {ENCLOSURES} ({ENCLOSURE_URL}) "
+            f"SELECT {ENCLOSURE_URL} FROM {table} "
+            f"WHERE {ENCLOSURE_URL} IS NOT NULL;",
+        )
+        db.execute(
+            f"UPDATE {table} SET {ENCLOSURE_ID} = ("
+            f"SELECT id FROM {ENCLOSURES} "
+            f"WHERE {ENCLOSURES}.{ENCLOSURE_URL} = {table}.{ENCLOSURE_URL});",
+        )
+        _table(db, table).create_index([ENCLOSURE_ID], if_not_exists=True)
+    # Lookups by URL now go through enclosures, and the chapters unique key
+    # still leads with enclosureUrl for its upserts.
+    db.execute(f"DROP INDEX IF EXISTS idx_{EPISODES}_{ENCLOSURE_URL};")
+    db.execute(f"DROP INDEX IF EXISTS idx_{CHAPTERS}_{ENCLOSURE_URL}_{GUID}_{SOURCE};")
+
+
+def _materialized_stats(db: Database) -> None:
+    """Keep listening statistics up to date with triggers so stats reads O(1)."""
+    create_stats_tables(db)
+    rebuild_stats(db)
+
+
+def _hot_episode_columns(db: Database) -> None:
+    """Copy the narrow columns of episodes_extended to a table of their own."""
+    create_hot_table(db)
+
+
+# Append new migrations; never reorder or edit ones that have shipped.
+MIGRATIONS: tuple[Callable[[Database], None], ...] = (
+    _initial_schema,
+    _lookup_indexes,
+    _download_columns,
+    _canonical_enclosure_urls,
+    _enclosure_ids,
+    _materialized_stats,
+    _hot_episode_columns,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def _user_version(db: Database) -> int:
+    return db.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(db: Database) -> int:
+    """Apply any migrations newer than the database, returning its old version.
+
+    Each migration and its user_version bump run in one BEGIN IMMEDIATE
+    transaction. A failed migration leaves the database at the previous
+    version, and of several processes opening an old database at once, only
+    the first to take the write lock applies each migration. When the schema
+    is current this costs a single PRAGMA read.
+    """
+    old_version = version = _user_version(db)
+    while version < SCHEMA_VERSION:
+        db.conn.execute("BEGIN IMMEDIATE;")
+        try:
+            # Another process may have migrated while this one waited.
+            version = _user_version(db)
+            if version < SCHEMA_VERSION:
+                MIGRATIONS[version](db)
+                version += 1
+                db.execute(f"PRAGMA user_version = {version};")
+        except BaseException:
+            db.conn.rollback()
+            raise
+        db.conn.commit()
+    return old_version
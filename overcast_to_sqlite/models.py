@@ -43,6 +43,8 @@ class Episode:
     userUpdatedDate: str | None = None
     userRecommendedDate: str | None = None
     pubDate: str | None = None
+    # The URL as the feed gave it, for fetching; enclosureUrl is its identity.
+    enclosureSourceUrl: str | None = None
 
     def to_dict(self) -> dict[str, Any]:
         return dataclasses.asdict(self)
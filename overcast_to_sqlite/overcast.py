@@ -27,7 +27,7 @@ from .exceptions import (
     WrongPasswordError,
 )
 from .models import Episode, Feed, Playlist
-from .utils import _parse_date_or_none
+from .utils import _canonical_enclosure_url, _parse_date_or_none
 
 
 def auth_and_save_cookies(email: str, password: str, auth_json: str) -> None:
@@ -137,7 +137,7 @@ def extract_feed_and_episodes_from_opml(
                     overcastUrl=ep.get("overcastUrl", ""),
                     played=ep.get("played", "0") == "1",
                     userDeleted=ep.get("userDeleted", "0") == "1",
-                    enclosureUrl=ep[ENCLOSURE_URL].split("?")[0],
+                    enclosureUrl=_canonical_enclosure_url(ep[ENCLOSURE_URL]),
                     progress=(
                         None
                         if (progress := ep.get("progress")) is None
@@ -152,6 +152,7 @@ def extract_feed_and_episodes_from_opml(
                         USER_REC_DATE,
                     ),
                     pubDate=_iso_date_or_none(dict(ep), "pubDate"),
+                    enclosureSourceUrl=ep[ENCLOSURE_URL].strip(),
                 ),
             )
 
@@ -0,0 +1,166 @@
+"""Continuous, host-aware work queue for network-bound backfills."""
+
+from __future__ import annotations
+
+import dataclasses
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from .constants import BATCH_SIZE
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+DEFAULT_PER_HOST = 2
+_MAX_HOST_INTERVAL = 30.0
+
+
+def host_of(url: str) -> str:
+    """Return the lowercased network location of a URL, used for per-host limits."""
+    return urlsplit(url).netloc.lower()
+
+
+@dataclasses.dataclass
+class HostStats:
+    """Running totals for one host, updated as its requests complete."""
+
+    started: int = 0
+    completed: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    first_start: float | None = None
+    last_finish: float | None = None
+
+    def record_start(self, now: float) -> None:
+        self.started += 1
+        if self.first_start is None:
+            self.first_start = now
+
+    def record_finish(self, started: float, finished: float, *, error: bool) -> None:
+        self.completed += 1
+        self.errors += error
+        self.busy_seconds += finished - started
+        self.last_finish = finished
+
+    @property
+    def per_minute(self) -> float:
+        """Completed requests per minute since the first request to this host."""
+        if self.first_start is None or self.last_finish is None:
+            return 0.0
+        elapsed = self.last_finish - self.first_start
+        return self.completed * 60 / elapsed if elapsed > 0 else 0.0
+
+
+@dataclasses.dataclass
+class PipelineStats:
+    """Per-host statistics for a fetch_pipeline run, readable while it runs."""
+
+    hosts: dict[str, HostStats] = dataclasses.field(default_factory=dict)
+
+    def summary(self) -> list[str]:
+        """Return one line per host, busiest first."""
+        return [
+            f"{host}: {stats.completed}/{stats.started} done, "
+            f"{stats.errors} errors, {stats.per_minute:.1f}/min"
+            for host, stats in sorted(
+                self.hosts.items(),
+                key=lambda item: item[1].started,
+                reverse=True,
+            )
+        ]
+
+
+@dataclasses.dataclass
+class _HostQueue[T]:
+    items: deque[tuple[int, T]] = dataclasses.field(default_factory=deque)
+    active: int = 0
+    interval: float = 0.0
+    next_start: float = 0.0
+
+
+def fetch_pipeline[T, R](  # noqa: C901, PLR0913
+    items: Iterable[T],
+    worker: Callable[[T], R],
+    *,
+    url_of: Callable[[T], str],
+    max_in_flight: int = BATCH_SIZE,
+    per_host: int = DEFAULT_PER_HOST,
+    min_interval: float = 0.0,
+    is_error: Callable[[R], bool] = lambda _: False,
+    stats: PipelineStats | None = None,
+) -> Iterator[tuple[T, R]]:
+    """Run worker over items with bounded concurrency, yielding as each completes.
+
+    Unlike mapping over fixed-size chunks, a new request is started as soon as
+    any slot frees up, so a single slow URL never holds back the rest of the
+    queue. Hosts take turns: no more than per_host requests run against the
+    same host at once, requests to a host start at least min_interval seconds
+    apart, and each free slot goes to the eligible host whose next item came
+    earliest in items, so callers control priority by ordering items.
+
+    With a min_interval, each result for which is_error is true doubles that
+    host's interval (up to 30 seconds) until it next succeeds.
+    """
+    stats = stats if stats is not None else PipelineStats()
+    queues: dict[str, _HostQueue[T]] = {}
+    for position, item in enumerate(items):
+        host = host_of(url_of(item))
+        if host not in queues:
+            queues[host] = _HostQueue(interval=min_interval)
+            stats.hosts.setdefault(host, HostStats())
+        queues[host].items.append((position, item))
+
+    in_flight: dict[Future[R], tuple[str, T, float]] = {}
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+
+        def _dispatch() -> float | None:
+            """Start what is allowed now; return seconds until a host is next ready."""
+            while len(in_flight) < max_in_flight:
+                now = time.monotonic()
+                ready = [
+                    host
+                    for host, queue in queues.items()
+                    if queue.items and queue.active < per_host
+                ]
+                if not ready:
+                    return None
+                eligible = [host for host in ready if queues[host].next_start <= now]
+                if not eligible:
+                    return min(queues[host].next_start for host in ready) - now
+                host = min(eligible, key=lambda h: queues[h].items[0][0])
+                queue = queues[host]
+                _, item = queue.items.popleft()
+                queue.active += 1
+                queue.next_start = now + queue.interval
+                stats.hosts[host].record_start(now)
+                in_flight[executor.submit(worker, item)] = (host, item, now)
+            return None
+
+        timeout = _dispatch()
+        while in_flight or timeout is not None:
+            if not in_flight and timeout is not None:
+                time.sleep(timeout)
+                timeout = _dispatch()
+                continue
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                host, item, started = in_flight.pop(future)
+                queue = queues[host]
+                queue.active -= 1
+                result = future.result()
+                failed = is_error(result)
+                stats.hosts[host].record_finish(
+                    started,
+                    time.monotonic(),
+                    error=failed,
+                )
+                if failed:
+                    queue.interval = min(_MAX_HOST_INTERVAL, queue.interval * 2)
+                else:
+                    queue.interval = min_interval
+                yield item, result
+            timeout = _dispatch()
@@ -0,0 +1,86 @@
+"""Read-only connections for running independent read queries at once."""
+
+from __future__ import annotations
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Self
+
+from .datastore import Datastore
+from .exceptions import SchemaOutdatedError
+from .profiles import READ_PROFILE, ConnectionProfile
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+DEFAULT_POOL_SIZE = 4
+
+
+class ReadPool:
+    """A fixed set of read-only Datastores shared by a pool of threads.
+
+    sqlite3 releases the GIL while a statement runs, so reads on separate
+    connections overlap and a batch takes about as long as its slowest
+    query. The schema is checked, and migrated or backfilled if needed,
+    once for the whole pool rather than once per connection.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = DEFAULT_POOL_SIZE,
+        profile: ConnectionProfile = READ_PROFILE,
+    ) -> None:
+        if not Path(db_path).is_file():
+            # Only a writable connection can create the database.
+            Datastore(db_path, profile).close()
+        try:
+            first = Datastore(db_path, profile, read_only=True)
+        except SchemaOutdatedError:
+            # Or bring its schema up to date.
+            Datastore(db_path, profile).close()
+            first = Datastore(db_path, profile, read_only=True)
+        self.size = max(1, size)
+        self._idle: queue.SimpleQueue[Datastore] = queue.SimpleQueue()
+        self._stores = [first]
+        self._stores += [
+            Datastore(db_path, profile, read_only=True) for _ in range(self.size - 1)
+        ]
+        for store in self._stores:
+            self._idle.put(store)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.size,
+            thread_name_prefix="read-pool",
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Wait for running reads, then close every connection."""
+        self._executor.shutdown()
+        for store in self._stores:
+            store.close()
+
+    def _run[T](self, call: Callable[[Datastore], T]) -> T:
+        store = self._idle.get()
+        try:
+            return call(store)
+        finally:
+            self._idle.put(store)
+
+    def map[T](self, calls: Iterable[Callable[[Datastore], T]]) -> list[T]:
+        """Call each function with a connection of its own, all at once.
+
+        Results come back in the order of calls; the first exception raised
+        by a call is raised here once every call has finished.
+        """
+        futures = [self._executor.submit(self._run, call) for call in calls]
+        errors = [e for future in futures if (e := future.exception()) is not None]
+        if errors:
+            raise errors[0]
+        return [future.result() for future in futures]
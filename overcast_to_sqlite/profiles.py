@@ -0,0 +1,121 @@
+"""SQLite connection profiles: PRAGMA settings tuned for how a command uses the DB."""
+
+from __future__ import annotations
+
+import dataclasses
+import sqlite3
+import time
+from pathlib import Path
+
+_JOURNAL_MODE_RETRY_DELAY = 0.01
+
+
+@dataclasses.dataclass(frozen=True)
+class ConnectionProfile:
+    """PRAGMA settings applied to every Datastore connection.
+
+    Override individual settings with dataclasses.replace, e.g.
+    replace(INGEST_PROFILE, mmap_size=0). A journal_mode of None leaves the
+    database's persistent journal mode alone, which needs no write access.
+    cache_size follows SQLite: negative values are KiB, positive are pages.
+    auto_vacuum only takes effect on new databases or at the next VACUUM, and
+    None leaves it alone.
+    """
+
+    auto_vacuum: str | None = "incremental"
+    journal_mode: str | None = "wal"
+    synchronous: str = "normal"
+    cache_size: int = -16_000
+    mmap_size: int = 64 * 1024 * 1024
+    temp_store: str = "memory"
+    busy_timeout: int = 5_000
+    wal_autocheckpoint: int = 1_000
+    query_only: bool = False
+    optimize_on_close: bool = True
+
+    def pragmas(self) -> list[tuple[str, str | int]]:
+        """Return the (name, value) PRAGMAs to run when connecting."""
+        pragmas: list[tuple[str, str | int]] = [
+            ("busy_timeout", self.busy_timeout),
+            ("synchronous", self.synchronous),
+            ("cache_size", self.cache_size),
+            ("mmap_size", self.mmap_size),
+            ("temp_store", self.temp_store),
+        ]
+        if self.journal_mode is not None:
+            pragmas.insert(1, ("journal_mode", self.journal_mode))
+            pragmas.append(("wal_autocheckpoint", self.wal_autocheckpoint))
+        if self.auto_vacuum is not None:
+            # Must precede journal_mode, whose first write fixes a new file's header.
+            pragmas.insert(1, ("auto_vacuum", self.auto_vacuum))
+        return pragmas
+
+    def read_only(self) -> ConnectionProfile:
+        """Return this profile without the settings that write to the file."""
+        return dataclasses.replace(
+            self,
+            auto_vacuum=None,
+            journal_mode=None,
+            query_only=True,
+            optimize_on_close=False,
+        )
+
+    def apply(self, connection: sqlite3.Connection) -> None:
+        """Configure connection, except query_only which is set after setup."""
+        for name, value in self.pragmas():
+            if name == "journal_mode":
+                self._set_journal_mode(connection)
+            else:
+                connection.execute(f"PRAGMA {name} = {value};")
+
+    def _set_journal_mode(self, connection: sqlite3.Connection) -> None:
+        """Switch the journal mode, retrying for up to busy_timeout.
+
+        Switching takes an exclusive lock, and SQLite fails at once rather
+        than wait for it when connections opening a new file race to switch.
+        """
+        deadline = time.monotonic() + self.busy_timeout / 1000
+        while True:
+            try:
+                connection.execute(f"PRAGMA journal_mode = {self.journal_mode};")
+            except sqlite3.OperationalError:
+                (current,) = connection.execute("PRAGMA journal_mode;").fetchone()
+                if current.lower() == str(self.journal_mode).lower():
+                    return
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(_JOURNAL_MODE_RETRY_DELAY)
+            else:
+                return
+
+
+# Everyday commands: WAL lets readers run alongside a writer, and with WAL,
+# synchronous=NORMAL only syncs at checkpoints while staying corruption-safe.
+DEFAULT_PROFILE = ConnectionProfile()
+
+# Bulk imports: a larger page cache and less frequent checkpoints keep the
+# many small transactions of save/extend/transcripts from being fsync-bound.
+INGEST_PROFILE = ConnectionProfile(
+    cache_size=-256_000,
+    mmap_size=256 * 1024 * 1024,
+    wal_autocheckpoint=10_000,
+)
+
+# html, stats and search: never write, and map the file for faster scans.
+READ_PROFILE = ConnectionProfile(
+    auto_vacuum=None,
+    journal_mode=None,
+    cache_size=-64_000,
+    mmap_size=256 * 1024 * 1024,
+    query_only=True,
+    optimize_on_close=False,
+)
+
+
+def read_only_connection(db_path: str) -> sqlite3.Connection:
+    """Open db_path through a mode=ro URI, so SQLite refuses every write.
+
+    The connection may be used from any thread, one at a time.
+    """
+    uri = f"{Path(db_path).absolute().as_uri()}?mode=ro"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
@@ -0,0 +1,373 @@
+"""One bm25-ranked search across episodes, feeds, chapters and transcripts."""
+
+from __future__ import annotations
+
+import dataclasses
+import re
+import zlib
+from typing import TYPE_CHECKING
+
+from .constants import (
+    CHAPTERS,
+    CONTENT,
+    DESCRIPTION,
+    ENCLOSURE_ID,
+    EPISODES_EXTENDED,
+    EPISODES_EXTENDED_HOT,
+    FEED_XML_URL,
+    FEEDS_EXTENDED,
+    TIME,
+    TITLE,
+    TRANSCRIPT_DL_PATH,
+    TRANSCRIPT_SEGMENTS,
+    TRANSCRIPTS,
+    XML_URL,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    from sqlite_utils import Database
+
+# Result kinds, in the order ties on score are broken.
+KINDS = ("episode", "feed", "chapter", "transcript")
+
+# bm25 weight of each indexed column: episodes and feeds index (title,
+# description), chapters their content and transcripts their segment text.
+DEFAULT_WEIGHTS: dict[str, tuple[float, ...]] = {
+    "episode": (10.0, 1.0),
+    "feed": (10.0, 1.0),
+    "chapter": (2.0,),
+    "transcript": (1.0,),
+}
+DEFAULT_HIGHLIGHT = ("[", "]")
+_SNIPPET_TOKENS = 16
+_SNIPPET_CHARS = 100
+_FTS_OPERATORS = {"AND", "OR", "NOT", "NEAR"}
+_TRIGRAM = 3
+
+# Optional trigram indexes for substring search, and the columns they cover.
+TRIGRAM_COLUMNS = {EPISODES_EXTENDED: (TITLE, DESCRIPTION), CHAPTERS: (CONTENT,)}
+
+# Substring matches rank after every word match: bm25 scores are at most 0,
+# and this maps a trigram bm25 score onto (0, 1] keeping its order.
+_SUBSTRING_SCORE = "1.0 / (1.0 - fts.rank)"
+
+
+@dataclasses.dataclass(frozen=True)
+class SearchHit:
+    """One search result; lower scores rank higher, as with bm25().
+
+    substring is set for hits found only by the trigram index.
+    """
+
+    kind: str
+    title: str | None
+    context: str | None
+    snippet: str
+    start: float | None
+    score: float
+    rowid: int
+    substring: bool = False
+
+    @property
+    def cursor(self) -> str:
+        """Return the opaque position to pass as after= for the next page."""
+        return f"{self.score!r}:{KINDS.index(self.kind)}:{self.rowid}"
+
+
+@dataclasses.dataclass
+class SearchPage:
+    """A page of hits, with next_cursor set when more results follow."""
+
+    hits: list[SearchHit]
+    next_cursor: str | None
+
+
+def parse_cursor(cursor: str) -> tuple[float, int, int]:
+    """Split a SearchHit.cursor back into (score, kind index, rowid)."""
+    try:
+        score, kind, rowid = cursor.split(":")
+        return float(score), int(kind), int(rowid)
+    except ValueError:
+        msg = f"Invalid search cursor: {cursor}"
+        raise ValueError(msg) from None
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching every word.
+
+    Each word is quoted, so punctuation and FTS5 operators are matched
+    literally instead of raising a syntax error. A trailing * keeps its
+    meaning as a prefix search.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')  # noqa: PLW2901
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _substring_words(text: str) -> list[str]:
+    """Return the words of text long enough for the trigram tokenizer to match."""
+    return [word for word in text.replace("*", " ").split() if len(word) >= _TRIGRAM]
+
+
+def substring_query(text: str) -> str:
+    """Turn free text into a trigram FTS5 query matching every word anywhere.
+
+    The trigram tokenizer cannot match fragments shorter than three
+    characters, so those words are left out.
+    """
+    return fts_query(" ".join(_substring_words(text)))
+
+
+def _fts_source(table: str, *, substring: bool) -> tuple[str, str, str]:
+    """Return the index, MATCH parameter and score for a word or substring source."""
+    if substring:
+        return f"{table}_trigram", ":substring", _SUBSTRING_SCORE
+    return f"{table}_fts", ":query", "fts.rank"
+
+
+def _substring_only(table: str) -> str:
+    """Return SQL skipping rows that the word index already matched."""
+    return (
+        f"AND fts.rowid NOT IN (SELECT rowid FROM {table}_fts "
+        f"WHERE {table}_fts MATCH :query) "
+    )
+
+
+def _snippet(fts: str, text: str, *, substring: bool) -> str:
+    """Return SQL for a snippet, or with substring the text to cut one from.
+
+    snippet() counts trigrams as tokens, so it cannot cut substring snippets.
+    """
+    if substring:
+        return text
+    return f"snippet({fts}, -1, :open, :close, '…', {_SNIPPET_TOKENS})"
+
+
+def _episode_source(*, substring: bool = False) -> str:
+    fts, match, score = _fts_source(EPISODES_EXTENDED, substring=substring)
+    # Only substring snippets are cut from the description in the cold table.
+    table = EPISODES_EXTENDED if substring else EPISODES_EXTENDED_HOT
+    text = f"COALESCE(ee.{TITLE}, '') || ' ' || COALESCE(ee.{DESCRIPTION}, '')"
+    return (
+        f"SELECT 0, fts.rowid, {score}, {int(substring)}, ee.{TITLE}, fe.{TITLE}, "
+        f"{_snippet(fts, text, substring=substring)}, "
+        "NULL, NULL, NULL, NULL, NULL "
+        f"FROM {fts} fts "
+        f"JOIN {table} ee ON ee.rowid = fts.rowid "
+        f"LEFT JOIN {FEEDS_EXTENDED} fe ON ee.{FEED_XML_URL} = fe.{XML_URL} "
+        f"WHERE fts.{fts} MATCH {match} AND fts.rank MATCH :episode_rank "
+    ) + (_substring_only(EPISODES_EXTENDED) if substring else "")
+
+
+def _feed_source() -> str:
+    return (
+        f"SELECT 1, fts.rowid, fts.rank, 0, fe.{TITLE}, NULL, "
+        f"snippet({FEEDS_EXTENDED}_fts, -1, :open, :close, '…', "
+        f"{_SNIPPET_TOKENS}), NULL, NULL, NULL, NULL, NULL "
+        f"FROM {FEEDS_EXTENDED}_fts fts "
+        f"JOIN {FEEDS_EXTENDED} fe ON fe.rowid = fts.rowid "
+        f"WHERE fts.{FEEDS_EXTENDED}_fts MATCH :query "
+        "AND fts.rank MATCH :feed_rank "
+    )
+
+
+def _chapter_source(*, substring: bool = False) -> str:
+    fts, match, score = _fts_source(CHAPTERS, substring=substring)
+    return (
+        f"SELECT 2, fts.rowid, {score}, {int(substring)}, ee.{TITLE}, fe.{TITLE}, "
+        f"{_snippet(fts, f'ch.{CONTENT}', substring=substring)}, "
+        f"ch.{TIME}, NULL, NULL, NULL, NULL "
+        f"FROM {fts} fts "
+        f"JOIN {CHAPTERS} ch ON ch.rowid = fts.rowid "
+        f"LEFT JOIN {EPISODES_EXTENDED_HOT} ee "
+        f"ON ee.{ENCLOSURE_ID} = ch.{ENCLOSURE_ID} "
+        f"LEFT JOIN {FEEDS_EXTENDED} fe ON ee.{FEED_XML_URL} = fe.{XML_URL} "
+        f"WHERE fts.{fts} MATCH {match} AND fts.rank MATCH :chapter_rank "
+    ) + (_substring_only(CHAPTERS) if substring else "")
+
+
+def _transcript_source() -> str:
+    # Contentless: snippet() is unavailable, so the segment text is cut
+    # from the compressed transcript and highlighted in Python.
+    return (
+        "SELECT 3, fts.rowid, fts.rank, 0, "
+        f"(SELECT ee.{TITLE} FROM {EPISODES_EXTENDED_HOT} ee "
+        f"WHERE ee.{TRANSCRIPT_DL_PATH} = t.path LIMIT 1), "
+        f"(SELECT fe.{TITLE} FROM {EPISODES_EXTENDED_HOT} ee "
+        f"JOIN {FEEDS_EXTENDED} fe ON ee.{FEED_XML_URL} = fe.{XML_URL} "
+        f"WHERE ee.{TRANSCRIPT_DL_PATH} = t.path LIMIT 1), "
+        "NULL, s.startTime, t.id, t.text, s.textStart, s.textEnd "
+        f"FROM {TRANSCRIPT_SEGMENTS}_fts fts "
+        f"JOIN {TRANSCRIPT_SEGMENTS} s ON s.id = fts.rowid "
+        f"JOIN {TRANSCRIPTS} t ON t.id = s.transcriptId "
+        f"WHERE fts.{TRANSCRIPT_SEGMENTS}_fts MATCH :query "
+        "AND fts.rank MATCH :transcript_rank "
+    )
+
+
+def _source_queries(*, after: bool) -> dict[str, str]:
+    """Return one query per source, each yielding the same twelve columns."""
+    sources = {
+        "episode": (0, "fts.rank", _episode_source()),
+        "feed": (1, "fts.rank", _feed_source()),
+        "chapter": (2, "fts.rank", _chapter_source()),
+        "transcript": (3, "fts.rank", _transcript_source()),
+        "episode substring": (0, _SUBSTRING_SCORE, _episode_source(substring=True)),
+        "chapter substring": (2, _SUBSTRING_SCORE, _chapter_source(substring=True)),
+    }
+    keyset = "AND ({score}, {kind}, fts.rowid) > (:score, :kind, :rowid) "
+    return {
+        source: query + (keyset.format(score=score, kind=kind) if after else "")
+        for source, (kind, score, query) in sources.items()
+    }
+
+
+def search_sql(sources: Iterable[str], *, after: bool) -> str:
+    """Return the federated query: each source's best matches, merged by score."""
+    queries = _source_queries(after=after)
+    return (
+        " UNION ALL ".join(
+            f"SELECT * FROM ({queries[source]}ORDER BY fts.rank LIMIT :fetch)"
+            for source in sources
+        )
+        + " ORDER BY 3, 1, 2 LIMIT :fetch;"
+    )
+
+
+def search_params(  # noqa: PLR0913
+    query: str,
+    *,
+    limit: int,
+    after: str | None,
+    weights: Mapping[str, tuple[float, ...]],
+    highlight: tuple[str, str],
+    raw: bool,
+    substring: bool,
+) -> dict[str, object]:
+    """Return the named parameters for search_sql."""
+    params: dict[str, object] = {
+        "query": query if raw else fts_query(query),
+        "substring": substring_query(query) if substring else "",
+        "fetch": limit + 1,
+        "open": highlight[0],
+        "close": highlight[1],
+    }
+    for kind in KINDS:
+        column_weights = weights.get(kind, DEFAULT_WEIGHTS[kind])
+        params[f"{kind}_rank"] = f"bm25({', '.join(map(str, column_weights))})"
+    if after is not None:
+        params["score"], params["kind"], params["rowid"] = parse_cursor(after)
+    return params
+
+
+def _highlight_terms(query: str, text: str, highlight: tuple[str, str]) -> str:
+    """Mark the words of query found in text, matching prefixes like FTS5."""
+    words = [
+        re.escape(word)
+        for word in re.findall(r"\w+", query)
+        if word not in _FTS_OPERATORS
+    ]
+    if not words:
+        return text
+    pattern = re.compile(rf"\b(?:{'|'.join(words)})\w*", re.IGNORECASE)
+    return pattern.sub(lambda m: f"{highlight[0]}{m[0]}{highlight[1]}", text)
+
+
+def _substring_snippet(query: str, text: str, highlight: tuple[str, str]) -> str:
+    """Cut text around the first word of query found in it, marking each one."""
+    words = map(re.escape, _substring_words(query))
+    pattern = re.compile("|".join(words), re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(first.start() - _SNIPPET_CHARS // 3, 0) if first else 0
+    end = start + _SNIPPET_CHARS
+    window = pattern.sub(
+        lambda m: f"{highlight[0]}{m[0]}{highlight[1]}",
+        text[start:end],
+    )
+    return ("…" if start else "") + window + ("…" if end < len(text) else "")
+
+
+def build_page(
+    rows: list[tuple],
+    *,
+    query: str,
+    limit: int,
+    highlight: tuple[str, str],
+) -> SearchPage:
+    """Turn search_sql rows into hits, decompressing transcript text once each."""
+    texts: dict[int, str] = {}
+    hits = []
+    for row in rows[:limit]:
+        kind, rowid, score, substring, title, context, snippet, start, *transcript = row
+        transcript_id, blob, text_start, text_end = transcript
+        if transcript_id is not None:
+            if transcript_id not in texts:
+                texts[transcript_id] = zlib.decompress(blob).decode()
+            segment = texts[transcript_id][text_start:text_end]
+            snippet = _highlight_terms(query, segment, highlight)
+        elif substring:
+            snippet = _substring_snippet(query, snippet, highlight)
+        hits.append(
+            SearchHit(
+                kind=KINDS[kind],
+                title=title,
+                context=context,
+                snippet=snippet or "",
+                start=start,
+                score=score,
+                rowid=rowid,
+                substring=bool(substring),
+            ),
+        )
+    next_cursor = hits[-1].cursor if len(rows) > limit else None
+    return SearchPage(hits, next_cursor)
+
+
+def create_trigram_indexes(db: Database) -> None:
+    """Create and fill the trigram indexes, with triggers keeping them current.
+
+    They are external-content FTS5 tables over the same rows as the word
+    indexes, so only the trigram index itself takes extra space.
+    """
+    for table, columns in TRIGRAM_COLUMNS.items():
+        fts = f"{table}_trigram"
+        if db[fts].exists():
+            continue
+        names = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+        delete = (
+            f"INSERT INTO {fts} ({fts}, rowid, {names}) "
+            f"VALUES ('delete', old.rowid, {old}); "
+        )
+        insert = f"INSERT INTO {fts} (rowid, {names}) VALUES (new.rowid, {new}); "
+        with db.conn:
+            db.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, "
+                f"content='{table}', content_rowid='rowid', tokenize='trigram');",
+            )
+            db.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild');")
+            for suffix, event, body in (
+                ("ai", "AFTER INSERT", insert),
+                ("ad", "AFTER DELETE", delete),
+                ("au", "AFTER UPDATE", delete + insert),
+            ):
+                db.execute(
+                    f"CREATE TRIGGER {fts}_{suffix} {event} ON {table} "
+                    f"BEGIN {body}END;",
+                )
+
+
+def drop_trigram_indexes(db: Database) -> None:
+    """Drop the trigram indexes and their triggers."""
+    with db.conn:
+        for table in TRIGRAM_COLUMNS:
+            for suffix in ("ai", "ad", "au"):
+                db.execute(f"DROP TRIGGER IF EXISTS {table}_trigram_{suffix};")
+            db.execute(f"DROP TABLE IF EXISTS {table}_trigram;")
@@ -0,0 +1,220 @@
+"""Listening statistics kept up to date incrementally by triggers."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sqlite_utils import Database
+
+from .constants import (
+    EPISODES,
+    FEED_ID,
+    FEED_STATS,
+    FEEDS,
+    OVERCAST_ID,
+    PROGRESS,
+    STATS_SUMMARY,
+    USER_REC_DATE,
+)
+
+# get_listening_stats keys and the stats_summary columns holding them.
+STATS_COLUMNS = {
+    "episodes_played": "episodesPlayed",
+    "total_progress_seconds": "progressSeconds",
+    "feeds_subscribed": "feedsSubscribed",
+    "feeds_removed": "feedsRemoved",
+    "episodes_starred": "episodesStarred",
+}
+
+
+def _episode_counts(row: str) -> tuple[str, str, str]:
+    """Return SQL for an episode row's share of the played, starred and time totals."""
+    return (
+        f"COALESCE({row}.played = 1, 0)",
+        f"({row}.{USER_REC_DATE} IS NOT NULL)",
+        f"MAX(COALESCE({row}.{PROGRESS}, 0), 0)",
+    )
+
+
+def _feed_counts(row: str) -> tuple[str, str]:
+    """Return SQL for a feed row's share of the subscribed and removed totals."""
+    return (
+        f"COALESCE({row}.subscribed = 1, 0)",
+        f"({row}.dateRemoveDetected IS NOT NULL)",
+    )
+
+
+def _apply_episode(row: str, sign: str) -> str:
+    """Return trigger statements adding (sign +) or removing (-) an episode."""
+    played, starred, progress = _episode_counts(row)
+    return (
+        f"INSERT INTO {FEED_STATS} ({FEED_ID}, played, starred, progressSeconds) "
+        f"SELECT {row}.{FEED_ID}, {sign}{played}, {sign}{starred}, {sign}{progress} "
+        f"WHERE {row}.{FEED_ID} IS NOT NULL "
+        f"ON CONFLICT({FEED_ID}) DO UPDATE SET "
+        "played = played + excluded.played, "
+        "starred = starred + excluded.starred, "
+        "progressSeconds = progressSeconds + excluded.progressSeconds; "
+        f"UPDATE {STATS_SUMMARY} SET "
+        f"episodesPlayed = episodesPlayed {sign} {played}, "
+        f"episodesStarred = episodesStarred {sign} {starred}, "
+        f"progressSeconds = progressSeconds {sign} {progress}; "
+    )
+
+
+def _apply_feed(row: str, sign: str) -> str:
+    """Return a trigger statement adding (sign +) or removing (-) a feed."""
+    subscribed, removed = _feed_counts(row)
+    return (
+        f"UPDATE {STATS_SUMMARY} SET "
+        f"feedsSubscribed = feedsSubscribed {sign} {subscribed}, "
+        f"feedsRemoved = feedsRemoved {sign} {removed}; "
+    )
+
+
+def create_stats_tables(db: Database) -> None:
+    """Create stats_summary, feed_stats and the triggers that maintain them.
+
+    stats_summary holds a single row of totals and feed_stats one row per
+    feed, so reading them costs the same however many episodes are stored.
+    """
+    db.execute(
+        f"CREATE TABLE IF NOT EXISTS {STATS_SUMMARY} ("
+        "id INTEGER PRIMARY KEY CHECK (id = 1), "
+        "episodesPlayed INTEGER NOT NULL, episodesStarred INTEGER NOT NULL, "
+        "progressSeconds INTEGER NOT NULL, feedsSubscribed INTEGER NOT NULL, "
+        "feedsRemoved INTEGER NOT NULL);",
+    )
+    db.execute(
+        f"CREATE TABLE IF NOT EXISTS {FEED_STATS} ("
+        f"{FEED_ID} INTEGER PRIMARY KEY REFERENCES {FEEDS}({OVERCAST_ID}), "
+        "played INTEGER NOT NULL, starred INTEGER NOT NULL, "
+        "progressSeconds INTEGER NOT NULL);",
+    )
+    for column in ("played", "progressSeconds"):
+        db.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{FEED_STATS}_{column} "
+            f"ON {FEED_STATS} ({column});",
+        )
+    episode_changed = (
+        f"({', '.join(_episode_counts('OLD'))}, OLD.{FEED_ID}) IS NOT "
+        f"({', '.join(_episode_counts('NEW'))}, NEW.{FEED_ID})"
+    )
+    feed_changed = (
+        f"({', '.join(_feed_counts('OLD'))}) IS NOT ({', '.join(_feed_counts('NEW'))})"
+    )
+    triggers = {
+        f"{EPISODES}_stats_insert": (
+            f"AFTER INSERT ON {EPISODES}",
+            _apply_episode("NEW", "+"),
+        ),
+        f"{EPISODES}_stats_delete": (
+            f"AFTER DELETE ON {EPISODES}",
+            _apply_episode("OLD", "-"),
+        ),
+        f"{EPISODES}_stats_update": (
+            (
+                f"AFTER UPDATE OF played, {PROGRESS}, {USER_REC_DATE}, {FEED_ID} "
+                f"ON {EPISODES} WHEN {episode_changed}"
+            ),
+            _apply_episode("OLD", "-") + _apply_episode("NEW", "+"),
+        ),
+        f"{FEEDS}_stats_insert": (f"AFTER INSERT ON {FEEDS}", _apply_feed("NEW", "+")),
+        f"{FEEDS}_stats_delete": (f"AFTER DELETE ON {FEEDS}", _apply_feed("OLD", "-")),
+        f"{FEEDS}_stats_update": (
+            (
+                f"AFTER UPDATE OF subscribed, dateRemoveDetected ON {FEEDS} "
+                f"WHEN {feed_changed}"
+            ),
+            _apply_feed("OLD", "-") + _apply_feed("NEW", "+"),
+        ),
+    }
+    for name, (event, body) in triggers.items():
+        db.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body}END;")
+
+
+def _recount_feeds(db: Database) -> dict[int, tuple[int, int, int]]:
+    """Count (played, starred, progressSeconds) per feed from episodes."""
+    played, starred, progress = _episode_counts(EPISODES)
+    return {
+        feed_id: tuple(counts)
+        for feed_id, *counts in db.execute(
+            f"SELECT {FEED_ID}, SUM({played}), SUM({starred}), SUM({progress}) "
+            f"FROM {EPISODES} WHERE {FEED_ID} IS NOT NULL GROUP BY {FEED_ID};",
+        )
+        if any(counts)
+    }
+
+
+def _recount_summary(db: Database) -> dict[str, int]:
+    """Count the stats_summary totals from episodes and feeds."""
+    played, starred, progress = _episode_counts(EPISODES)
+    subscribed, removed = _feed_counts(FEEDS)
+    episodes = db.execute(
+        f"SELECT COALESCE(SUM({played}), 0), COALESCE(SUM({starred}), 0), "
+        f"COALESCE(SUM({progress}), 0) FROM {EPISODES};",
+    ).fetchone()
+    feeds = db.execute(
+        f"SELECT COALESCE(SUM({subscribed}), 0), COALESCE(SUM({removed}), 0) "
+        f"FROM {FEEDS};",
+    ).fetchone()
+    return dict(
+        zip(
+            ("episodesPlayed", "episodesStarred", "progressSeconds"),
+            episodes,
+            strict=True,
+        ),
+    ) | dict(zip(("feedsSubscribed", "feedsRemoved"), feeds, strict=True))
+
+
+def rebuild_stats(db: Database) -> None:
+    """Recompute stats_summary and feed_stats from scratch.
+
+    Runs in the caller's transaction; nothing is committed here.
+    """
+    summary = _recount_summary(db)
+    connection = db.conn
+    connection.execute(f"DELETE FROM {FEED_STATS};")
+    connection.executemany(
+        f"INSERT INTO {FEED_STATS} ({FEED_ID}, played, starred, progressSeconds) "
+        "VALUES (?, ?, ?, ?);",
+        [(feed_id, *counts) for feed_id, counts in _recount_feeds(db).items()],
+    )
+    connection.execute(f"DELETE FROM {STATS_SUMMARY};")
+    connection.execute(
+        f"INSERT INTO {STATS_SUMMARY} (id, {', '.join(summary)}) "
+        f"VALUES (1, {', '.join('?' for _ in summary)});",
+        list(summary.values()),
+    )
+
+
+def verify_stats(db: Database) -> list[str]:
+    """Recount the statistics and describe where the stored values differ."""
+    problems = []
+    stored_summary = db.execute(
+        f"SELECT {', '.join(STATS_COLUMNS.values())} FROM {STATS_SUMMARY};",
+    ).fetchone()
+    if stored_summary is None:
+        return [f"{STATS_SUMMARY} is empty"]
+    stored = dict(zip(STATS_COLUMNS.values(), stored_summary, strict=True))
+    for column, actual in _recount_summary(db).items():
+        if stored[column] != actual:
+            problems.append(f"{column}: stored {stored[column]}, actual {actual}")
+    stored_feeds = {
+        feed_id: tuple(counts)
+        for feed_id, *counts in db.execute(
+            f"SELECT {FEED_ID}, played, starred, progressSeconds FROM {FEED_STATS};",
+        )
+        if any(counts)
+    }
+    actual_feeds = _recount_feeds(db)
+    for feed_id in sorted(stored_feeds.keys() | actual_feeds.keys()):
+        stored_counts = stored_feeds.get(feed_id, (0, 0, 0))
+        actual_counts = actual_feeds.get(feed_id, (0, 0, 0))
+        if stored_counts != actual_counts:
+            problems.append(
+                f"feed {feed_id} (played, starred, seconds): "
+                f"stored {stored_counts}, actual {actual_counts}",
+            )
+    return problems
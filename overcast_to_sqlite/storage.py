@@ -0,0 +1,244 @@
+"""Report where the bytes of the database go, by object and by column."""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import random
+import sqlite3
+from typing import TYPE_CHECKING
+
+from .maintenance import fts_tables
+
+if TYPE_CHECKING:
+    from sqlite_utils import Database
+
+DEFAULT_SAMPLE = 1_000
+# A text column averaging at least this many bytes and holding at least
+# _COMPRESS_SHARE of its table is worth compressing.
+_COMPRESS_MIN_BYTES = 256
+_COMPRESS_SHARE = 0.2
+# A column that is NULL in at least this share of sampled rows, or holds
+# a single value, can be pruned; tables with fewer rows are too small to tell.
+_PRUNE_NULL_RATIO = 0.95
+_PRUNE_MIN_ROWS = 100
+# Objects with at least this many pages and share of unused bytes are
+# fragmented enough for `maintain --full` to pay off.
+_FRAGMENTED_PAGES = 100
+_FRAGMENTED_RATIO = 0.25
+# Largest integer stored in 1, 2, 3, 4 and 6 bytes of an SQLite record.
+_INTEGER_SIZES = ((2**7, 1), (2**15, 2), (2**23, 3), (2**31, 4), (2**47, 6))
+
+
+@dataclasses.dataclass
+class ObjectUsage:
+    """Pages and bytes of one table, index or FTS shadow table."""
+
+    name: str
+    kind: str
+    table: str
+    pages: int
+    size: int
+    payload: int
+    unused: int
+    rows: int | None = None
+
+
+@dataclasses.dataclass
+class ColumnUsage:
+    """What a sample of one table's rows holds in one column."""
+
+    table: str
+    name: str
+    rows: int
+    sampled: int
+    nulls: int
+    payload: int
+    distinct: int
+    text: bool
+
+    @property
+    def null_ratio(self) -> float:
+        return self.nulls / self.sampled if self.sampled else 0.0
+
+    @property
+    def avg_payload(self) -> float:
+        return self.payload / self.sampled if self.sampled else 0.0
+
+    @property
+    def estimated_size(self) -> int:
+        """Bytes the column is estimated to hold across the whole table."""
+        return round(self.avg_payload * self.rows)
+
+
+@dataclasses.dataclass
+class Candidate:
+    """An object or column where optimization work is likely to pay off."""
+
+    target: str
+    action: str
+    reason: str
+
+
+@dataclasses.dataclass
+class StorageReport:
+    """Where the database's pages go, largest first."""
+
+    page_size: int
+    page_count: int
+    freelist_count: int
+    objects: list[ObjectUsage]
+    columns: list[ColumnUsage]
+    candidates: list[Candidate]
+
+    @property
+    def size(self) -> int:
+        return self.page_size * self.page_count
+
+
+def _object_kinds(db: Database) -> dict[str, tuple[str, str]]:
+    """Map each b-tree's name to its kind and the table it belongs to."""
+    fts = fts_tables(db)
+    kinds = {"sqlite_schema": ("schema", "sqlite_schema")}
+    for type_, name, table in db.execute(
+        "SELECT type, name, tbl_name FROM sqlite_master WHERE rootpage > 0;",
+    ):
+        owner = next((f for f in fts if name.startswith(f"{f}_")), None)
+        if owner is not None:
+            kinds[name] = ("fts", owner)
+        else:
+            kinds[name] = (type_, table)
+    return kinds
+
+
+def object_usage(db: Database) -> list[ObjectUsage]:
+    """Measure every table and index with dbstat, largest first."""
+    kinds = _object_kinds(db)
+    objects = []
+    for name, pages, size, payload, unused in db.execute(
+        "SELECT name, count(*), sum(pgsize), sum(payload), sum(unused) "
+        "FROM dbstat GROUP BY name;",
+    ):
+        kind, table = kinds.get(name, ("table", name))
+        usage = ObjectUsage(name, kind, table, pages, size, payload, unused)
+        if kind in {"table", "fts"}:
+            usage.rows = db.execute(f"SELECT count(*) FROM [{name}];").fetchone()[0]
+        objects.append(usage)
+    return sorted(objects, key=lambda usage: usage.size, reverse=True)
+
+
+def _value_size(value: object) -> int:
+    """Return roughly the bytes value takes up in an SQLite record."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, int):
+        if value in {0, 1}:
+            return 0
+        return next((n for bound, n in _INTEGER_SIZES if -bound <= value < bound), 8)
+    return 8
+
+
+def _sample_rows(db: Database, table: str, rows: int, sample: int) -> list[tuple]:
+    """Return up to sample rows, spread at random across the rowid range."""
+    if rows <= sample:
+        return db.execute(f"SELECT * FROM [{table}];").fetchall()
+    low, high = db.execute(f"SELECT min(rowid), max(rowid) FROM [{table}];").fetchone()
+    rng = random.Random(0)
+    starts = [rng.randint(low, high) for _ in range(sample)]
+    return db.execute(
+        f"SELECT * FROM [{table}] WHERE rowid IN ("
+        f"SELECT (SELECT rowid FROM [{table}] WHERE rowid >= value "
+        "ORDER BY rowid LIMIT 1) FROM json_each(?));",
+        [json.dumps(starts)],
+    ).fetchall()
+
+
+def column_usage(db: Database, table: str, rows: int, sample: int) -> list[ColumnUsage]:
+    """Sample a table's rows and summarize each of its columns."""
+    try:
+        sampled = _sample_rows(db, table, rows, sample)
+    except sqlite3.OperationalError:
+        # WITHOUT ROWID tables have no rowid to spread the sample over.
+        sampled = db.execute(f"SELECT * FROM [{table}] LIMIT ?;", [sample]).fetchall()
+    names = [row[1] for row in db.execute(f"PRAGMA table_info([{table}]);")]
+    columns = []
+    for i, name in enumerate(names):
+        values = [row[i] for row in sampled]
+        columns.append(
+            ColumnUsage(
+                table=table,
+                name=name,
+                rows=rows,
+                sampled=len(values),
+                nulls=sum(value is None for value in values),
+                payload=sum(_value_size(value) for value in values),
+                distinct=len(set(values)),
+                text=any(isinstance(value, str) for value in values),
+            ),
+        )
+    return columns
+
+
+def find_candidates(
+    objects: list[ObjectUsage],
+    columns: list[ColumnUsage],
+) -> list[Candidate]:
+    """Flag fragmented objects, and columns to compress or prune."""
+    candidates = [
+        Candidate(
+            usage.name,
+            "defragment",
+            f"{usage.unused / usage.size:.0%} of {usage.pages:,} pages unused",
+        )
+        for usage in objects
+        if usage.pages >= _FRAGMENTED_PAGES
+        and usage.unused >= _FRAGMENTED_RATIO * usage.size
+    ]
+    table_sizes: dict[str, int] = {}
+    for column in columns:
+        table_sizes[column.table] = (
+            table_sizes.get(column.table, 0) + column.estimated_size
+        )
+    for column in columns:
+        target = f"{column.table}.{column.name}"
+        share = column.estimated_size / (table_sizes[column.table] or 1)
+        if (
+            column.text
+            and column.avg_payload >= _COMPRESS_MIN_BYTES
+            and share >= _COMPRESS_SHARE
+        ):
+            reason = f"{column.avg_payload:,.0f} bytes on average, {share:.0%} of table"
+            candidates.append(Candidate(target, "compress", reason))
+        elif column.sampled < _PRUNE_MIN_ROWS:
+            continue
+        elif column.null_ratio >= _PRUNE_NULL_RATIO:
+            reason = f"{column.null_ratio:.0%} NULL"
+            candidates.append(Candidate(target, "prune", reason))
+        elif column.distinct == 1:
+            reason = "same value in every sampled row"
+            candidates.append(Candidate(target, "prune", reason))
+    return candidates
+
+
+def storage_report(db: Database, *, sample: int = DEFAULT_SAMPLE) -> StorageReport:
+    """Measure every object with dbstat and sample every table's columns."""
+    objects = object_usage(db)
+    columns = [
+        column
+        for usage in objects
+        if usage.kind == "table" and usage.rows and not usage.name.startswith("sqlite_")
+        for column in column_usage(db, usage.name, usage.rows, sample)
+    ]
+    columns.sort(key=lambda column: column.estimated_size, reverse=True)
+    return StorageReport(
+        page_size=db.execute("PRAGMA page_size;").fetchone()[0],
+        page_count=db.execute("PRAGMA page_count;").fetchone()[0],
+        freelist_count=db.execute("PRAGMA freelist_count;").fetchone()[0],
+        objects=objects,
+        columns=columns,
+        candidates=find_candidates(objects, columns),
+    )
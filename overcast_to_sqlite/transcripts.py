@@ -0,0 +1,205 @@
+"""Parse downloaded transcripts into timestamped segments for full-text search."""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .datastore import Datastore
+
+_TIMING = re.compile(
+    r"^\s*(?P<start>[\d:.,]+)\s*-->\s*(?P<end>[\d:.,]+)",
+)
+_VTT_VOICE = re.compile(r"<v(?:\.[^\s>]*)?\s+([^>]+)>")
+_TAG = re.compile(r"<[^>]+>")
+_SUFFIX_FORMATS = {
+    "vtt": "vtt",
+    "srt": "srt",
+    "json": "json",
+    "html": "html",
+    "htm": "html",
+}
+_CONTENT_PREFIXES = (
+    (("WEBVTT",), "vtt"),
+    (("{", "["), "json"),
+    (("<",), "html"),
+)
+
+
+@dataclasses.dataclass
+class Segment:
+    start: float | None
+    end: float | None
+    speaker: str | None
+    text: str
+
+
+def _timestamp_to_secs(timestamp: str) -> float | None:
+    """Convert HH:MM:SS.mmm, MM:SS,mmm or plain seconds into seconds."""
+    try:
+        seconds = 0.0
+        for part in timestamp.strip().replace(",", ".").split(":"):
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        return None
+    return seconds
+
+
+def _parse_cues(content: str) -> list[Segment]:
+    """Parse the cue blocks shared by WebVTT and SRT."""
+    segments = []
+    for block in re.split(r"\n\s*\n", content.replace("\r\n", "\n")):
+        lines = block.strip().splitlines()
+        for i, line in enumerate(lines):
+            if (timing := _TIMING.match(line)) is None:
+                continue
+            cue = " ".join(lines[i + 1 :])
+            speaker = m.group(1).strip() if (m := _VTT_VOICE.search(cue)) else None
+            if text := _TAG.sub("", cue).strip():
+                segments.append(
+                    Segment(
+                        _timestamp_to_secs(timing["start"]),
+                        _timestamp_to_secs(timing["end"]),
+                        speaker,
+                        text,
+                    ),
+                )
+            break
+    return segments
+
+
+def _parse_json(content: str) -> list[Segment]:
+    """Parse a Podcasting 2.0 JSON transcript."""
+    document: Any = json.loads(content)
+    segments = []
+    for segment in document.get("segments", []):
+        if text := str(segment.get("body", "")).strip():
+            start, end = segment.get("startTime"), segment.get("endTime")
+            segments.append(
+                Segment(
+                    None if start is None else float(start),
+                    None if end is None else float(end),
+                    segment.get("speaker"),
+                    text,
+                ),
+            )
+    return segments
+
+
+class _HTMLTranscriptParser(HTMLParser):
+    """Collect <p> paragraphs, using preceding <cite> and <time> as metadata."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.segments: list[Segment] = []
+        self._tag: str | None = None
+        self._text: list[str] = []
+        self._speaker: str | None = None
+        self._start: float | None = None
+
+    def handle_starttag(
+        self,
+        tag: str,
+        attrs: list[tuple[str, str | None]],  # noqa: ARG002
+    ) -> None:
+        if tag in {"p", "cite", "time"}:
+            self._tag = tag
+            self._text = []
+
+    def handle_data(self, data: str) -> None:
+        if self._tag is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag != self._tag:
+            return
+        text = " ".join("".join(self._text).split())
+        if tag == "cite":
+            self._speaker = text.rstrip(":") or None
+        elif tag == "time":
+            self._start = _timestamp_to_secs(text)
+        elif text:
+            self.segments.append(Segment(self._start, None, self._speaker, text))
+            self._start = None
+        self._tag = None
+
+
+def _parse_html(content: str) -> list[Segment]:
+    parser = _HTMLTranscriptParser()
+    parser.feed(content)
+    if parser.segments:
+        return parser.segments
+    return _parse_text(_TAG.sub(" ", content))
+
+
+def _parse_text(content: str) -> list[Segment]:
+    text = " ".join(content.split())
+    return [Segment(None, None, None, text)] if text else []
+
+
+def detect_format(path: Path, content: str) -> str:
+    """Guess the transcript format from its extension, falling back to content."""
+    suffix = path.suffix.lower().lstrip(".")
+    if suffix in _SUFFIX_FORMATS:
+        return _SUFFIX_FORMATS[suffix]
+    head = content.lstrip()[:64]
+    for prefixes, transcript_format in _CONTENT_PREFIXES:
+        if head.startswith(prefixes):
+            return transcript_format
+    return "srt" if _TIMING.search(content[:512]) else "text"
+
+
+_PARSERS = {
+    "vtt": _parse_cues,
+    "srt": _parse_cues,
+    "json": _parse_json,
+    "html": _parse_html,
+    "text": _parse_text,
+}
+
+
+def parse_transcript(path: Path) -> tuple[str, list[Segment]]:
+    """Parse a transcript file, returning its detected format and segments."""
+    content = path.read_text(encoding="utf-8", errors="replace")
+    transcript_format = detect_format(path, content)
+    try:
+        return transcript_format, _PARSERS[transcript_format](content)
+    except (ValueError, AttributeError, TypeError):
+        return "text", _parse_text(content)
+
+
+def ingest_transcripts(
+    db: Datastore,
+    changed_paths: Iterable[str] = (),
+    *,
+    verbose: bool = False,
+) -> int:
+    """Index transcripts not yet in the segment store, plus any changed paths.
+
+    Returns the number of transcript files ingested.
+    """
+    ingested = 0
+    for path_str in db.transcripts_to_ingest(changed_paths):
+        path = Path(path_str)
+        if not path.exists():
+            continue
+        transcript_format, segments = parse_transcript(path)
+        stat = path.stat()
+        db.save_transcript_segments(
+            path_str,
+            transcript_format,
+            stat.st_size,
+            stat.st_mtime,
+            [dataclasses.astuple(segment) for segment in segments],
+        )
+        ingested += 1
+        if verbose:
+            print(f"🔎Indexed {len(segments)} segments from {path}")
+    return ingested
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import random
+import re
 from mimetypes import guess_extension
 from pathlib import Path
 from typing import TYPE_CHECKING
@@ -19,6 +20,28 @@ _user_agents = [
     "Podcasts/1410.53 CFNetwork/978.0.7 Darwin/18.7.0",
 ]
 
+# Analytics services that wrap enclosures as <prefix>/<host>/<path>, sometimes
+# several deep. Matched against the URL with its scheme removed.
+_TRACKING_PREFIXES = re.compile(
+    r"^(?:"
+    r"(?:dts\.|www\.)?podtrac\.com/(?:pts/)?redirect\.[a-z0-9]+/"
+    r"|(?:www\.)?chtbl\.com/track/[^/]+/"
+    r"|chrt\.fm/track/[^/]+/"
+    r"|pdst\.fm/e/"
+    r"|op3\.dev/e(?:,[^/]*)?/"
+    r"|pfx\.vpixl\.com/[^/]+/"
+    r"|mgln\.ai/e/[^/]+/"
+    r"|prfx\.byspotify\.com/e/"
+    r"|arttrk\.com/p/[^/]+/"
+    r"|(?:verifi\.podscribe\.com|pscrb\.fm)/rss/p/"
+    r"|claritaspod\.com/measure/"
+    r"|(?:[^/]+\.)?swap\.fm/track/[^/]+/"
+    r")",
+    re.IGNORECASE,
+)
+_SCHEME = re.compile(r"^[a-z][a-z0-9+.-]*://", re.IGNORECASE)
+_DEFAULT_PORT = re.compile(r":(?:80|443)$")
+
 
 def _headers_ua() -> dict:
     """Return a random User-Agent header to avoid RSS and transcript download blocking.
@@ -35,6 +58,26 @@ def _parse_date_or_none(date_string: str) -> str | None:
         return None
 
 
+def _canonical_enclosure_url(url: str) -> str:
+    """Return the form of an enclosure URL used as its identity in the database.
+
+    Tracking redirect prefixes, the query string and the fragment are dropped,
+    the host is lowercased and http is upgraded to https, so the same audio
+    file reached through different feeds or analytics services matches.
+    """
+    url = url.strip().split("#", maxsplit=1)[0].split("?", maxsplit=1)[0]
+    if (scheme := _SCHEME.match(url)) is None:
+        return url
+    rest = url[scheme.end() :]
+    while (prefix := _TRACKING_PREFIXES.match(rest)) is not None:
+        rest = rest[prefix.end() :]
+        if inner_scheme := _SCHEME.match(rest):
+            rest = rest[inner_scheme.end() :]
+    host, slash, path = rest.partition("/")
+    host = _DEFAULT_PORT.sub("", host.lower())
+    return f"https://{host}{slash}{path}"
+
+
 def _archive_path(db_path: str, archive_name: str) -> Path:
     return Path(db_path).parent / "archive" / archive_name
 
@@ -0,0 +1,82 @@
+import sqlite3
+
+from overcast_to_sqlite.cache import QueryCache
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.models import Episode, Feed
+from overcast_to_sqlite.profiles import READ_PROFILE
+
+
+def _save_episode(db_path: str, overcast_id: int) -> None:
+    with Datastore(db_path) as store:
+        store.save_feed_and_episodes(
+            Feed(
+                overcastId=1,
+                title="Feed",
+                subscribed=True,
+                notifications=False,
+                xmlUrl="https://example.com/feed.xml",
+                htmlUrl="https://example.com",
+            ),
+            [
+                Episode(
+                    overcastId=overcast_id,
+                    feedId=1,
+                    title=f"Episode {overcast_id}",
+                    url=f"https://example.com/{overcast_id}",
+                    overcastUrl=f"https://overcast.fm/+{overcast_id}",
+                    played=True,
+                    userDeleted=False,
+                    enclosureUrl=f"https://cdn.example.com/{overcast_id}.mp3",
+                    progress=60,
+                    userUpdatedDate="2025-01-02T00:00:00+00:00",
+                ),
+            ],
+        )
+
+
+def test_cache_is_invalidated_by_writes_from_other_connections(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _save_episode(db_path, 1)
+    cache = QueryCache()
+    store = Datastore(db_path, READ_PROFILE, cache)
+
+    assert store.get_listening_stats()["episodes_played"] == 1
+    assert store.get_listening_stats()["episodes_played"] == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    _save_episode(db_path, 2)
+
+    assert store.get_listening_stats()["episodes_played"] == 2  # noqa: PLR2004
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_saved_cache_is_reused_until_the_database_changes(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    cache_path = tmp_path / "cache.json"
+    _save_episode(db_path, 1)
+    with Datastore(db_path, READ_PROFILE, QueryCache(path=cache_path)) as store:
+        store.get_top_podcasts_by_time()
+
+    reused = QueryCache(path=cache_path)
+    with Datastore(db_path, READ_PROFILE, reused) as store:
+        assert store.get_top_podcasts_by_time() == [("Feed", 60)]
+    assert reused.stats.hit_rate == 1.0
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE episodes SET progress = 120")
+    stale = QueryCache(path=cache_path)
+    with Datastore(db_path, READ_PROFILE, stale) as store:
+        assert store.get_top_podcasts_by_time() == [("Feed", 120)]
+    assert stale.stats.hits == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", [(1,)])
+    cache.put("b", [(2,)])
+    cache.get("a")
+    cache.put("c", [(3,)])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [(1,)]
+    assert cache.stats.evictions == 1
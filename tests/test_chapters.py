@@ -0,0 +1,272 @@
+import itertools
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from podcast_chapter_tools.entities import Chapter
+
+from overcast_to_sqlite import chapters_backfill
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.pipeline import HostStats, PipelineStats, fetch_pipeline
+
+
+def _extended_episodes(store: Datastore, count: int) -> None:
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml", "title": "Feed"},
+        [
+            {
+                "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+                "feedXmlUrl": "https://example.com/feed.xml",
+                "title": f"Episode {i}",
+                "guid": f"guid-{i}",
+                "podcast:chapters:url": f"https://host{i % 2}.example.com/{i}.json",
+            }
+            for i in range(count)
+        ],
+    )
+
+
+def test_fetch_pipeline_limits_requests_per_host():
+    lock = threading.Lock()
+    active: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    def _worker(url: str) -> str:
+        host = url.split("/")[2]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        time.sleep(0.01)
+        with lock:
+            active[host] -= 1
+        return url.upper()
+
+    urls = [f"https://host{i % 3}.example.com/{i}" for i in range(30)]
+    results = dict(
+        fetch_pipeline(urls, _worker, url_of=lambda u: u, max_in_flight=8, per_host=2),
+    )
+
+    assert results == {url: url.upper() for url in urls}
+    assert max(peak.values()) <= 2
+
+
+class _RecordingHostStats(HostStats):
+    """HostStats that keeps the time the pipeline started each request."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.starts: list[float] = []
+
+    def record_start(self, now: float) -> None:
+        self.starts.append(now)
+        super().record_start(now)
+
+
+def test_fetch_pipeline_interleaves_hosts_in_priority_order():
+    started: list[str] = []
+
+    def _worker(url: str) -> str:
+        started.append(url)
+        return "error" if "host1" in url else "ok"
+
+    urls = [
+        "https://host0.example.com/a",
+        "https://host0.example.com/b",
+        "https://host1.example.com/c",
+        "https://host0.example.com/d",
+    ]
+    host0 = _RecordingHostStats()
+    stats = PipelineStats(hosts={"host0.example.com": host0})
+    list(
+        fetch_pipeline(
+            urls,
+            _worker,
+            url_of=lambda u: u,
+            max_in_flight=1,
+            per_host=1,
+            min_interval=0.05,
+            is_error=lambda result: result == "error",
+            stats=stats,
+        ),
+    )
+
+    # host1 runs while host0 waits out its interval, instead of queueing last.
+    assert started == [urls[0], urls[2], urls[1], urls[3]]
+    assert all(b - a >= 0.05 for a, b in itertools.pairwise(host0.starts))
+    assert stats.hosts["host0.example.com"].completed == 3
+    assert stats.hosts["host1.example.com"].errors == 1
+
+
+def test_backfill_pci_records_failures_and_skips_them(monkeypatch, tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    _extended_episodes(store, 4)
+    calls: list[str] = []
+
+    def fake_get_and_extract(url: str, **_kwargs: object) -> list[Chapter] | None:
+        calls.append(url)
+        if "host1" in url:
+            return None
+        return [Chapter(0, "Intro"), Chapter(60, "Main")]
+
+    monkeypatch.setattr(
+        chapters_backfill,
+        "get_and_extract_pci_chapters",
+        fake_get_and_extract,
+    )
+
+    chapters_backfill.backfill_chapters_pci(store, Path(tmp_path / "chapters"))
+    assert len(calls) == 4
+
+    with sqlite3.connect(db_path) as conn:
+        chapter_count = conn.execute("SELECT COUNT(*) FROM chapters").fetchone()[0]
+        failures = conn.execute(
+            "SELECT url, attempts FROM fetch_failures ORDER BY url",
+        ).fetchall()
+    assert chapter_count == 4
+    assert failures == [
+        ("https://host1.example.com/1.json", 1),
+        ("https://host1.example.com/3.json", 1),
+    ]
+
+    calls.clear()
+    chapters_backfill.backfill_chapters_pci(store, Path(tmp_path / "chapters"))
+    assert calls == []
+
+
+def test_backfill_pci_archives_same_titled_episodes_apart(monkeypatch, tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml", "title": "Feed"},
+        [
+            {
+                "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+                "feedXmlUrl": "https://example.com/feed.xml",
+                "title": "Trailer",
+                "guid": f"guid-{i}",
+                "podcast:chapters:url": f"https://host{i}.example.com/{i}.json",
+            }
+            for i in range(2)
+        ],
+    )
+    both_fetching = threading.Barrier(2, timeout=5)
+
+    def fake_get_and_extract(
+        url: str,
+        archive_path_json: Path,
+        **_kwargs: object,
+    ) -> list[Chapter]:
+        both_fetching.wait()
+        archive_path_json.write_text(f'{{"url": "{url}"}}')
+        both_fetching.wait()
+        return [Chapter(0, "Intro")]
+
+    monkeypatch.setattr(
+        chapters_backfill,
+        "get_and_extract_pci_chapters",
+        fake_get_and_extract,
+    )
+
+    chapters_backfill.backfill_chapters_pci(store, Path(tmp_path / "chapters"))
+
+    with sqlite3.connect(db_path) as conn:
+        archived = conn.execute(
+            "SELECT r.enclosureUrl, b.path FROM blob_refs r "
+            "JOIN blobs b USING (sha256) ORDER BY r.enclosureUrl",
+        ).fetchall()
+    assert [(url, Path(path).read_text()) for url, path in archived] == [
+        (
+            "https://cdn.example.com/0.mp3",
+            '{"url": "https://host0.example.com/0.json"}',
+        ),
+        (
+            "https://cdn.example.com/1.mp3",
+            '{"url": "https://host1.example.com/1.json"}',
+        ),
+    ]
+    # Only the blob store is left, no per-fetch temporary directories.
+    assert {p.name for p in (tmp_path / "chapters").iterdir()} == {
+        Path(path).parent.name for _, path in archived
+    }
+
+
+def test_insert_chapters_is_idempotent(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    chapters = [
+        ("https://cdn.example.com/1.mp3", "guid-1", "pci", 0, "Intro", None, None),
+        ("https://cdn.example.com/1.mp3", "guid-1", "pci", 60, "Main", None, None),
+    ]
+
+    store.insert_chapters(chapters)
+    store.insert_chapters(chapters)
+    store.insert_chapters(
+        [("https://cdn.example.com/1.mp3", "guid-1", "pci", 60, "New", None, None)],
+    )
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT time, content FROM chapters ORDER BY time",
+        ).fetchall()
+        matches = conn.execute(
+            "SELECT rowid FROM chapters_fts WHERE chapters_fts MATCH ?",
+            ["intro OR main OR new"],
+        ).fetchall()
+    assert rows == [(0, "Intro"), (60, "New")]
+    assert len(matches) == 2
+
+
+def test_existing_duplicate_chapters_are_removed_on_open(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    Datastore(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DROP INDEX idx_chapters_enclosureUrl_source_time")
+        conn.execute("PRAGMA user_version = 0")
+        conn.executemany(
+            "INSERT INTO chapters (enclosureUrl, source, time, content) "
+            "VALUES (?, ?, ?, ?)",
+            [("https://cdn.example.com/1.mp3", "pci", 0, "Intro")] * 3,
+        )
+
+    Datastore(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        count = conn.execute("SELECT COUNT(*) FROM chapters").fetchone()[0]
+    assert count == 1
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_backfill_description_chapters(monkeypatch, tmp_path, workers):
+    monkeypatch.setattr(chapters_backfill, "_DESCRIPTION_BATCH_SIZE", 2)
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml", "title": "Feed"},
+        [
+            {
+                "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+                "guid": f"guid-{i}",
+                "description": (
+                    "00:00 Intro\n05:00 Main topic" if i % 2 else "No chapters"
+                ),
+            }
+            for i in range(5)
+        ],
+    )
+
+    chapters_backfill.backfill_chapters_description(store, workers=workers)
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT enclosureUrl, source, time FROM chapters "
+            "ORDER BY enclosureUrl, time",
+        ).fetchall()
+    assert rows == [
+        ("https://cdn.example.com/1.mp3", "description", 0),
+        ("https://cdn.example.com/1.mp3", "description", 300),
+        ("https://cdn.example.com/3.mp3", "description", 0),
+        ("https://cdn.example.com/3.mp3", "description", 300),
+    ]
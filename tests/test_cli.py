@@ -1,3 +1,5 @@
+import sqlite3
+
 from click.testing import CliRunner
 
 from overcast_to_sqlite import cli
@@ -80,6 +82,47 @@ def test_stats_command_empty_db(tmp_path):
     assert "Episodes played:      0" in result.output
 
 
+def test_stats_command_verifies_and_rebuilds(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate_db(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE stats_summary SET episodesPlayed = 0")
+
+    runner = CliRunner()
+    drifted = runner.invoke(cli.cli, ["stats", db_path, "--verify"])
+    rebuilt = runner.invoke(cli.cli, ["stats", db_path, "--rebuild"])
+    verified = runner.invoke(cli.cli, ["stats", db_path, "--verify"])
+
+    assert drifted.exit_code == 1
+    assert "episodesPlayed: stored 0, actual 3" in drifted.output
+    assert "Episodes played:      3" in rebuilt.output
+    assert verified.exit_code == 0
+
+
+def test_stats_command_cache_is_saved_next_to_database(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate_db(db_path)
+
+    runner = CliRunner()
+    first = runner.invoke(cli.cli, ["stats", db_path, "--cache"])
+    second = runner.invoke(cli.cli, ["stats", db_path, "--cache"])
+
+    assert (tmp_path / "test.db-cache.json").is_file()
+    assert first.output == second.output
+
+
+def test_stats_command_verbose_prints_cache_stats(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate_db(db_path)
+
+    runner = CliRunner()
+    first = runner.invoke(cli.cli, ["stats", db_path, "--cache", "--verbose"])
+    second = runner.invoke(cli.cli, ["stats", db_path, "--cache", "--verbose"])
+
+    assert "Query cache: 0 hits" in first.output
+    assert "0 misses, 0 evictions (100% hit rate)" in second.output
+
+
 def test_search_command_no_results(tmp_path):
     db_path = str(tmp_path / "test.db")
     _populate_db(db_path)
@@ -124,7 +167,8 @@ def test_search_command_with_extended_data(tmp_path):
     )
 
     assert result.exit_code == 0
-    assert "Episode 1" in result.output
+    assert '  episode    "Episode 1" -- Tech Podcast' in result.output
+    assert "About [machine] [learning]" in result.output
 
 
 def test_format_duration():
@@ -133,3 +177,29 @@ def test_format_duration():
     assert cli._format_duration(3600) == "1h 0m"  # noqa: SLF001
     assert cli._format_duration(3661) == "1h 1m"  # noqa: SLF001
     assert cli._format_duration(90_000) == "25h 0m"  # noqa: SLF001
+
+
+def test_search_command_substring_needs_index(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate_db(db_path)
+    Datastore(db_path).save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml", "title": "Tech Podcast"},
+        [
+            {
+                "enclosureUrl": "https://cdn.example.com/1.mp3",
+                "feedXmlUrl": "https://example.com/feed.xml",
+                "title": "Episode 1",
+                "description": "About machine learning",
+            },
+        ],
+    )
+    runner = CliRunner()
+
+    missing = runner.invoke(cli.cli, ["search", "-s", "earn", db_path])
+    built = runner.invoke(cli.cli, ["substring-index", db_path])
+    result = runner.invoke(cli.cli, ["search", "-s", "earn", db_path])
+
+    assert missing.exit_code == 2  # noqa: PLR2004
+    assert "substring-index" in missing.output
+    assert built.exit_code == 0
+    assert "About machine l[earn]ing" in result.output
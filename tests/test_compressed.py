@@ -0,0 +1,140 @@
+import sqlite3
+
+from click.testing import CliRunner
+
+from overcast_to_sqlite import cli
+from overcast_to_sqlite.compressed import compress_text, decompress_text
+from overcast_to_sqlite.datastore import Datastore
+
+_HTML = "<p>We talk about {topic} and the history of computing.</p>" * 20
+
+
+def _episode(i: int, topic: str) -> dict:
+    return {
+        "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+        "feedXmlUrl": "https://example.com/feed.xml",
+        "title": f"Episode {i}",
+        "description": _HTML.format(topic=topic),
+        "content:encoded": f"<div>{_HTML.format(topic=topic)}</div>",
+    }
+
+
+def _populate(db_path: str) -> Datastore:
+    store = Datastore(db_path)
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml", "title": "Feed"},
+        [_episode(i, topic) for i, topic in enumerate(["robots", "rockets"])],
+    )
+    store.create_trigram_indexes()
+    return store
+
+
+def _results(store: Datastore) -> list:
+    return [
+        [(hit.kind, hit.rowid, hit.snippet) for hit in page.hits]
+        for page in (
+            store.search("robots"),
+            store.search("computing"),
+            store.search("ocket", substring=True),
+        )
+    ]
+
+
+def _check_indexes(store: Datastore) -> None:
+    for fts in ("episodes_extended_fts", "episodes_extended_trigram"):
+        store.db.execute(f"INSERT INTO {fts} ({fts}) VALUES ('integrity-check');")
+
+
+def test_compress_text_round_trip():
+    text = _HTML.format(topic="robots")
+
+    assert isinstance(compress_text(text), bytes)
+    assert decompress_text(compress_text(text)) == text
+    assert compress_text("short") == "short"
+    assert compress_text(None) is None
+
+
+def test_compressed_columns_keep_readers_working(tmp_path):
+    store = _populate(str(tmp_path / "test.db"))
+    expected = _results(store)
+
+    before, after = store.compress_text_columns()
+
+    assert after < before / 5
+    types = store.db.execute(
+        'SELECT DISTINCT typeof(description), typeof("content:encoded") '
+        "FROM episodes_extended;",
+    ).fetchall()
+    assert types == [("text", "blob")]
+    assert _results(store) == expected
+    _check_indexes(store)
+    batches = list(store.get_description_no_chapters())
+    assert [description for _, _, description in batches[0]] == [
+        _HTML.format(topic="robots"),
+        _HTML.format(topic="rockets"),
+    ]
+
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml"},
+        [_episode(2, "satellites")],
+    )
+    with store.db.conn:
+        store.db.execute("DELETE FROM episodes_extended WHERE rowid = 1;")
+    with store.deferred_fts():
+        store.save_extended_feed_and_episodes(
+            {"xmlUrl": "https://example.com/feed.xml"},
+            [_episode(3, "satellites")],
+        )
+    assert store.db.execute(
+        'SELECT typeof("content:encoded") FROM episodes_extended WHERE rowid = 4;',
+    ).fetchone() == ("blob",)
+    assert [hit.rowid for hit in store.search("satellites").hits] == [3, 4]
+    assert store.search("robots").hits == []
+    _check_indexes(store)
+
+
+def test_other_tools_can_write_compressed_databases(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = _populate(db_path)
+    store.compress_text_columns()
+    store.close()
+
+    # A plain connection has no decompress() function.
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "UPDATE episodes_extended SET description = 'About lasers' "
+            "WHERE rowid = 1;",
+        )
+        hits = conn.execute(
+            "SELECT rowid, snippet(episodes_extended_fts, -1, '[', ']', '', 4) "
+            "FROM episodes_extended_fts WHERE episodes_extended_fts MATCH 'lasers';",
+        ).fetchall()
+    conn.close()
+
+    assert hits == [(1, "About [lasers]")]
+
+
+def test_decompress_restores_plain_text(tmp_path):
+    store = _populate(str(tmp_path / "test.db"))
+    expected = _results(store)
+    store.compress_text_columns()
+
+    before, after = store.decompress_text_columns()
+
+    assert after > before
+    assert store.db.execute(
+        'SELECT DISTINCT typeof("content:encoded") FROM episodes_extended;',
+    ).fetchall() == [("text",)]
+    assert _results(store) == expected
+    _check_indexes(store)
+
+
+def test_compress_text_command(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate(db_path).close()
+
+    result = CliRunner().invoke(cli.cli, ["compress-text", db_path])
+
+    assert result.exit_code == 0, result.output
+    assert "Compressed episode text with zlib" in result.output
+    assert "Run maintain" in result.output
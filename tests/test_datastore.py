@@ -1,7 +1,14 @@
 import sqlite3
+import threading
 
+import pytest
+from sqlite_utils import Database
+
+from overcast_to_sqlite import migrations
 from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.migrations import SCHEMA_VERSION
 from overcast_to_sqlite.models import Episode, Feed, Playlist
+from overcast_to_sqlite.profiles import READ_PROFILE
 
 
 def _make_feed(overcast_id: int = 1, title: str = "Test Feed") -> Feed:
@@ -249,3 +256,242 @@ def test_get_listening_stats_empty_db(tmp_path):
     assert listening_stats["feeds_subscribed"] == 0
     assert listening_stats["feeds_removed"] == 0
     assert listening_stats["episodes_starred"] == 0
+
+
+def test_default_profile_enables_wal(tmp_path):
+    store = Datastore(str(tmp_path / "test.db"))
+
+    assert store.db.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert store.db.execute("PRAGMA synchronous").fetchone() == (1,)
+    assert store.db.execute("PRAGMA busy_timeout").fetchone() == (5000,)
+    store.close()
+    store.close()
+
+
+def test_read_profile_rejects_writes(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    Datastore(db_path).save_feed_and_episodes(_make_feed(), [_make_episode(1)])
+
+    store = Datastore(db_path, READ_PROFILE)
+
+    assert "auto_vacuum" not in dict(READ_PROFILE.pragmas())
+    assert store.get_listening_stats()["episodes_played"] == 1
+    with pytest.raises(sqlite3.OperationalError):
+        store.save_playlist(
+            Playlist(title="Queue", smart=0, sorting="", includePodcastIds=""),
+        )
+
+
+def test_migrations_run_once_and_add_lookup_indexes(monkeypatch, tmp_path):
+    db_path = str(tmp_path / "test.db")
+    Datastore(db_path).close()
+
+    def _no_introspection(*_args: object) -> None:
+        msg = "schema is current, nothing should be inspected"
+        raise AssertionError(msg)
+
+    monkeypatch.setattr(Database, "table_names", _no_introspection)
+    monkeypatch.setattr(Database, "create_view", _no_introspection)
+    store = Datastore(db_path)
+
+    assert store.db.execute("PRAGMA user_version").fetchone() == (SCHEMA_VERSION,)
+    indexes = {
+        row[0]
+        for row in store.db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'",
+        )
+    }
+    assert {
+        "idx_episodes_feedId",
+        "idx_episodes_userUpdatedDate",
+        "idx_episodes_extended_feedXmlUrl",
+    } <= indexes
+
+
+def test_failed_migration_is_rolled_back(monkeypatch, tmp_path):
+    db_path = str(tmp_path / "test.db")
+    initial_schema = migrations.MIGRATIONS[0]
+
+    def _fails_after_initial_schema(db: Database) -> None:
+        initial_schema(db)
+        msg = "migration failed"
+        raise RuntimeError(msg)
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", (_fails_after_initial_schema,))
+    monkeypatch.setattr(migrations, "SCHEMA_VERSION", 1)
+    with pytest.raises(RuntimeError, match="migration failed"):
+        Datastore(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone() == (0,)
+        assert conn.execute("SELECT name FROM sqlite_master").fetchall() == []
+
+
+def test_concurrent_openers_migrate_once(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    ready = threading.Barrier(4)
+    errors: list[Exception] = []
+
+    def _open() -> None:
+        ready.wait()
+        try:
+            Datastore(db_path).close()
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=_open) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone() == (SCHEMA_VERSION,)
+
+
+def test_migration_canonicalizes_stored_enclosure_urls(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    store.save_feed_and_episodes(_make_feed(), [_make_episode(1)])
+    tracked = "http://dts.podtrac.com/redirect.mp3/CDN.example.com/1.mp3"
+    feed_url = "https://example.com/feed-1.xml"
+    extended = {"feedXmlUrl": feed_url, "itunes:image:href": "", "pubDate": ""}
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": feed_url, "title": "Feed", "itunes:image:href": "", "link": ""},
+        [
+            {"enclosureUrl": f"{tracked}?from=rss", "description": "a", **extended},
+            {"enclosureUrl": f"{tracked}?from=web", "description": "b", **extended},
+        ],
+    )
+    store.db.execute(
+        "UPDATE episodes SET enclosureUrl = ?",
+        [f"{tracked}?from=opml"],
+    )
+    store.db.execute("PRAGMA user_version = 3")
+    store.db.conn.commit()
+    store.close()
+
+    store = Datastore(db_path, READ_PROFILE)
+
+    assert store.db.execute(
+        "SELECT enclosureUrl, description FROM episodes_extended",
+    ).fetchall() == [("https://cdn.example.com/1.mp3", "a")]
+    assert store.db.execute("SELECT enclosureUrl FROM episodes").fetchall() == [
+        ("https://cdn.example.com/1.mp3",),
+    ]
+    (episode,) = store.get_recently_played()
+    assert episode["description"] == "a"
+
+
+def test_enclosure_urls_share_one_integer_id(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    store.save_feed_and_episodes(_make_feed(), [_make_episode(1), _make_episode(2)])
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed-1.xml", "title": "Feed"},
+        [{"enclosureUrl": "https://cdn.example.com/2.mp3", "description": "Two"}],
+    )
+    store.insert_chapters(
+        [("https://cdn.example.com/2.mp3", "guid", "pci", 0, "Intro", None, None)],
+    )
+    store.db.execute("UPDATE episodes SET enclosureId = NULL")
+    store.db.execute("PRAGMA user_version = 4")
+    store.db.conn.commit()
+    store.close()
+
+    store = Datastore(db_path)
+
+    ids = {
+        table: store.db.execute(
+            f"SELECT enclosureId FROM {table} "
+            "WHERE enclosureUrl = 'https://cdn.example.com/2.mp3'",
+        ).fetchone()[0]
+        for table in ("episodes", "episodes_extended", "chapters")
+    }
+    assert len(set(ids.values())) == 1
+    assert store.db.execute("SELECT COUNT(*) FROM enclosures").fetchone() == (2,)
+    assert store.get_feeds_to_extend() == [
+        ("Test Feed", "https://example.com/feed-1.xml"),
+    ]
+    indexes = {
+        row[0]
+        for row in store.db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'",
+        )
+    }
+    assert "idx_episodes_enclosureId" in indexes
+    assert "idx_episodes_enclosureUrl" not in indexes
+
+
+def test_rows_saved_without_enclosure_id_are_joined(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    store.save_feed_and_episodes(_make_feed(), [_make_episode(1)])
+    feed_url = "https://example.com/feed-1.xml"
+    extended = {"feedXmlUrl": feed_url, "itunes:image:href": "", "pubDate": ""}
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": feed_url, "title": "Feed", "itunes:image:href": "", "link": ""},
+        [
+            {
+                "enclosureUrl": "https://cdn.example.com/1.mp3",
+                "description": "One",
+                **extended,
+            },
+        ],
+    )
+    store.close()
+    # Another tool adds a played episode without knowing about enclosureId.
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO episodes (overcastId, feedId, title, enclosureUrl, played) "
+            "VALUES (2, 1, 'Episode 2', 'https://cdn.example.com/2.mp3', 1)",
+        )
+        conn.execute(
+            "INSERT INTO episodes_extended (enclosureUrl, feedXmlUrl, description) "
+            "VALUES ('https://cdn.example.com/2.mp3', "
+            "'https://example.com/feed-1.xml', 'Two')",
+        )
+
+    store = Datastore(db_path, READ_PROFILE)
+
+    descriptions = {episode["description"] for episode in store.get_recently_played()}
+    assert "Two" in descriptions
+
+
+def test_listening_stats_follow_updates_and_deletes(tmp_path):
+    store = Datastore(str(tmp_path / "test.db"))
+    store.save_feed_and_episodes(
+        _make_feed(),
+        [_make_episode(1, progress=600), _make_episode(2, played=False, progress=0)],
+    )
+    store.save_feed_and_episodes(
+        _make_feed(2, "Other"),
+        [_make_episode(3, feed_id=2, progress=60, starred=True)],
+    )
+    store.save_feed_and_episodes(
+        _make_feed(),
+        [_make_episode(1, progress=900), _make_episode(2, progress=300)],
+    )
+    store.db.execute("DELETE FROM episodes WHERE overcastId = 3")
+    store.mark_feed_removed_if_missing({1})
+
+    assert store.get_listening_stats() == {
+        "episodes_played": 2,
+        "total_progress_seconds": 1200,
+        "feeds_subscribed": 2,
+        "feeds_removed": 1,
+        "episodes_starred": 0,
+    }
+    assert store.get_top_podcasts_by_time() == [("Test Feed", 1200)]
+    assert store.verify_stats() == []
+
+    store.db.execute("UPDATE feed_stats SET played = 7")
+    store.db.execute("UPDATE stats_summary SET episodesPlayed = 7")
+    assert store.verify_stats() == [
+        "episodesPlayed: stored 7, actual 2",
+        "feed 1 (played, starred, seconds): stored (7, 0, 1200), actual (2, 0, 1200)",
+        "feed 2 (played, starred, seconds): stored (7, 0, 0), actual (0, 0, 0)",
+    ]
+    store.rebuild_stats()
+    assert store.verify_stats() == []
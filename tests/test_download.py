@@ -0,0 +1,182 @@
+import io
+from typing import TYPE_CHECKING
+
+import pytest
+from urllib3.exceptions import ProtocolError
+
+from overcast_to_sqlite.download import (
+    CHUNK_SIZE,
+    download_to_file,
+    partial_path_for,
+)
+from overcast_to_sqlite.exceptions import DownloadError, DownloadTooLargeError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+URL = "https://transcripts.example.com/episode.vtt"
+
+
+def _destination(tmp_path: Path) -> Callable[[object], Path]:
+    return lambda _headers: tmp_path / "feed" / "episode.vtt"
+
+
+def test_download_streams_to_final_path(requests_mock, tmp_path):
+    requests_mock.get(
+        URL,
+        content=b"WEBVTT\n\nhello",
+        headers={"ETag": '"abc"', "Last-Modified": "Thu, 02 Jan 2025 00:00:00 GMT"},
+    )
+    part_path = partial_path_for(tmp_path / "feed", "episode")
+
+    result = download_to_file(
+        URL,
+        part_path,
+        _destination(tmp_path),
+        headers={},
+        max_bytes=1024,
+    )
+
+    assert result.path == tmp_path / "feed" / "episode.vtt"
+    assert result.path.read_bytes() == b"WEBVTT\n\nhello"
+    assert result.etag == '"abc"'
+    assert result.last_modified == "Thu, 02 Jan 2025 00:00:00 GMT"
+    assert not part_path.exists()
+    assert list((tmp_path / "feed").iterdir()) == [result.path]
+
+
+def test_download_resumes_partial_file(requests_mock, tmp_path):
+    part_path = partial_path_for(tmp_path / "feed", "episode")
+    part_path.write_bytes(b"WEBVTT\n\n")
+    part_path.with_name(part_path.name + ".validator").write_text('"abc"')
+    requests_mock.get(
+        URL,
+        content=b"hello",
+        status_code=206,
+        headers={"Content-Range": "bytes 8-12/13"},
+    )
+
+    result = download_to_file(
+        URL,
+        part_path,
+        _destination(tmp_path),
+        headers={},
+        max_bytes=1024,
+    )
+
+    assert requests_mock.last_request.headers["Range"] == "bytes=8-"
+    assert requests_mock.last_request.headers["If-Range"] == '"abc"'
+    assert result.path is not None
+    assert result.path.read_bytes() == b"WEBVTT\n\nhello"
+
+
+def test_download_restarts_when_range_is_ignored(requests_mock, tmp_path):
+    part_path = partial_path_for(tmp_path / "feed", "episode")
+    part_path.write_bytes(b"WEBVTT\n\n")
+    part_path.with_name(part_path.name + ".validator").write_text('"abc"')
+    requests_mock.get(
+        URL,
+        [
+            {
+                "content": b"WEBVTT\n\nhello",
+                "status_code": 206,
+                "headers": {"Content-Range": "bytes 0-12/13"},
+            },
+            {"content": b"WEBVTT\n\nhello"},
+        ],
+    )
+
+    result = download_to_file(
+        URL,
+        part_path,
+        _destination(tmp_path),
+        headers={},
+        max_bytes=1024,
+    )
+
+    assert requests_mock.call_count == 2
+    assert "Range" not in requests_mock.last_request.headers
+    assert result.path is not None
+    assert result.path.read_bytes() == b"WEBVTT\n\nhello"
+
+
+def test_download_enforces_size_cap(requests_mock, tmp_path):
+    requests_mock.get(URL, content=b"x" * 2048)
+    part_path = partial_path_for(tmp_path / "feed", "episode")
+
+    with pytest.raises(DownloadTooLargeError):
+        download_to_file(
+            URL,
+            part_path,
+            _destination(tmp_path),
+            headers={},
+            max_bytes=1024,
+        )
+
+    assert list((tmp_path / "feed").iterdir()) == []
+
+
+def test_download_conditional_request_not_modified(requests_mock, tmp_path):
+    requests_mock.get(URL, status_code=304)
+
+    result = download_to_file(
+        URL,
+        partial_path_for(tmp_path / "feed", "episode"),
+        _destination(tmp_path),
+        headers={},
+        max_bytes=1024,
+        etag='"abc"',
+    )
+
+    assert requests_mock.last_request.headers["If-None-Match"] == '"abc"'
+    assert result.path is None
+
+
+class _TruncatedBody(io.BytesIO):
+    """A body whose connection drops after the bytes it was given."""
+
+    def read(self, size: int | None = -1) -> bytes:
+        if chunk := super().read(size):
+            return chunk
+        msg = "Connection broken: IncompleteRead"
+        raise ProtocolError(msg)
+
+
+def test_download_wraps_dropped_connection_and_keeps_partial(
+    requests_mock,
+    tmp_path,
+):
+    requests_mock.get(
+        URL,
+        body=_TruncatedBody(b"x" * CHUNK_SIZE),
+        headers={"ETag": '"abc"', "Content-Length": str(CHUNK_SIZE + 5)},
+    )
+    part_path = partial_path_for(tmp_path / "feed", "episode")
+
+    with pytest.raises(DownloadError, match="IncompleteRead"):
+        download_to_file(
+            URL,
+            part_path,
+            _destination(tmp_path),
+            headers={},
+            max_bytes=2 * CHUNK_SIZE,
+        )
+
+    assert part_path.stat().st_size == CHUNK_SIZE
+    requests_mock.get(
+        URL,
+        content=b"hello",
+        status_code=206,
+        headers={"Content-Range": f"bytes {CHUNK_SIZE}-{CHUNK_SIZE + 4}/*"},
+    )
+    result = download_to_file(
+        URL,
+        part_path,
+        _destination(tmp_path),
+        headers={},
+        max_bytes=2 * CHUNK_SIZE,
+    )
+    assert requests_mock.last_request.headers["Range"] == f"bytes={CHUNK_SIZE}-"
+    assert result.path is not None
+    assert result.path.read_bytes() == b"x" * CHUNK_SIZE + b"hello"
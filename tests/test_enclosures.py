@@ -0,0 +1,147 @@
+import hashlib
+import sqlite3
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from overcast_to_sqlite import cli
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.enclosures import _Quota, parse_size
+from overcast_to_sqlite.models import Episode, Feed
+
+
+def _enclosure_url(overcast_id: int) -> str:
+    return f"https://cdn{overcast_id}.example.com/{overcast_id}.mp3"
+
+
+def _save_episodes(db_path: str, *episodes: tuple[int, int, bool]) -> None:
+    """Save (overcastId, feedId, starred) episodes, newer ids updated later."""
+    store = Datastore(db_path)
+    for feed_id in {feed_id for _, feed_id, _ in episodes}:
+        store.save_feed_and_episodes(
+            Feed(
+                overcastId=feed_id,
+                title=f"Feed {feed_id}",
+                subscribed=True,
+                notifications=False,
+                xmlUrl=f"https://example.com/feed-{feed_id}.xml",
+                htmlUrl=f"https://example.com/{feed_id}",
+            ),
+            [
+                Episode(
+                    overcastId=overcast_id,
+                    feedId=feed_id,
+                    title=f"Episode {overcast_id}",
+                    url=f"https://example.com/{overcast_id}",
+                    overcastUrl=f"https://overcast.fm/+{overcast_id}",
+                    played=False,
+                    userDeleted=False,
+                    enclosureUrl=_enclosure_url(overcast_id),
+                    progress=0,
+                    userUpdatedDate=f"2025-01-{overcast_id:02}T00:00:00+00:00",
+                    userRecommendedDate="2025-02-01T00:00:00+00:00"
+                    if starred
+                    else None,
+                )
+                for overcast_id, episode_feed_id, starred in episodes
+                if episode_feed_id == feed_id
+            ],
+        )
+
+
+def _archived(db_path: str) -> list[tuple[int, str, int, str]]:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT overcastId, enclosureDownloadPath, enclosureSize, enclosureSha256 "
+            "FROM episodes WHERE enclosureDownloadPath IS NOT NULL "
+            "ORDER BY overcastId",
+        ).fetchall()
+
+
+def test_enclosures_archives_selected_episodes(requests_mock, tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _save_episodes(db_path, (1, 1, True), (2, 1, False), (3, 2, True))
+    for i in range(1, 4):
+        requests_mock.get(
+            _enclosure_url(i),
+            content=f"audio {i}".encode(),
+            headers={"Content-Type": "audio/mpeg"},
+        )
+
+    result = CliRunner().invoke(
+        cli.cli,
+        ["enclosures", db_path, "--feed", "feed 1"],
+        catch_exceptions=False,
+    )
+
+    assert "Downloaded 1 episodes" in result.output
+    ((overcast_id, path, size, sha256),) = _archived(db_path)
+    assert (overcast_id, size) == (1, len(b"audio 1"))
+    assert sha256 == hashlib.sha256(b"audio 1").hexdigest()
+    assert Path(path).read_bytes() == b"audio 1"
+    assert Path(path).parent.parent == tmp_path / "archive" / "enclosures"
+
+    verify = CliRunner().invoke(cli.cli, ["verify", db_path])
+    assert "Verified 1 archived files" in verify.output
+
+
+def test_enclosures_download_from_source_url(requests_mock, tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _save_episodes(db_path, (1, 1, True))
+    # Only the tracked http URL with its query serves the audio.
+    source_url = f"http://dts.podtrac.com/redirect.mp3/{_enclosure_url(1)[8:]}?t=1"
+    store = Datastore(db_path)
+    store.db.execute(
+        "UPDATE episodes SET enclosureSourceUrl = ? WHERE overcastId = 1",
+        [source_url],
+    )
+    store.db.conn.commit()
+    requests_mock.get(source_url, content=b"audio 1")
+
+    result = CliRunner().invoke(cli.cli, ["enclosures", db_path])
+
+    assert "Downloaded 1 episodes" in result.output
+    assert requests_mock.last_request.url == source_url
+    ((overcast_id, _, size, _),) = _archived(db_path)
+    assert (overcast_id, size) == (1, len(b"audio 1"))
+
+
+def test_quota_reserves_before_download(tmp_path):
+    store = Datastore(str(tmp_path / "test.db"))
+    quota = _Quota(store, 1000)
+
+    assert quota.reserve(_enclosure_url(1), 600, "2025-01-01")
+    # A second download running at the same time must not overshoot.
+    assert not quota.reserve(_enclosure_url(2), 600, "2025-01-02")
+    quota.release(_enclosure_url(1))
+    assert quota.reserve(_enclosure_url(2), 600, "2025-01-02")
+
+
+def test_enclosures_quota_evicts_least_recently_used(requests_mock, tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _save_episodes(db_path, (1, 1, True), (2, 1, True))
+    for i in range(1, 4):
+        requests_mock.get(_enclosure_url(i), content=bytes([i]) * 600)
+    command = ["enclosures", db_path, "--quota", "1000B"]
+
+    result = CliRunner().invoke(cli.cli, command, catch_exceptions=False)
+
+    # Only one fits, and episode 2 was used more recently.
+    assert result.exit_code == 0
+    assert [row[0] for row in _archived(db_path)] == [2]
+    evicted_path = Path(_archived(db_path)[0][1])
+
+    _save_episodes(db_path, (3, 1, True))
+    CliRunner().invoke(cli.cli, command, catch_exceptions=False)
+
+    assert [row[0] for row in _archived(db_path)] == [3]
+    assert not evicted_path.exists()
+
+
+@pytest.mark.parametrize(
+    ("size", "expected"),
+    [("1000", 1000), ("500M", 500 * 1024**2), ("1.5GB", int(1.5 * 1024**3))],
+)
+def test_parse_size(size, expected):
+    assert parse_size(size) == expected
@@ -0,0 +1,135 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from overcast_to_sqlite import cli
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.episode_query import EpisodeFilter
+from overcast_to_sqlite.models import Episode, Feed
+
+
+def _store(tmp_path, count: int = 12) -> Datastore:
+    store = Datastore(str(tmp_path / "test.db"))
+    for feed_id in (1, 2):
+        feed = Feed(
+            overcastId=feed_id,
+            title=f"Feed {feed_id}",
+            subscribed=True,
+            notifications=False,
+            xmlUrl=f"https://example.com/{feed_id}.xml",
+            htmlUrl="https://example.com",
+        )
+        episodes = [
+            Episode(
+                overcastId=i,
+                feedId=feed_id,
+                title=f"Episode {i}",
+                url=f"https://example.com/{i}",
+                overcastUrl=f"https://overcast.fm/+{i}",
+                played=i % 2 == 0,
+                userDeleted=False,
+                enclosureUrl=f"https://cdn.example.com/{i}.mp3",
+                progress=0,
+                # Pairs share a date, and the last two have none.
+                userUpdatedDate=f"2025-01-{i // 2 + 10}" if i < count - 2 else None,
+                userRecommendedDate="2025-02-01" if i % 3 == 0 else None,
+            )
+            for i in range(count)
+            if i % 2 == feed_id - 1
+        ]
+        store.save_feed_and_episodes(feed, episodes)
+    return store
+
+
+def test_pages_follow_one_ordered_query(tmp_path):
+    store = _store(tmp_path)
+    expected = [
+        overcast_id
+        for (overcast_id,) in store.db.execute(
+            "SELECT overcastId FROM episodes "
+            "ORDER BY userUpdatedDate DESC, rowid DESC;",
+        ).fetchall()
+    ]
+
+    paged, after = [], None
+    while True:
+        page = store.episode_page(("overcastId",), after=after, limit=5)
+        paged += [episode["overcastId"] for episode in page.episodes]
+        if page.next_cursor is None:
+            break
+        after = page.next_cursor
+
+    streamed = store.iter_episodes(("overcastId",), page_size=5)
+    assert next(streamed) == {"overcastId": expected[0]}
+    assert paged == expected
+    assert [e["overcastId"] for e in streamed] == expected[1:]
+    # The episodes without a date come last.
+    assert expected[-2:] == [11, 10]
+
+
+def test_filters_narrow_the_episodes(tmp_path):
+    store = _store(tmp_path)
+
+    def ids(**filters: object) -> list[int]:
+        return sorted(
+            e["overcastId"]
+            for e in store.iter_episodes(
+                ("overcastId",),
+                EpisodeFilter(**filters),
+                page_size=2,
+            )
+        )
+
+    assert ids(feed_id=2) == [1, 3, 5, 7, 9, 11]
+    assert ids(since="2025-01-12", until="2025-01-14") == [4, 5, 6, 7]
+    assert ids(starred=True, played=False) == [3, 9]
+    assert ids(starred=False, feed_id=1) == [2, 4, 8, 10]
+
+    page = store.episode_page(
+        ("title", "feedTitle", "starred"),
+        EpisodeFilter(feed_id=1, until="2025-01-12"),
+    )
+    assert page.episodes == [
+        {"title": "Episode 2", "feedTitle": "Feed 1", "starred": 0},
+        {"title": "Episode 0", "feedTitle": "Feed 1", "starred": 1},
+    ]
+    assert page.next_cursor is None
+
+
+def test_unknown_fields_and_bad_cursors_raise(tmp_path):
+    store = _store(tmp_path)
+
+    with pytest.raises(ValueError, match="Unknown episode fields: secret"):
+        store.episode_page(("title", "secret"))
+    with pytest.raises(ValueError, match="Invalid episode cursor"):
+        store.episode_page(after="not-a-cursor")
+
+
+def test_episodes_command_prints_json_lines_and_cursor(tmp_path):
+    _store(tmp_path).close()
+    db_path = str(tmp_path / "test.db")
+    runner = CliRunner()
+
+    first = runner.invoke(
+        cli.cli,
+        ["episodes", db_path, "-f", "overcastId,starred", "--starred", "-l", "2"],
+    )
+    cursor = first.stderr.split("--after=")[1].strip()
+    rest = runner.invoke(
+        cli.cli,
+        ["episodes", db_path, "-f", "overcastId", "--starred", "--after", cursor],
+    )
+    bad = runner.invoke(cli.cli, ["episodes", db_path, "-f", "title,secret"])
+
+    assert first.exit_code == 0, first.output
+    assert [json.loads(line) for line in first.stdout.splitlines()] == [
+        {"overcastId": 9, "starred": 1},
+        {"overcastId": 6, "starred": 1},
+    ]
+    assert [json.loads(line) for line in rest.stdout.splitlines()] == [
+        {"overcastId": 3},
+        {"overcastId": 0},
+    ]
+    assert bad.exit_code == 2  # noqa: PLR2004
+    assert "Unknown fields: secret" in bad.output
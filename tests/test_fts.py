@@ -0,0 +1,92 @@
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.fts import fts_triggers_suspended, suspend_fts_triggers
+from overcast_to_sqlite.profiles import READ_PROFILE
+
+
+def _episode(i: int, title: str) -> dict:
+    return {
+        "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+        "feedXmlUrl": "https://example.com/feed.xml",
+        "title": title,
+        "description": f"Episode number {i}",
+    }
+
+
+def _load(store: Datastore) -> None:
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml", "title": "Feed"},
+        [_episode(0, "Old robots")],
+    )
+    with store.db.conn:
+        store.db.execute(
+            "UPDATE episodes_extended SET title = 'Old androids' "
+            "WHERE enclosureUrl = 'https://cdn.example.com/0.mp3';",
+        )
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml"},
+        [_episode(i, f"New robots {i}") for i in range(1, 4)],
+    )
+    with store.db.conn:
+        store.db.execute(
+            "UPDATE episodes_extended SET title = 'New androids' "
+            "WHERE enclosureUrl = 'https://cdn.example.com/1.mp3';",
+        )
+        store.db.execute(
+            "DELETE FROM episodes_extended "
+            "WHERE enclosureUrl = 'https://cdn.example.com/2.mp3';",
+        )
+    store.insert_chapters(
+        [
+            (f"https://cdn.example.com/{i}.mp3", "g", "psc", 0, "Robots", None, None)
+            for i in (1, 3)
+        ],
+    )
+
+
+def _results(store: Datastore) -> list:
+    return [
+        [(hit.kind, hit.rowid, hit.snippet) for hit in store.search(query).hits]
+        for query in ("robots", "androids", "number")
+    ]
+
+
+def test_deferred_fts_indexes_the_same_rows(tmp_path):
+    immediate = Datastore(str(tmp_path / "immediate.db"))
+    _load(immediate)
+    deferred = Datastore(str(tmp_path / "deferred.db"))
+    deferred.create_trigram_indexes()
+
+    with deferred.deferred_fts():
+        with deferred.deferred_fts():
+            _load(deferred)
+        assert fts_triggers_suspended(deferred.db)
+        assert deferred.search("robots").hits == []
+
+    assert not fts_triggers_suspended(deferred.db)
+    assert _results(deferred) == _results(immediate)
+    assert len(deferred.search("droid", substring=True).hits) == 2  # noqa: PLR2004
+    for fts in ("episodes_extended_fts", "chapters_fts", "episodes_extended_trigram"):
+        deferred.db.execute(f"INSERT INTO {fts} ({fts}) VALUES ('integrity-check');")
+    triggers = deferred.db.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'episodes_extended_ai';",
+    ).fetchone()
+    assert "fts_pending" not in triggers[0]
+
+
+def test_interrupted_bulk_load_is_indexed_on_next_open(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    suspend_fts_triggers(store.db)
+    _load(store)
+    store.close()
+
+    reader = Datastore(db_path, READ_PROFILE)
+    assert fts_triggers_suspended(reader.db)
+    reader.close()
+
+    store = Datastore(db_path)
+    assert not fts_triggers_suspended(store.db)
+    assert [hit.title for hit in store.search("androids").hits] == [
+        "Old androids",
+        "New androids",
+    ]
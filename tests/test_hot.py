@@ -0,0 +1,134 @@
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.hot import sync_hot_table
+from overcast_to_sqlite.migrations import SCHEMA_VERSION
+from overcast_to_sqlite.models import Episode, Feed
+
+_FEED_URL = "https://example.com/feed.xml"
+
+
+def _episode(i: int, **extra: str) -> dict:
+    return {
+        "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+        "feedXmlUrl": _FEED_URL,
+        "title": f"Episode {i}",
+        "pubDate": f"2025-01-0{i + 1}",
+        "description": f"<p>Show notes for episode {i}</p>" * 50,
+        **extra,
+    }
+
+
+def _hot_rows(store: Datastore) -> list[tuple]:
+    return store.db.execute(
+        "SELECT id, enclosureUrl, title FROM episodes_extended_hot ORDER BY id;",
+    ).fetchall()
+
+
+def _cold_rows(store: Datastore) -> list[tuple]:
+    return store.db.execute(
+        "SELECT rowid, enclosureUrl, title FROM episodes_extended ORDER BY rowid;",
+    ).fetchall()
+
+
+def test_hot_table_follows_episodes_extended(tmp_path):
+    store = Datastore(str(tmp_path / "test.db"))
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": _FEED_URL, "title": "Feed"},
+        [_episode(0), _episode(1), _episode(2)],
+    )
+    with store.db.conn:
+        store.db.execute(
+            "UPDATE episodes_extended SET title = 'Renamed' WHERE rowid = 1",
+        )
+        store.db.execute("DELETE FROM episodes_extended WHERE rowid = 2")
+
+    assert _hot_rows(store) == _cold_rows(store)
+    assert "description" not in store.db["episodes_extended_hot"].columns_dict
+
+    # A feed gaining chapter tags adds a column the triggers must copy.
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": _FEED_URL},
+        [
+            _episode(
+                3,
+                **{
+                    "podcast:transcript:url": "https://example.com/3.vtt",
+                    "podcast:chapters:url": "https://example.com/3.json",
+                },
+            ),
+        ],
+    )
+    assert store.db.execute(
+        'SELECT id, "podcast:chapters:url" FROM episodes_extended_hot '
+        'WHERE "podcast:chapters:url" IS NOT NULL;',
+    ).fetchall() == [(4, "https://example.com/3.json")]
+    assert not sync_hot_table(store.db)
+    assert [t for t, *_ in store.transcripts_to_download(starred_only=False)] == [
+        "Episode 3",
+    ]
+    store.update_transcript_download_paths(
+        [("https://cdn.example.com/3.mp3", "3.vtt", None, None)],
+    )
+    assert list(store.transcripts_to_download(starred_only=False)) == []
+    assert store.transcripts_to_ingest() == ["3.vtt"]
+
+
+def test_migration_fills_hot_table_and_keeps_views(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": _FEED_URL, "title": "Feed"},
+        [_episode(0), _episode(1)],
+    )
+    with store.db.conn:
+        for suffix in ("ai", "ad", "au"):
+            store.db.execute(f"DROP TRIGGER episodes_extended_hot_{suffix};")
+        store.db.execute("DROP TABLE episodes_extended_hot;")
+    store.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION - 1};")
+    store.close()
+
+    store = Datastore(db_path)
+
+    assert _hot_rows(store) == _cold_rows(store)
+    for view in ("episodes_played", "episodes_deleted", "episodes_starred"):
+        store.db.execute(f"SELECT * FROM {view};").fetchall()
+
+
+def test_episode_pages_fetch_descriptions_from_cold_table(tmp_path):
+    store = Datastore(str(tmp_path / "test.db"))
+    feed = Feed(
+        overcastId=1,
+        title="Feed",
+        subscribed=True,
+        notifications=False,
+        xmlUrl=_FEED_URL,
+        htmlUrl="https://example.com",
+    )
+    episodes = [
+        Episode(
+            overcastId=i,
+            feedId=1,
+            title=f"Episode {i}",
+            url=f"https://example.com/{i}",
+            overcastUrl=f"https://overcast.fm/+{i}",
+            played=True,
+            userDeleted=False,
+            enclosureUrl=f"https://cdn.example.com/{i}.mp3",
+            progress=3600,
+            userUpdatedDate=f"2025-01-0{i + 1}T00:00:00+00:00",
+        )
+        for i in range(2)
+    ]
+    store.save_feed_and_episodes(feed, episodes)
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": _FEED_URL, "title": "Feed", "itunes:image:href": "", "link": ""},
+        [_episode(0), {**_episode(1), "description": None}],
+    )
+    store.compress_text_columns()
+
+    played = store.get_recently_played()
+
+    assert [(e["episode_title"], e["description"]) for e in played] == [
+        ("Episode 1", "No description"),
+        ("Episode 0", _episode(0)["description"]),
+    ]
+    assert all("episodeRowid" not in episode for episode in played)
@@ -11,7 +11,7 @@ def test_generate_html_played_renders_starred_prefix_for_integer_values(
     html_output_path = tmp_path / "played.html"
 
     class _FakeDatastore:
-        def __init__(self, _db_path: str) -> None:
+        def __init__(self, _db_path: str, _profile: object) -> None:
             pass
 
         def get_recently_played(self) -> list[dict[str, object]]:
@@ -56,7 +56,7 @@ def test_generate_html_deleted_hides_starred_prefix_when_disabled(
     html_output_path = tmp_path / "deleted.html"
 
     class _FakeDatastore:
-        def __init__(self, _db_path: str) -> None:
+        def __init__(self, _db_path: str, _profile: object) -> None:
             pass
 
         def get_deleted_episodes(self) -> list[dict[str, object]]:
@@ -112,8 +112,9 @@ def test_html_command_creates_output_directory(monkeypatch, tmp_path):
 
     assert result.exit_code == 0
     assert output_dir.is_dir()
-    assert calls == [
+    # The pages are built concurrently, so they may finish in any order.
+    assert sorted(calls) == [
+        ("deleted", output_dir / "overcast-deleted.html"),
         ("played", output_dir / "overcast-played.html"),
         ("starred", output_dir / "overcast-starred.html"),
-        ("deleted", output_dir / "overcast-deleted.html"),
     ]
@@ -0,0 +1,107 @@
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+
+import pytest
+from click.testing import CliRunner
+
+from overcast_to_sqlite import cli
+from overcast_to_sqlite.exceptions import RunInProgressError
+from overcast_to_sqlite.locking import lock_path_for, retry_busy, run_lock
+
+_RUN = {"command": "cli save", "pid": 4242, "started": "2025-01-01T00:00:00+00:00"}
+
+
+def _hold_lock(db_path: str) -> int:
+    """Take the run lock as another process would, through its own descriptor."""
+    fd = os.open(lock_path_for(db_path), os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    os.write(fd, json.dumps(_RUN).encode())
+    return fd
+
+
+def test_run_lock_reports_holder_and_previous_crash(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    fd = _hold_lock(db_path)
+
+    with pytest.raises(RunInProgressError) as excinfo, run_lock(db_path, "extend"):
+        pass
+    assert excinfo.value.holder.pid == _RUN["pid"]
+
+    # Closing without emptying the file is what a crashed run leaves behind.
+    os.close(fd)
+    with run_lock(db_path, "extend") as previous:
+        assert previous.command == "cli save"
+        with run_lock(db_path, "save") as nested:
+            assert nested is None
+    with run_lock(db_path, "extend") as previous:
+        assert previous is None
+
+
+def test_locked_command_skips_or_fails_while_another_run_holds_lock(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    opml = tmp_path / "overcast.opml"
+    opml.write_text("<opml><body></body></opml>")
+    fd = _hold_lock(db_path)
+    runner = CliRunner()
+
+    skipped = runner.invoke(cli.cli, ["save", db_path, "--load", str(opml)])
+    waited = runner.invoke(
+        cli.cli,
+        ["save", db_path, "--load", str(opml), "--wait", "0.1"],
+    )
+    os.close(fd)
+    saved = runner.invoke(cli.cli, ["save", db_path, "--load", str(opml)])
+
+    assert skipped.exit_code == 0, skipped.output
+    assert "Skipping, cli save (pid 4242" in skipped.output
+    assert waited.exit_code == 1
+    assert "is already writing to" in waited.output
+    assert saved.exit_code == 0, saved.output
+    assert "did not finish cleanly" in saved.output
+
+
+def test_maintenance_commands_take_lock_only_when_writing(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    runner = CliRunner()
+    runner.invoke(cli.cli, ["stats", db_path], catch_exceptions=False)
+    fd = _hold_lock(db_path)
+
+    maintained = runner.invoke(cli.cli, ["maintain", db_path])
+    rebuilt = runner.invoke(cli.cli, ["stats", db_path, "--rebuild", "--wait", "0"])
+    shown = runner.invoke(cli.cli, ["stats", db_path])
+    pruned = runner.invoke(
+        cli.cli,
+        ["verify", db_path, "--prune", "--wait", "0.1"],
+    )
+    os.close(fd)
+
+    assert maintained.exit_code == 0, maintained.output
+    assert "Skipping, cli save (pid 4242" in maintained.output
+    assert "Reclaimed" not in maintained.output
+    assert "Skipping" in rebuilt.output
+    assert shown.exit_code == 0, shown.output
+    assert "Listening Statistics" in shown.output
+    assert pruned.exit_code == 1
+    assert "is already writing to" in pruned.output
+
+
+def test_retry_busy_waits_out_another_writer(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    writer = sqlite3.connect(db_path, check_same_thread=False)
+    writer.execute("CREATE TABLE t (x);")
+    writer.commit()
+    writer.execute("BEGIN IMMEDIATE;")
+    connection = sqlite3.connect(db_path, timeout=0)
+    threading.Timer(0.3, writer.commit).start()
+
+    def insert() -> int:
+        with connection:
+            return connection.execute("INSERT INTO t VALUES (1);").rowcount
+
+    assert retry_busy(connection, insert) == 1
+    writer.execute("BEGIN IMMEDIATE;")
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        retry_busy(connection, insert, retries=0)
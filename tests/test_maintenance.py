@@ -0,0 +1,89 @@
+import sqlite3
+
+from click.testing import CliRunner
+
+from overcast_to_sqlite import cli
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.maintenance import maintain
+
+
+def _populate(store: Datastore, count: int = 300) -> None:
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml", "title": "Feed"},
+        [
+            {
+                "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+                "feedXmlUrl": "https://example.com/feed.xml",
+                "title": f"Episode {i}",
+                "description": "robots " * 200,
+            }
+            for i in range(count)
+        ],
+    )
+
+
+def _delete_episodes(store: Datastore) -> None:
+    with store.db.conn:
+        store.db.execute("DELETE FROM episodes_extended;")
+
+
+def test_maintain_reclaims_free_pages(tmp_path):
+    store = Datastore(str(tmp_path / "test.db"))
+    assert store.db.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2  # noqa: PLR2004
+    _populate(store)
+    _delete_episodes(store)
+    assert store.db.execute("PRAGMA freelist_count;").fetchone()[0] > 0
+
+    steps = {step.name: step for step in maintain(store)}
+
+    assert list(steps) == ["integrity", "fts", "analyze", "vacuum", "checkpoint"]
+    assert steps["integrity"].problems == []
+    assert steps["vacuum"].reclaimed_bytes > 0
+    assert store.db.execute("PRAGMA freelist_count;").fetchone()[0] == 0
+    assert store.search("robots").hits == []
+
+
+def test_maintain_full_enables_incremental_vacuum(tmp_path):
+    db_path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA auto_vacuum = NONE;")
+    conn.execute("CREATE TABLE placeholder (id INTEGER);")
+    conn.close()
+    store = Datastore(str(db_path))
+    _populate(store)
+    _delete_episodes(store)
+
+    vacuum = next(step for step in maintain(store) if step.name == "vacuum")
+    assert "not enabled" in vacuum.detail
+    assert vacuum.reclaimed_bytes == 0
+
+    target = tmp_path / "copy.db"
+    steps = maintain(store, full=True, vacuum_target=target)
+    vacuum = next(step for step in steps if step.name == "vacuum")
+    assert vacuum.reclaimed_bytes > 0
+    assert store.db.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2  # noqa: PLR2004
+    assert steps[-1].name == "vacuum into"
+    copy = sqlite3.connect(target)
+    assert copy.execute("PRAGMA integrity_check;").fetchone() == ("ok",)
+    copy.close()
+
+
+def test_maintain_command(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    _populate(store)
+    _delete_episodes(store)
+    store.close()
+    target = tmp_path / "copy.db"
+    target.touch()
+
+    runner = CliRunner()
+    result = runner.invoke(cli.cli, ["maintain", db_path, "--vacuum-pages", "10"])
+    exists = runner.invoke(cli.cli, ["maintain", db_path, "--vacuum-into", target])
+
+    assert result.exit_code == 0, result.output
+    assert "  integrity " in result.output
+    assert "free pages left" in result.output
+    assert "✅Reclaimed" in result.output
+    assert exists.exit_code == 2  # noqa: PLR2004
+    assert "already exists" in exists.output
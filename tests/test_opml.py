@@ -1,11 +1,14 @@
 import textwrap
 from xml.etree import ElementTree
 
+import pytest
+
 from overcast_to_sqlite.models import Episode, Feed, Playlist
 from overcast_to_sqlite.overcast import (
     extract_feed_and_episodes_from_opml,
     extract_playlists_from_opml,
 )
+from overcast_to_sqlite.utils import _canonical_enclosure_url
 
 SAMPLE_OPML = textwrap.dedent(
     """\
@@ -138,6 +141,24 @@ def test_episode_enclosure_url_strips_query_params():
 
     _, episodes = feeds[0]
     assert episodes[0].enclosureUrl == "https://cdn.example.com/episode-1.mp3"
+    assert (
+        episodes[0].enclosureSourceUrl
+        == "https://cdn.example.com/episode-1.mp3?source=feed"
+    )
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://cdn.example.com/ep.mp3",
+        "HTTP://CDN.Example.com:443/ep.mp3?utm_source=x#t=30",
+        "https://dts.podtrac.com/redirect.mp3/cdn.example.com/ep.mp3",
+        "https://chtbl.com/track/A1B2/op3.dev/e,pg=abc/https://cdn.example.com/ep.mp3",
+        "http://pdst.fm/e/www.podtrac.com/pts/redirect.mp3/cdn.example.com/ep.mp3",
+    ],
+)
+def test_canonical_enclosure_url(url):
+    assert _canonical_enclosure_url(url) == "https://cdn.example.com/ep.mp3"
 
 
 def test_episode_boolean_conversion():
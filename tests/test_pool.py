@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+
+import pytest
+
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.exceptions import SchemaOutdatedError
+from overcast_to_sqlite.migrations import SCHEMA_VERSION
+from overcast_to_sqlite.pool import ReadPool
+
+
+def _write(store: Datastore) -> None:
+    store.db.execute("CREATE TABLE scratch (x);")
+
+
+def test_pool_runs_reads_at_once_on_read_only_connections(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    Datastore(db_path).close()
+    barrier = threading.Barrier(3, timeout=5)
+
+    def read(store: Datastore) -> int:
+        # Every call must be running before any can get past the barrier.
+        barrier.wait()
+        return store.get_listening_stats()["episodes_played"]
+
+    with ReadPool(db_path, size=3) as pool:
+        assert pool.map([read, read, read]) == [0, 0, 0]
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            pool.map([_write])
+
+
+def test_pool_migrates_once_before_opening_read_only(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    store.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION - 1};")
+    store.close()
+
+    with pytest.raises(SchemaOutdatedError):
+        Datastore(db_path, read_only=True)
+    with ReadPool(db_path, size=2) as pool:
+        versions = pool.map(
+            [lambda s: s.db.execute("PRAGMA user_version;").fetchone()[0]] * 2,
+        )
+
+    assert versions == [SCHEMA_VERSION, SCHEMA_VERSION]
+    with ReadPool(str(tmp_path / "new.db"), size=1) as pool:
+        assert pool.map([Datastore.get_top_podcasts_by_time]) == [[]]
+
+
+def test_pool_backfills_enclosure_ids_before_opening_read_only(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    Datastore(db_path).close()
+    # Another tool saves an episode without an enclosure id.
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO episodes (overcastId, enclosureUrl, title) "
+            "VALUES (1, 'https://example.com/1.mp3', 'Episode 1');",
+        )
+    conn.close()
+
+    with pytest.raises(SchemaOutdatedError):
+        Datastore(db_path, read_only=True)
+    with ReadPool(db_path, size=1) as pool:
+        ids = pool.map(
+            [lambda s: s.db.execute("SELECT enclosureId FROM episodes;").fetchall()],
+        )
+
+    assert ids == [[(1,)]]
@@ -0,0 +1,185 @@
+import pytest
+
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.exceptions import SearchQueryError
+from overcast_to_sqlite.search import fts_query
+
+
+def _populate(db_path: str) -> Datastore:
+    store = Datastore(db_path)
+    store.save_extended_feed_and_episodes(
+        {
+            "xmlUrl": "https://example.com/feed.xml",
+            "title": "Tech Podcast",
+            "description": "Robots, compilers and other machines",
+        },
+        [
+            {
+                "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+                "feedXmlUrl": "https://example.com/feed.xml",
+                "title": title,
+                "description": description,
+            }
+            for i, (title, description) in enumerate(
+                [
+                    ("Robots at work", "A chat about automation"),
+                    ("Weekly roundup", "News, plus a long segment on robots"),
+                    ("Compilers", "Parsing and code generation"),
+                ],
+            )
+        ],
+    )
+    store.insert_chapters(
+        [
+            (
+                "https://cdn.example.com/2.mp3",
+                "guid-2",
+                "chapters",
+                95,
+                "Robots writing compilers",
+                None,
+                None,
+            ),
+        ],
+    )
+    return store
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("machine learning", '"machine" "learning"'),
+        ('say "hi"', '"say" """hi"""'),
+        ("AND OR NOT", '"AND" "OR" "NOT"'),
+        ("title:robots", '"title:robots"'),
+        ("robo*", '"robo"*'),
+        ("  * ", ""),
+    ],
+)
+def test_fts_query_matches_words_literally(text, expected):
+    assert fts_query(text) == expected
+
+
+def test_search_ranks_all_sources_together_with_snippets(tmp_path):
+    store = _populate(str(tmp_path / "test.db"))
+
+    hits = store.search("robots").hits
+
+    assert [(hit.kind, hit.title) for hit in hits] == [
+        ("episode", "Robots at work"),
+        ("chapter", "Compilers"),
+        ("feed", "Tech Podcast"),
+        ("episode", "Weekly roundup"),
+    ]
+    assert hits[0].snippet == "[Robots] at work"
+    assert hits[1].context == "Tech Podcast"
+    assert hits[1].start == 95  # noqa: PLR2004
+    assert hits[2].context is None
+    assert hits == sorted(hits, key=lambda hit: hit.score)
+
+
+def test_search_weights_change_the_ranking(tmp_path):
+    store = _populate(str(tmp_path / "test.db"))
+
+    hits = store.search(
+        "robots",
+        weights={"episode": (1.0, 10.0), "feed": (0.0, 0.0), "chapter": (0.0,)},
+    ).hits
+
+    assert [hit.title for hit in hits][:2] == ["Weekly roundup", "Robots at work"]
+
+
+def test_search_pages_follow_the_cursor(tmp_path):
+    store = _populate(str(tmp_path / "test.db"))
+    expected = store.search("robots").hits
+
+    hits, after = [], None
+    while True:
+        page = store.search("robots", limit=1, after=after)
+        hits.extend(page.hits)
+        if (after := page.next_cursor) is None:
+            break
+
+    assert hits == expected
+    assert store.search("robots", limit=len(expected)).next_cursor is None
+
+
+def test_search_query_syntax(tmp_path):
+    store = _populate(str(tmp_path / "test.db"))
+
+    assert store.search('robots" OR (').hits == []
+    assert [hit.title for hit in store.search("compil*").hits] == [
+        "Compilers",
+        "Compilers",
+        "Tech Podcast",
+    ]
+    assert len(store.search("robots NOT chat", raw=True).hits) == 3  # noqa: PLR2004
+    with pytest.raises(SearchQueryError):
+        store.search('robots" OR (', raw=True)
+    with pytest.raises(ValueError, match="Invalid search cursor"):
+        store.search("robots", after="not-a-cursor")
+
+
+def test_substring_search_ranks_after_word_matches(tmp_path):
+    store = _populate(str(tmp_path / "test.db"))
+    assert store.search("robot", substring=True).hits == []
+
+    store.create_trigram_indexes()
+    hits = store.search("robot", substring=True).hits
+    assert [(hit.kind, hit.title, hit.substring) for hit in hits] == [
+        ("episode", "Robots at work", True),
+        ("chapter", "Compilers", True),
+        ("episode", "Weekly roundup", True),
+    ]
+    assert hits[0].snippet == "[Robot]s at work A chat about automation"
+
+    hits = store.search("compilers", substring=True).hits
+    assert [hit.substring for hit in hits] == [False, False, False]
+    pages, after = [], None
+    while True:
+        page = store.search("pil", substring=True, limit=1, after=after)
+        pages.extend(page.hits)
+        if (after := page.next_cursor) is None:
+            break
+    assert [(hit.kind, hit.title) for hit in pages] == [
+        ("episode", "Compilers"),
+        ("chapter", "Compilers"),
+    ]
+
+
+def test_trigram_indexes_follow_changes(tmp_path):
+    store = _populate(str(tmp_path / "test.db"))
+    store.create_trigram_indexes()
+
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml"},
+        [
+            {
+                "enclosureUrl": "https://cdn.example.com/3.mp3",
+                "feedXmlUrl": "https://example.com/feed.xml",
+                "title": "Droid repair",
+                "description": "Fixing robots",
+            },
+        ],
+    )
+    with store.db.conn:
+        store.db.execute(
+            "UPDATE episodes_extended SET title = 'Androids at work' "
+            "WHERE enclosureUrl = 'https://cdn.example.com/0.mp3';",
+        )
+        store.db.execute("DELETE FROM chapters;")
+
+    assert [hit.title for hit in store.search("droid", substring=True).hits] == [
+        "Droid repair",
+        "Androids at work",
+    ]
+    assert [hit.title for hit in store.search("obots", substring=True).hits] == [
+        "Droid repair",
+        "Weekly roundup",
+    ]
+    for table in ("episodes_extended_trigram", "chapters_trigram"):
+        store.db.execute(f"INSERT INTO {table} ({table}) VALUES ('integrity-check');")
+
+    store.drop_trigram_indexes()
+    assert not store.has_trigram_indexes()
+    assert store.search("ndroid", substring=True).hits == []
@@ -0,0 +1,100 @@
+import sqlite3
+
+from click.testing import CliRunner
+
+from overcast_to_sqlite import cli
+from overcast_to_sqlite.datastore import Datastore
+
+
+def _populate(db_path: str, count: int = 400) -> Datastore:
+    store = Datastore(db_path)
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml", "title": "Feed"},
+        [
+            {
+                "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+                "feedXmlUrl": "https://example.com/feed.xml",
+                "title": f"Episode {i}",
+                "description": f"{i} " + "robots " * 100,
+                "link": "https://example.com/" if i == 0 else None,
+            }
+            for i in range(count)
+        ],
+    )
+    return store
+
+
+def test_storage_report_measures_objects_and_columns(tmp_path):
+    store = _populate(str(tmp_path / "test.db"))
+
+    report = store.storage_report(sample=50)
+
+    objects = {usage.name: usage for usage in report.objects}
+    assert report.objects == sorted(
+        report.objects,
+        key=lambda usage: usage.size,
+        reverse=True,
+    )
+    assert sum(usage.pages for usage in report.objects) <= report.page_count
+    episodes = objects["episodes_extended"]
+    assert (episodes.kind, episodes.rows) == ("table", 400)
+    assert episodes.payload > 400 * 700
+    assert objects["episodes_extended_fts_data"].kind == "fts"
+    assert objects["episodes_extended_fts_data"].table == "episodes_extended_fts"
+    assert objects["idx_episodes_extended_feedXmlUrl"].kind == "index"
+    assert objects["idx_episodes_extended_feedXmlUrl"].rows is None
+
+    columns = {f"{c.table}.{c.name}": c for c in report.columns}
+    description = columns["episodes_extended.description"]
+    assert report.columns[0] is description
+    assert 0 < description.sampled <= 50  # noqa: PLR2004
+    assert 700 < description.avg_payload < 710  # noqa: PLR2004
+    assert description.estimated_size == round(description.avg_payload * 400)
+    assert columns["episodes_extended.link"].null_ratio > 0.95  # noqa: PLR2004
+
+
+def test_storage_report_flags_candidates(tmp_path):
+    store = _populate(str(tmp_path / "test.db"), count=1000)
+    with store.db.conn:
+        store.db.execute("DELETE FROM episodes_extended WHERE rowid % 2 = 0;")
+
+    candidates = {
+        (c.action, c.target) for c in store.storage_report(sample=200).candidates
+    }
+
+    assert ("compress", "episodes_extended.description") in candidates
+    assert ("prune", "episodes_extended.link") in candidates
+    assert ("prune", "episodes_extended.feedXmlUrl") in candidates
+    assert ("defragment", "episodes_extended") in candidates
+    assert ("compress", "episodes_extended.title") not in candidates
+    assert not any(target.startswith("feeds_extended.") for _, target in candidates)
+
+
+def test_storage_report_command(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate(db_path).close()
+
+    result = CliRunner().invoke(
+        cli.cli,
+        ["storage-report", db_path, "--sample", "10", "--top", "3"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "  episodes_extended " in result.output
+    assert "  episodes_extended.description " in result.output
+    assert "compress   episodes_extended.description" in result.output
+
+
+def test_storage_report_command_without_dbstat(monkeypatch, tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate(db_path, count=1).close()
+
+    def _no_dbstat(*_args: object, **_kwargs: object) -> None:
+        msg = "no such table: dbstat"
+        raise sqlite3.OperationalError(msg)
+
+    monkeypatch.setattr(Datastore, "storage_report", _no_dbstat)
+    result = CliRunner().invoke(cli.cli, ["storage-report", db_path])
+
+    assert result.exit_code == 1
+    assert "needs the dbstat virtual table" in result.output
@@ -0,0 +1,335 @@
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from overcast_to_sqlite import cli
+from overcast_to_sqlite.blobs import adopt_legacy_transcripts
+from overcast_to_sqlite.datastore import Datastore
+from overcast_to_sqlite.models import Episode, Feed
+from overcast_to_sqlite.transcripts import (
+    Segment,
+    ingest_transcripts,
+    parse_transcript,
+)
+
+VTT = """WEBVTT
+
+1
+00:00:01.000 --> 00:00:04.500
+<v Alice>Welcome to the show</v>
+
+00:01:02.250 --> 00:01:05.000
+Pied Piper compression
+"""
+
+SRT = """1
+00:00:01,000 --> 00:00:04,500
+Welcome to the show
+
+2
+00:01:02,250 --> 00:01:05,000
+Pied Piper compression
+"""
+
+HTML = """<html><body>
+<cite>Alice:</cite><time>0:01</time><p>Welcome to the show</p>
+<cite>Bob:</cite><time>1:02</time><p>Pied <b>Piper</b> compression</p>
+</body></html>"""
+
+PODCAST_JSON = json.dumps(
+    {
+        "version": "1.0.0",
+        "segments": [
+            {"speaker": "Alice", "startTime": 1, "endTime": 4.5, "body": "Welcome"},
+            {"startTime": 62.25, "endTime": 65, "body": "Pied Piper compression"},
+        ],
+    },
+)
+
+
+def _populate_transcripts(db_path: str, count: int = 3) -> None:
+    store = Datastore(db_path)
+    store.save_extended_feed_and_episodes(
+        {"xmlUrl": "https://example.com/feed.xml", "title": "Tech Podcast"},
+        [
+            {
+                "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+                "feedXmlUrl": "https://example.com/feed.xml",
+                "title": f"Episode {i}",
+                "podcast:transcript:url": f"https://host.example.com/{i}.vtt",
+                "podcast:transcript:type": "text/vtt",
+            }
+            for i in range(count)
+        ],
+    )
+
+
+def test_transcripts_to_download_prioritises_starred_then_recent(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    store = Datastore(db_path)
+    store.save_feed_and_episodes(
+        Feed(
+            overcastId=1,
+            title="Tech Podcast",
+            subscribed=True,
+            notifications=False,
+            xmlUrl="https://example.com/feed.xml",
+            htmlUrl="https://example.com",
+        ),
+        [
+            Episode(
+                overcastId=i,
+                feedId=1,
+                title=f"Episode {i}",
+                url=f"https://example.com/{i}",
+                overcastUrl=f"https://overcast.fm/+{i}",
+                played=True,
+                userDeleted=False,
+                enclosureUrl=f"https://cdn.example.com/{i}.mp3",
+                progress=0,
+                userUpdatedDate=f"2025-01-0{i + 1}T00:00:00+00:00",
+                userRecommendedDate="2025-01-09T00:00:00+00:00" if i == 0 else None,
+            )
+            for i in range(3)
+        ],
+    )
+    _populate_transcripts(db_path)
+
+    titles = [row[0] for row in store.transcripts_to_download(starred_only=False)]
+
+    assert titles == ["Episode 0", "Episode 2", "Episode 1"]
+
+
+def test_update_transcript_download_paths_bulk(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate_transcripts(db_path)
+    store = Datastore(db_path)
+    first, third = str(tmp_path / "0.vtt"), str(tmp_path / "2.vtt")
+
+    store.update_transcript_download_paths(
+        [
+            ("https://cdn.example.com/0.mp3", first, '"e0"', None),
+            ("https://cdn.example.com/2.mp3", third, None, "yesterday"),
+        ],
+    )
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT enclosureUrl, transcriptDownloadPath, transcriptEtag, "
+            "transcriptLastModified FROM episodes_extended ORDER BY enclosureUrl",
+        ).fetchall()
+    assert rows == [
+        ("https://cdn.example.com/0.mp3", first, '"e0"', None),
+        ("https://cdn.example.com/1.mp3", None, None, None),
+        ("https://cdn.example.com/2.mp3", third, None, "yesterday"),
+    ]
+
+
+def test_transcripts_command_downloads_and_saves_paths(requests_mock, tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate_transcripts(db_path)
+    for i in range(3):
+        requests_mock.get(
+            f"https://host.example.com/{i}.vtt",
+            content=f"WEBVTT\n\n00:00.000 --> 00:01.000\nline {i}\n".encode(),
+            headers={"Content-Type": "text/vtt"},
+        )
+
+    result = CliRunner().invoke(
+        cli.cli,
+        ["transcripts", db_path, "-p", str(tmp_path / "transcripts")],
+        catch_exceptions=False,
+    )
+
+    assert result.exit_code == 0
+    with sqlite3.connect(db_path) as conn:
+        paths = [
+            row[0]
+            for row in conn.execute(
+                "SELECT transcriptDownloadPath FROM episodes_extended "
+                "ORDER BY enclosureUrl",
+            )
+        ]
+    assert all(path is not None for path in paths)
+    digest = hashlib.sha256(b"WEBVTT\n\n00:00.000 --> 00:01.000\nline 1\n").hexdigest()
+    assert (
+        "line 1"
+        in (tmp_path / "transcripts" / digest[:2] / f"{digest}.vtt").read_text()
+    )
+
+    search = CliRunner().invoke(
+        cli.cli,
+        ["search", "line", db_path],
+        catch_exceptions=False,
+    )
+    assert search.output.count("  transcript ") == 3  # noqa: PLR2004
+    assert '[0:00] "Episode 1" -- Tech Podcast' in search.output
+
+
+@pytest.mark.parametrize(
+    ("file_name", "content", "expected_format", "expected"),
+    [
+        (
+            "episode.vtt",
+            VTT,
+            "vtt",
+            [
+                Segment(1.0, 4.5, "Alice", "Welcome to the show"),
+                Segment(62.25, 65.0, None, "Pied Piper compression"),
+            ],
+        ),
+        (
+            "episode.srt",
+            SRT,
+            "srt",
+            [
+                Segment(1.0, 4.5, None, "Welcome to the show"),
+                Segment(62.25, 65.0, None, "Pied Piper compression"),
+            ],
+        ),
+        (
+            "episode.html",
+            HTML,
+            "html",
+            [
+                Segment(1.0, None, "Alice", "Welcome to the show"),
+                Segment(62.0, None, "Bob", "Pied Piper compression"),
+            ],
+        ),
+        (
+            "episode.json",
+            PODCAST_JSON,
+            "json",
+            [
+                Segment(1.0, 4.5, "Alice", "Welcome"),
+                Segment(62.25, 65.0, None, "Pied Piper compression"),
+            ],
+        ),
+    ],
+)
+def test_parse_transcript_formats(
+    tmp_path,
+    file_name,
+    content,
+    expected_format,
+    expected,
+):
+    path = tmp_path / file_name
+    path.write_text(content)
+
+    assert parse_transcript(path) == (expected_format, expected)
+
+
+def test_ingest_transcripts_is_incremental_and_searchable(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate_transcripts(db_path, count=1)
+    store = Datastore(db_path)
+    transcript_path = tmp_path / "episode.vtt"
+    transcript_path.write_text(VTT)
+    store.update_transcript_download_paths(
+        [("https://cdn.example.com/0.mp3", str(transcript_path), None, None)],
+    )
+
+    assert ingest_transcripts(store) == 1
+    assert ingest_transcripts(store) == 0
+
+    results = store.search_transcripts("piper")
+    assert results == [("Episode 0", "Tech Podcast", 62.25, "Pied Piper compression")]
+
+    transcript_path.write_text(SRT.replace("Pied Piper", "Hooli"))
+    assert ingest_transcripts(store, [str(transcript_path)]) == 1
+    assert store.search_transcripts("piper") == []
+    assert store.search_transcripts("hooli")[0][3] == "Hooli compression"
+
+
+def test_repointed_transcript_drops_old_segments(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate_transcripts(db_path, count=2)
+    store = Datastore(db_path)
+    old_path, new_path = tmp_path / "aa.vtt", tmp_path / "bb.vtt"
+    old_path.write_text(VTT)
+    new_path.write_text(VTT.replace("Pied Piper", "Hooli"))
+    store.update_transcript_download_paths(
+        [
+            (f"https://cdn.example.com/{i}.mp3", str(old_path), None, None)
+            for i in range(2)
+        ],
+    )
+    ingest_transcripts(store)
+
+    # Another episode still points at the old path, so it stays searchable.
+    store.update_transcript_download_paths(
+        [("https://cdn.example.com/0.mp3", str(new_path), None, None)],
+    )
+    assert [r[0] for r in store.search_transcripts("piper")] == ["Episode 1"]
+    store.update_transcript_download_paths(
+        [("https://cdn.example.com/1.mp3", str(new_path), None, None)],
+    )
+    ingest_transcripts(store)
+
+    assert store.search_transcripts("piper") == []
+    assert len(store.search_transcripts("hooli")) == 1
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT path FROM transcripts").fetchall() == [
+            (str(new_path),),
+        ]
+
+
+def test_identical_transcripts_are_stored_and_parsed_once(requests_mock, tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate_transcripts(db_path)
+    for i in range(3):
+        requests_mock.get(f"https://host.example.com/{i}.vtt", text=VTT)
+    transcripts_path = tmp_path / "transcripts"
+
+    CliRunner().invoke(
+        cli.cli,
+        ["transcripts", db_path, "-p", str(transcripts_path)],
+        catch_exceptions=False,
+    )
+
+    blobs = [path for path in transcripts_path.rglob("*") if path.is_file()]
+    assert len(blobs) == 1
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM blob_refs").fetchone() == (3,)
+        assert conn.execute("SELECT COUNT(*) FROM transcripts").fetchone() == (1,)
+        assert conn.execute(
+            "SELECT COUNT(DISTINCT transcriptDownloadPath) FROM episodes_extended",
+        ).fetchone() == (1,)
+
+    verify = CliRunner().invoke(cli.cli, ["verify", db_path])
+    assert verify.exit_code == 0
+    assert "Verified 1 archived files" in verify.output
+
+    blobs[0].write_text("tampered")
+    verify = CliRunner().invoke(cli.cli, ["verify", db_path])
+    assert verify.exit_code == 1
+    assert "content does not match its hash" in verify.output
+
+
+def test_legacy_transcripts_move_into_blob_store(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    _populate_transcripts(db_path, count=2)
+    store = Datastore(db_path)
+    transcripts_path = tmp_path / "transcripts"
+    legacy = []
+    for i in range(2):
+        path = transcripts_path / "Tech Podcast" / f"Episode {i}.vtt"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(VTT)
+        legacy.append((f"https://cdn.example.com/{i}.mp3", str(path), None, None))
+    store.update_transcript_download_paths(legacy)
+    ingest_transcripts(store)
+
+    assert adopt_legacy_transcripts(store, transcripts_path) == 2
+
+    assert not (transcripts_path / "Tech Podcast" / "Episode 0.vtt").exists()
+    assert store.transcripts_outside_blob_store() == []
+    ((_, blob_path, _),) = store.get_blobs()
+    assert Path(blob_path).read_text() == VTT
+    assert ingest_transcripts(store) == 0
+    assert len(store.search_transcripts("piper")) == 1